@@ -0,0 +1,251 @@
+# backend/api/app/cache.py
+"""
+Read-through cache for API queries: an in-process LRU (L1) in front of Redis.
+
+    docs = await cache.get_or_load("dept_docs", dept_id, lambda: repository.department_documents(dept_id))
+    await cache.invalidate(("profile", user_id))                   # API write paths
+    cache.invalidate_sync(redis, ("dept_docs", dept_id), ...)       # worker (sync client)
+
+Keys are namespaced ("cache:{namespace}:{key}") and values stored as JSON with
+CACHE_TTL (or a per-namespace TTL). Variants of one entry (pages, projections)
+are fields of a Redis hash under its key (load(..., field="...")), so
+invalidating the entry drops all of them at once. Writes invalidate the entries they change:
+the Redis keys are deleted and an event on CACHE_CHANNEL makes every API
+process drop its L1 copy; L1 entries also expire after CACHE_L1_TTL seconds.
+
+Misses are single-flight: concurrent callers in one process share one load,
+and across processes a short Redis lock lets one load while the others wait
+for its result (or load themselves after CACHE_LOCK_TIMEOUT).
+
+Lookups are counted per namespace and tier (l1, redis, shared = joined another
+caller's load, miss); hit_rates() and
+/metrics (kmrl_api_cache_lookups_total) report them.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from api.app.redis_client import get_redis
+from nlpPipelne import Metrics
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_TTL = int(os.getenv("CACHE_TTL", 300))  # seconds in Redis
+CACHE_L1_SIZE = int(os.getenv("CACHE_L1_SIZE", 2048))  # entries per process, 0 disables L1
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", 5))
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", 5))
+CACHE_CHANNEL = "cache:invalidate"
+KEY_PREFIX = "cache:"
+POLL_INTERVAL = 0.02
+TIERS = ("l1", "redis", "shared", "miss")
+
+TTLS = {
+    "compliances": 3600,  # not written by the API
+}
+
+_l1 = OrderedDict()  # slot -> (expires, json)
+_inflight = {}       # slot -> asyncio.Future of the json
+_generation = {}     # slot -> invalidations during its load, so a stale load is not stored
+_stats = {}          # namespace -> {tier: lookups}
+
+
+def cache_key(namespace: str, key) -> str:
+    return f"{KEY_PREFIX}{namespace}:{key}"
+
+
+def _slot(full_key: str, field: str = None) -> str:
+    """L1 / single-flight id of a key or of one field of it."""
+    return full_key if field is None else f"{full_key}#{field}"
+
+
+def _in(slot: str, full_key: str) -> bool:
+    return slot == full_key or slot.startswith(full_key + "#")
+
+
+def _count(namespace: str, tier: str):
+    _stats.setdefault(namespace, dict.fromkeys(TIERS, 0))[tier] += 1
+    Metrics.inc("api_cache_lookups_total", namespace=namespace, tier=tier)
+
+
+def hit_rates() -> dict:
+    """namespace -> {"lookups", <tier>: n, "hit_rate"} for this process."""
+    rates = {}
+    for namespace, tiers in sorted(_stats.items()):
+        lookups = sum(tiers.values())
+        rates[namespace] = {"lookups": lookups, **tiers,
+                            "hit_rate": (lookups - tiers["miss"]) / lookups if lookups else 0.0}
+    return rates
+
+
+def reset_stats():
+    _stats.clear()
+
+
+# -----------------------------
+# L1
+# -----------------------------
+def _l1_get(slot: str):
+    entry = _l1.get(slot)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        del _l1[slot]
+        return None
+    _l1.move_to_end(slot)
+    return entry[1]
+
+
+def _l1_put(slot: str, raw: str):
+    if CACHE_L1_SIZE <= 0:
+        return
+    _l1[slot] = (time.monotonic() + CACHE_L1_TTL, raw)
+    _l1.move_to_end(slot)
+    while len(_l1) > CACHE_L1_SIZE:
+        _l1.popitem(last=False)
+
+
+def _l1_drop(full_keys):
+    for full_key in full_keys:
+        for slot in [s for s in _l1 if _in(s, full_key)]:
+            del _l1[slot]
+        for slot in [s for s in _inflight if _in(s, full_key)]:
+            _generation[slot] = _generation.get(slot, 0) + 1
+
+
+def clear_l1():
+    _l1.clear()
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+async def _redis_get(redis, full_key: str, field: str = None):
+    return await (redis.get(full_key) if field is None else redis.hget(full_key, field))
+
+
+async def _redis_set(redis, full_key: str, field: str, raw: str, ttl: int):
+    if field is None:
+        await redis.set(full_key, raw, ex=ttl)
+        return
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hset(full_key, field, raw)
+        pipe.expire(full_key, ttl)
+        await pipe.execute()
+
+
+async def _load_once(redis, namespace: str, full_key: str, field: str, loader, ttl: int) -> str:
+    """Load through the Redis lock: one process queries, the others wait for its value."""
+    slot = _slot(full_key, field)
+    lock_key = f"{slot}:lock"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+    while not await redis.set(lock_key, token, nx=True, px=int(CACHE_LOCK_TIMEOUT * 1000)):
+        await asyncio.sleep(POLL_INTERVAL)
+        raw = await _redis_get(redis, full_key, field)
+        if raw is not None:
+            _count(namespace, "redis")
+            return raw
+        if time.monotonic() > deadline:
+            break  # holder died or is slow: load without the lock
+
+    try:
+        generation = _generation.get(slot, 0)
+        _count(namespace, "miss")
+        raw = json.dumps(await loader(), default=str)
+        if _generation.get(slot, 0) == generation:  # not invalidated while loading
+            await _redis_set(redis, full_key, field, raw, ttl)
+        return raw
+    finally:
+        if await redis.get(lock_key) == token:
+            await redis.delete(lock_key)
+
+
+async def load(namespace: str, key, loader, ttl: int = None, field: str = None):
+    """
+    (value, tier): tier is one of TIERS ("miss": loaded now via loader()).
+    field: variant of the entry (e.g. page + projection), invalidated with it.
+    """
+    if not CACHE_ENABLED:
+        return await loader(), "miss"
+
+    full_key = cache_key(namespace, key)
+    slot = _slot(full_key, field)
+    raw = _l1_get(slot)
+    if raw is not None:
+        _count(namespace, "l1")
+        return json.loads(raw), "l1"
+
+    redis = await get_redis()
+    raw = await _redis_get(redis, full_key, field)
+    if raw is not None:
+        _count(namespace, "redis")
+        _l1_put(slot, raw)
+        return json.loads(raw), "redis"
+
+    # Single flight within the process
+    pending = _inflight.get(slot)
+    if pending is not None:
+        _count(namespace, "shared")
+        return json.loads(await asyncio.shield(pending)), "shared"
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[slot] = future
+    try:
+        raw = await _load_once(redis, namespace, full_key, field, loader, ttl or TTLS.get(namespace, CACHE_TTL))
+        future.set_result(raw)
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # retrieved: waiters re-raise it, no "never retrieved" warning
+        raise
+    finally:
+        del _inflight[slot]
+        _generation.pop(slot, None)
+    _l1_put(slot, raw)
+    return json.loads(raw), "miss"
+
+
+async def get_or_load(namespace: str, key, loader, ttl: int = None, field: str = None):
+    return (await load(namespace, key, loader, ttl, field))[0]
+
+
+# -----------------------------
+# Invalidation
+# -----------------------------
+def _keys(entries) -> list:
+    return [cache_key(namespace, key) for namespace, key in entries if key is not None]
+
+
+async def invalidate(*entries):
+    """Drop (namespace, key) entries everywhere (API side)."""
+    full_keys = _keys(entries)
+    if not full_keys:
+        return
+    _l1_drop(full_keys)
+    redis = await get_redis()
+    await redis.delete(*full_keys)
+    await redis.publish(CACHE_CHANNEL, json.dumps(full_keys))
+
+
+def invalidate_sync(redis, *entries):
+    """invalidate() for processes with the sync client (workers)."""
+    full_keys = _keys(entries)
+    if not full_keys:
+        return
+    _l1_drop(full_keys)
+    redis.delete(*full_keys)
+    redis.publish(CACHE_CHANNEL, json.dumps(full_keys))
+
+
+async def listen(redis):
+    """Background task of every API process: apply other processes' invalidations to L1."""
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(CACHE_CHANNEL)
+    try:
+        async for message in pubsub.listen():
+            if message.get("type") == "message":
+                _l1_drop(json.loads(message["data"]))
+    finally:
+        await pubsub.unsubscribe(CACHE_CHANNEL)
+        await pubsub.close()
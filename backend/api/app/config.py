@@ -10,15 +10,24 @@ from passlib.context import CryptContext
 load_dotenv()
 
 # ---- Supabase ----
+# DATA_BACKEND=memory swaps in the in-memory table store (local runs, load tests)
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 supabase: Client = None
-if SUPABASE_URL and SUPABASE_KEY:
+if DATA_BACKEND == "memory":
+    from api.app.table_store import MemoryTableStore
+    supabase = MemoryTableStore.from_env()
+elif SUPABASE_URL and SUPABASE_KEY:
     supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 else:
     raise RuntimeError("Missing Supabase credentials in environment")
 
+# ---- Postgres document store (database/init.sql) ----
+# PG_DOCUMENT_STORE=1: the pipeline writes chunks / entities / summaries there, /documents/keyword_search reads them
+PG_DOCUMENT_STORE = os.getenv("PG_DOCUMENT_STORE", "0") == "1"
+
 # ---- Cloudinary ----
 cloudinary.config(
     cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
@@ -0,0 +1,94 @@
+# backend/api/app/db.py
+"""
+Non-blocking table client for the API process.
+
+    db = await get_db()
+    resp = await db.table("users").select("*").eq("id", user_id).execute()
+
+DATA_BACKEND=supabase: postgrest's AsyncPostgrestClient on one shared httpx
+connection pool (at most DB_POOL_SIZE connections, DB_POOL_TIMEOUT seconds to
+get one), so a query never blocks the event loop.
+Any other backend (the in-memory store): the same builder calls against the sync
+client, with execute() run in a pool of DB_POOL_SIZE threads.
+
+Worker processes keep using the sync client from config.py.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from api.app import config
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", 30))
+
+_db = None
+
+
+class ThreadedQuery:
+    """Wraps a sync query builder; execute() is awaitable and runs in the pool."""
+
+    def __init__(self, query, executor):
+        self._query = query
+        self._executor = executor
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return ThreadedQuery(attr(*args, **kwargs), self._executor)
+        return call
+
+    async def execute(self):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._query.execute)
+
+
+class ThreadedClient:
+    def __init__(self, client, pool_size: int = DB_POOL_SIZE):
+        self.client = client
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="db")
+
+    def table(self, name: str) -> ThreadedQuery:
+        return ThreadedQuery(self.client.table(name), self.executor)
+
+    def rpc(self, name: str, params: dict = None) -> ThreadedQuery:
+        return ThreadedQuery(self.client.rpc(name, params or {}), self.executor)
+
+    async def aclose(self):
+        self.executor.shutdown(wait=False)
+
+
+def _postgrest_client(pool_size: int = DB_POOL_SIZE) -> AsyncPostgrestClient:
+    headers = {
+        "apikey": config.SUPABASE_KEY,
+        "Authorization": f"Bearer {config.SUPABASE_KEY}",
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+    }
+    session = httpx.AsyncClient(
+        headers=headers,
+        timeout=httpx.Timeout(DB_TIMEOUT, pool=DB_POOL_TIMEOUT),
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        http2=False,
+    )
+    return AsyncPostgrestClient(f"{config.SUPABASE_URL}/rest/v1", headers=headers, http_client=session)
+
+
+async def get_db():
+    global _db
+    if _db is None:
+        _db = _postgrest_client() if config.DATA_BACKEND == "supabase" else ThreadedClient(config.supabase)
+    return _db
+
+
+async def close_db():
+    global _db
+    if _db is not None:
+        await _db.aclose()
+        _db = None
@@ -0,0 +1,34 @@
+# backend/api/app/http_client.py
+"""
+One aiohttp session per process for outgoing downloads (URL uploads).
+
+Connections are pooled and kept alive across jobs; at most HTTP_MAX_CONNECTIONS
+are open at once (HTTP_MAX_PER_HOST to a single host), and a download gets
+HTTP_TIMEOUT seconds in total.
+"""
+import os
+
+import aiohttp
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 16))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", 4))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 600))
+
+_session = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_MAX_CONNECTIONS, limit_per_host=HTTP_MAX_PER_HOST),
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, sock_connect=30),
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
@@ -0,0 +1,99 @@
+# backend/api/app/ingestion.py
+"""
+Database side of an upload, shared by every channel (file, url, email, whatsapp).
+
+    user_id, dept_id, fields = resolve_sender(kind, payload)   # one query, cached
+    document = record_document(user_id, dept_id, fields, filename, storage_url, file_hash, output)
+
+record_document writes the document, summary, transexion and chunk rows with one
+call to the ingest_document database function (database/supabase/ingest_document.sql),
+i.e. one round trip and one transaction. INGEST_RPC=0 writes them with one insert
+per table instead, for databases where the function is not installed yet.
+"""
+import os
+import time
+from collections import OrderedDict
+
+from api.app.config import supabase
+from nlpPipelne import Metrics
+
+INGEST_RPC = os.getenv("INGEST_RPC", "1") == "1"
+SENDER_CACHE_TTL = float(os.getenv("SENDER_CACHE_TTL", 300))  # seconds
+SENDER_CACHE_SIZE = int(os.getenv("SENDER_CACHE_SIZE", 4096))
+
+_senders = OrderedDict()  # (table, column, value) -> (expires, row)
+
+
+class UnknownSender(Exception):
+    """The upload names a department / user that does not exist."""
+
+
+def _lookup(table: str, columns: str, column: str, value: str):
+    """First row of table where column = value, cached for SENDER_CACHE_TTL (misses are not cached)."""
+    key = (table, column, value)
+    hit = _senders.get(key)
+    fresh = bool(hit and hit[0] > time.monotonic())
+    Metrics.cache("sender", fresh)
+    if fresh:
+        _senders.move_to_end(key)
+        return hit[1]
+
+    rows = supabase.table(table).select(columns).eq(column, value).limit(1).execute().data
+    if not rows:
+        return None
+    _senders[key] = (time.monotonic() + SENDER_CACHE_TTL, rows[0])
+    if len(_senders) > SENDER_CACHE_SIZE:
+        _senders.popitem(last=False)
+    return rows[0]
+
+
+def forget_senders():
+    _senders.clear()
+
+
+def resolve_sender(kind: str, payload: dict):
+    """(user_id, dept_id, document fields) for each upload channel"""
+    if kind in ("file", "url"):
+        dept = _lookup("departments", "dept_id", "name", payload["dept_name"])
+        if not dept:
+            raise UnknownSender("Department not found")
+        medium = "direct file" if kind == "file" else "url"
+        return payload["user_id"], dept["dept_id"], {"medium": medium, "priority": payload["priority"]}
+
+    column = "email" if kind == "email" else "phone"
+    user = _lookup("users", "id,department", column, payload[column])
+    if not user:
+        raise UnknownSender("User not found")
+    return user["id"], user["department"], {"doc_type": "general", "medium": "email" if kind == "email" else "whatsapp", "priority": "normal"}
+
+
+def chunk_rows(output: dict) -> list:
+    return [{
+        "chunk_id": chunk.get("chunk_id"),
+        "content": " ".join(chunk.get("sentences", [])),
+        "summary": chunk.get("summary", ""),
+        "entities": chunk.get("entities", {}),
+    } for chunk in output.get("chunks", [])]
+
+
+def record_document(user_id, dept_id, fields: dict, filename: str, storage_url: str, file_hash: str, output: dict):
+    """Insert the processed upload; returns the documents row."""
+    document = {"title": filename, "department": dept_id, "url": storage_url, "file_hash": file_hash, **fields}
+    summary = output.get("doc_summary", "")
+    chunks = chunk_rows(output)
+
+    if INGEST_RPC:
+        return supabase.rpc("ingest_document", {
+            "p_document": document,
+            "p_summary": summary,
+            "p_from_user": user_id,
+            "p_chunks": chunks,
+        }).execute().data
+
+    doc = supabase.table("documents").insert(document).execute().data[0]
+    doc_id = doc["doc_id"]
+    supabase.table("summaries").insert({"doc_id": doc_id, "content": summary}).execute()
+    supabase.table("transexions").insert({"from_user": user_id, "to_department": dept_id, "doc_id": doc_id}).execute()
+    if chunks:
+        supabase.table("chunks").insert([{"doc_id": doc_id, **c} for c in chunks]).execute()
+    return doc
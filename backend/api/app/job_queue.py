@@ -0,0 +1,389 @@
+# backend/api/app/job_queue.py
+"""
+Durable ingestion job queue on top of Redis.
+
+Keys:
+    jobs:lanes                  SET of "{class}|{department}" lane names
+    jobs:pending:{lane}         LIST of job ids waiting in that lane (oldest at the right)
+    jobs:vtime / jobs:vclock    HASH lane -> virtual time / class -> clock (fair share state)
+    jobs:processing             LIST of job ids claimed by a worker
+    jobs:leases                 ZSET job id -> lease deadline (unix time)
+    job:{id}                    HASH with kind, payload, status, stage, attempts, result, error,
+                                and "lease": the token of the worker holding the job
+    job:{id}:events             LIST of the job's progress events (JSON, numbered by "seq"),
+                                also PUBLISHed on the channel of the same name
+
+Progress events are {"seq", "time", "stage", "status", ...}: stage transitions
+("started" / "done"), per-page extraction ("page") and per-chunk Stage 4
+results ("chunk", with the chunk's summary), ending with stage "done" or
+"failed". job_events() replays the stored ones and follows the live ones, so
+any API process can stream any job.
+
+Which lane a worker serves next is decided by api.app.scheduler (strict priority
+classes, weighted fair share across departments, aging).
+
+Claiming is one Lua script (move to jobs:processing, lease, new lease token), so
+requeue_expired() never sees a claimed job without its lease. extend_lease,
+complete_job and fail_job take the token returned with the job and do nothing
+once it is no longer the job's lease (expired and handed to another worker).
+
+API side (async client):  new_job_id, enqueue_job, get_job, job_events
+Worker side (sync client): claim_job, extend_lease, set_progress, publish_event,
+                           complete_job, fail_job, requeue_expired
+"""
+import json
+import os
+import time
+import uuid
+
+import dotenv
+
+from api.app.scheduler import priority_class, select_lane, charge, activate
+
+dotenv.load_dotenv()
+
+LANES_KEY = "jobs:lanes"
+PENDING_PREFIX = "jobs:pending:"
+VTIME_KEY = "jobs:vtime"
+VCLOCK_KEY = "jobs:vclock"
+PROCESSING_KEY = "jobs:processing"
+LEASES_KEY = "jobs:leases"
+
+VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", 120))  # seconds without heartbeat before requeue
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 7 * 24 * 3600))
+EVENTS_MAX = int(os.getenv("JOB_EVENTS_MAX", 2000))  # events kept per job for replay
+KEEPALIVE = 15  # seconds between keep-alive ticks of job_events()
+FINAL_STAGES = ("done", "failed")
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _events_key(job_id: str) -> str:
+    return f"job:{job_id}:events"
+
+
+def _pending_key(lane: str) -> str:
+    return f"{PENDING_PREFIX}{lane}"
+
+
+# KEYS: pending lane, processing, leases. ARGV: deadline, now, lease token, job key prefix
+_CLAIM = """
+local job_id = redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT')
+if not job_id then return false end
+redis.call('ZADD', KEYS[3], ARGV[1], job_id)
+local job = ARGV[4] .. job_id
+redis.call('HINCRBY', job, 'attempts', 1)
+redis.call('HSET', job, 'status', 'running', 'stage', 'started', 'updated_at', ARGV[2], 'lease', ARGV[3])
+return job_id
+"""
+
+# KEYS: job, leases. ARGV: job id, lease token, deadline
+_EXTEND = """
+if redis.call('HGET', KEYS[1], 'lease') ~= ARGV[2] then return 0 end
+redis.call('ZADD', KEYS[2], 'XX', ARGV[3], ARGV[1])
+return 1
+"""
+
+# KEYS: job, processing, leases. ARGV: job id, lease token, result, now, result ttl
+_COMPLETE = """
+if redis.call('HGET', KEYS[1], 'lease') ~= ARGV[2] then return 0 end
+redis.call('LREM', KEYS[2], 0, ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('HDEL', KEYS[1], 'lease')
+redis.call('HSET', KEYS[1], 'status', 'done', 'stage', 'done', 'result', ARGV[3], 'updated_at', ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+"""
+
+# KEYS: job, processing, leases, vtime, vclock, lanes. ARGV: job id, lease token ("" for none), error,
+# retry (0/1), now, result ttl, default max attempts, pending key prefix, expired before ("" = any).
+# Returns -1 if the caller does not hold the job, else 1 if requeued, 0 if failed.
+# A retry is queued again like a new job (see enqueue_job): at the tail of its lane, an idle lane
+# joining at its class clock.
+_FAIL = """
+if (redis.call('HGET', KEYS[1], 'lease') or '') ~= ARGV[2] then return -1 end
+local deadline = redis.call('ZSCORE', KEYS[3], ARGV[1])
+if ARGV[9] ~= '' and deadline and tonumber(deadline) > tonumber(ARGV[9]) then return -1 end
+if redis.call('LREM', KEYS[2], 0, ARGV[1]) == 0 then return -1 end
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('HDEL', KEYS[1], 'lease')
+local attempts = tonumber(redis.call('HGET', KEYS[1], 'attempts') or '0')
+local max_attempts = tonumber(redis.call('HGET', KEYS[1], 'max_attempts') or ARGV[7])
+local retry = ARGV[4] == '1' and attempts < max_attempts
+redis.call('HSET', KEYS[1], 'status', retry and 'queued' or 'failed', 'stage', retry and 'retrying' or 'failed',
+           'error', ARGV[3], 'updated_at', ARGV[5])
+if retry then
+    local lane = redis.call('HGET', KEYS[1], 'lane')
+    local pending = ARGV[8] .. lane
+    if redis.call('LLEN', pending) == 0 then
+        local cls = string.match(lane, '^([^|]*)')
+        local vtime = tonumber(redis.call('HGET', KEYS[4], lane) or '0')
+        local clock = tonumber(redis.call('HGET', KEYS[5], cls) or '0')
+        redis.call('HSET', KEYS[4], lane, tostring(math.max(vtime, clock)))
+    end
+    redis.call('HSET', KEYS[1], 'enqueued_at', ARGV[5])
+    redis.call('LPUSH', pending, ARGV[1])
+    redis.call('SADD', KEYS[6], lane)
+    return 1
+end
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return 0
+"""
+
+
+def _decode(job: dict) -> dict:
+    for field in ("payload", "result"):
+        if job.get(field):
+            job[field] = json.loads(job[field])
+    for field in ("attempts", "max_attempts"):
+        if field in job:
+            job[field] = int(job[field])
+    return job
+
+
+# -----------------------------
+# API side
+# -----------------------------
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+async def enqueue_job(
+    redis,
+    job_id: str,
+    kind: str,
+    payload: dict,
+    priority: str = "normal",
+    department: str = "unknown",
+    max_attempts: int = MAX_ATTEMPTS,
+) -> str:
+    now = time.time()
+    cls = priority_class(priority)
+    lane = f"{cls}|{department}"
+
+    await redis.hset(_job_key(job_id), mapping={
+        "id": job_id,
+        "kind": kind,
+        "payload": json.dumps(payload, ensure_ascii=False),
+        "priority": cls,
+        "department": department,
+        "lane": lane,
+        "status": "queued",
+        "stage": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "created_at": now,
+        "enqueued_at": now,
+        "updated_at": now,
+    })
+
+    if not await redis.llen(_pending_key(lane)):
+        # Idle lane becomes active: join at the class clock (no credit for idle time)
+        vtime = float(await redis.hget(VTIME_KEY, lane) or 0)
+        clock = float(await redis.hget(VCLOCK_KEY, cls) or 0)
+        await redis.hset(VTIME_KEY, lane, activate(vtime, clock))
+
+    await redis.lpush(_pending_key(lane), job_id)
+    await redis.sadd(LANES_KEY, lane)
+    return job_id
+
+
+async def get_job(redis, job_id: str):
+    job = await redis.hgetall(_job_key(job_id))
+    return _decode(job) if job else None
+
+
+async def job_events(redis, job_id: str, after: int = 0):
+    """
+    Async iterator over the job's events with seq > after: the stored ones,
+    then live ones until the final event. Yields None every KEEPALIVE seconds
+    without events.
+    """
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(_events_key(job_id))  # before reading the log: nothing falls in between
+    try:
+        for raw in await redis.lrange(_events_key(job_id), 0, -1):
+            event = json.loads(raw)
+            if event["seq"] > after:
+                after = event["seq"]
+                yield event
+                if event["stage"] in FINAL_STAGES:
+                    return
+
+        job = await redis.hgetall(_job_key(job_id))
+        if job.get("status") in FINAL_STAGES:  # finished, events expired or never recorded
+            yield {"seq": after + 1, "stage": job["status"], "status": job["status"], "error": job.get("error")}
+            return
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=KEEPALIVE)
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message["data"])
+            if event["seq"] <= after:
+                continue
+            after = event["seq"]
+            yield event
+            if event["stage"] in FINAL_STAGES:
+                return
+    finally:
+        await pubsub.unsubscribe(_events_key(job_id))
+        await pubsub.close()
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+def _dispatch(redis, lease: str):
+    """Claim the job chosen by the scheduler under `lease`; returns its id or None."""
+    lanes = sorted(redis.smembers(LANES_KEY))
+    if not lanes:
+        return None
+
+    pipe = redis.pipeline()
+    for lane in lanes:
+        pipe.lindex(_pending_key(lane), -1)
+    head_ids = pipe.execute()
+
+    pipe = redis.pipeline()
+    for job_id in head_ids:
+        if job_id:
+            pipe.hget(_job_key(job_id), "enqueued_at")
+    enqueued = iter(pipe.execute())
+
+    heads = {}
+    for lane, job_id in zip(lanes, head_ids):
+        if job_id:
+            heads[tuple(lane.split("|", 1))] = float(next(enqueued) or 0)
+
+    vtimes = {tuple(lane.split("|", 1)): float(v) for lane, v in redis.hgetall(VTIME_KEY).items()}
+    clock = {cls: float(v) for cls, v in redis.hgetall(VCLOCK_KEY).items()}
+    chosen = select_lane(heads, vtimes, clock, time.time())
+    if chosen is None:
+        return None
+
+    lane = "|".join(chosen)
+    now = time.time()
+    job_id = redis.register_script(_CLAIM)(
+        keys=[_pending_key(lane), PROCESSING_KEY, LEASES_KEY],
+        args=[now + VISIBILITY_TIMEOUT, now, lease, _job_key("")],
+    )
+    if job_id:
+        vtime = vtimes.get(chosen, 0.0)
+        redis.hset(VCLOCK_KEY, chosen[0], vtime)
+        redis.hset(VTIME_KEY, lane, charge(vtime, chosen[1]))
+    return job_id
+
+
+def claim_job(redis, timeout: float = 5, poll_interval: float = 0.5):
+    """
+    Wait up to `timeout` seconds for a job; returns the decoded job or None.
+    job["lease"] is the token to pass to extend_lease / complete_job / fail_job.
+    """
+    deadline = time.time() + timeout
+    lease = uuid.uuid4().hex
+    job_id = _dispatch(redis, lease)
+    while not job_id:
+        if time.time() >= deadline:
+            return None
+        time.sleep(poll_interval)
+        job_id = _dispatch(redis, lease)
+
+    job = _decode(redis.hgetall(_job_key(job_id)))
+    publish_event(redis, job_id, {"stage": "started", "status": "running", "attempt": job["attempts"]})
+    return job
+
+
+def extend_lease(redis, job_id: str, lease: str) -> bool:
+    """Push the lease deadline back; False once `lease` no longer holds the job."""
+    return bool(redis.register_script(_EXTEND)(
+        keys=[_job_key(job_id), LEASES_KEY], args=[job_id, lease, time.time() + VISIBILITY_TIMEOUT],
+    ))
+
+
+def publish_event(redis, job_id: str, event: dict) -> int:
+    """Append a progress event to the job's log and publish it; returns its seq."""
+    seq = redis.hincrby(_job_key(job_id), "events", 1)
+    raw = json.dumps({"seq": seq, "time": time.time(), **event}, ensure_ascii=False, default=str)
+    pipe = redis.pipeline(transaction=False)
+    pipe.rpush(_events_key(job_id), raw)
+    pipe.ltrim(_events_key(job_id), -EVENTS_MAX, -1)
+    pipe.expire(_events_key(job_id), RESULT_TTL)
+    pipe.publish(_events_key(job_id), raw)
+    pipe.execute()
+    return seq
+
+
+def set_progress(redis, job_id: str, stage: str, **event):
+    """Record the job's current stage and publish the event."""
+    redis.hset(_job_key(job_id), mapping={"stage": stage, "updated_at": time.time()})
+    publish_event(redis, job_id, {"stage": stage, **event})
+
+
+def complete_job(redis, job_id: str, lease: str, result: dict) -> bool:
+    """Store the result if `lease` still holds the job; returns False (nothing stored) otherwise."""
+    done = redis.register_script(_COMPLETE)(
+        keys=[_job_key(job_id), PROCESSING_KEY, LEASES_KEY],
+        args=[job_id, lease, json.dumps(result, ensure_ascii=False, default=str), time.time(), RESULT_TTL],
+    )
+    if done:
+        publish_event(redis, job_id, {"stage": "done", "status": "done"})
+    return bool(done)
+
+
+def _fail(redis, job_id: str, lease: str, error: str, retry: bool, expired_before=""):
+    outcome = redis.register_script(_FAIL)(
+        keys=[_job_key(job_id), PROCESSING_KEY, LEASES_KEY, VTIME_KEY, VCLOCK_KEY, LANES_KEY],
+        args=[job_id, lease, error, int(retry), time.time(), RESULT_TTL, MAX_ATTEMPTS, PENDING_PREFIX,
+              expired_before],
+    )
+    if outcome < 0:
+        return None
+    retry = bool(outcome)
+    publish_event(redis, job_id, {"stage": "retrying" if retry else "failed",
+                                  "status": "queued" if retry else "failed", "error": error})
+    return retry
+
+
+def fail_job(redis, job_id: str, lease: str, error: str, retry: bool = True) -> bool:
+    """
+    Record a failed attempt. Retries until max_attempts unless retry=False
+    (permanent errors). Returns True if the job was requeued for another try;
+    nothing happens (returns True, the job is someone else's) if `lease` no
+    longer holds it.
+    """
+    outcome = _fail(redis, job_id, lease, error, retry)
+    return True if outcome is None else outcome
+
+
+def requeue_expired(redis) -> int:
+    """
+    Recover jobs whose worker stopped heartbeating (crashed / killed): the attempt
+    counts as failed and the job is retried or marked failed, and the lost worker's
+    lease token stops working. Also picks up ids left in jobs:processing without a
+    lease (claimed before claims were atomic). Safe to call from several workers at
+    once: the lease is checked and taken in one script, so each job is recovered
+    once. Returns the number of jobs recovered.
+    """
+    now = time.time()
+    error = "visibility timeout expired (worker lost)"
+    recovered = 0
+
+    for job_id in redis.zrangebyscore(LEASES_KEY, "-inf", now):
+        lease = redis.hget(_job_key(job_id), "lease") or ""
+        if _fail(redis, job_id, lease, error, True, expired_before=now) is not None:
+            recovered += 1
+
+    leased = set(redis.zrange(LEASES_KEY, 0, -1))
+    for job_id in redis.lrange(PROCESSING_KEY, 0, -1):
+        if job_id in leased:
+            continue
+        updated_at = float(redis.hget(_job_key(job_id), "updated_at") or 0)
+        if updated_at < now - VISIBILITY_TIMEOUT and _fail(redis, job_id, "", error, True, expired_before=now) is not None:
+            recovered += 1
+
+    return recovered
@@ -1,9 +1,13 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from api.app.routers import auth, transexions, notify, documents, user
+from api.app.routers import auth, transexions, notify, documents, user, jobs, metrics
 from api.app.utils import security
-from api.app import config
+from api.app import cache, config, sessions
 from api.app.redis_client import get_redis
+from api.app.db import get_db, close_db
+from api.app.utils.file_handler import MAX_UPLOAD_BYTES
+import asyncio
 import dotenv
 import os
 
@@ -23,20 +27,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Routers
+# Reject oversized bodies before the multipart parser spools them to disk
+# (chunked requests without a Content-Length are capped while they are copied)
+@app.middleware("http")
+async def limit_body_size(request: Request, call_next):
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES + 2 ** 20:
+        return JSONResponse({"detail": f"Request body larger than {MAX_UPLOAD_BYTES // 2 ** 20} MiB"}, status_code=413)
+    return await call_next(request)
+
+# Routers (session token required when AUTH_REQUIRED=1; /notify takes gateway webhooks)
+protected = [Depends(sessions.require_session)]
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
-app.include_router(user.router, prefix="/profile", tags=["User"])
-app.include_router(transexions.router, prefix="/transexions", tags=["Transexions"])
+app.include_router(user.router, prefix="/profile", tags=["User"], dependencies=protected)
+app.include_router(transexions.router, prefix="/transexions", tags=["Transexions"], dependencies=protected)
 app.include_router(notify.router, prefix="/notify", tags=["Notifications"])
-app.include_router(documents.router, prefix="/documents", tags=["Documents"])
+app.include_router(documents.router, prefix="/documents", tags=["Documents"], dependencies=protected)
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"], dependencies=protected)
+app.include_router(metrics.router, tags=["Metrics"])
 
 @app.on_event("startup")
 async def startup_event():
     app.state.redis = await get_redis()
+    app.state.cache_listener = asyncio.create_task(cache.listen(app.state.redis))
+    await get_db()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    app.state.cache_listener.cancel()
     await app.state.redis.close()
+    await close_db()
 
 @app.get("/")
 async def home():
@@ -0,0 +1,30 @@
+"""
+Cross-process view of nlpPipelne.Metrics.
+
+Worker processes publish a snapshot of their registry to Redis
+(metrics:worker:{host}:{pid}); /metrics merges those with the API process'
+own registry.
+"""
+import json
+import os
+import socket
+
+from nlpPipelne import Metrics
+
+WORKER_KEY_PREFIX = "metrics:worker:"
+SNAPSHOT_TTL = 3600  # a worker that stopped publishing drops out after an hour
+
+
+def publish(redis):
+    """Store this process' snapshot (sync client, called by workers)."""
+    key = f"{WORKER_KEY_PREFIX}{socket.gethostname()}:{os.getpid()}"
+    redis.set(key, json.dumps(Metrics.snapshot()), ex=SNAPSHOT_TTL)
+
+
+async def collect(redis) -> str:
+    """Prometheus text for the API process plus every live worker."""
+    snapshots = [Metrics.snapshot()]
+    keys = [key async for key in redis.scan_iter(match=f"{WORKER_KEY_PREFIX}*", count=100)]
+    if keys:
+        snapshots += [json.loads(raw) for raw in await redis.mget(keys) if raw]
+    return Metrics.render(Metrics.merge(snapshots))
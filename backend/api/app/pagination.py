@@ -0,0 +1,63 @@
+# backend/api/app/pagination.py
+"""
+Keyset pagination and column projection for list endpoints.
+
+    ?limit=50&fields=doc_id,title,created_at      first page, newest first
+    ?limit=50&cursor=<next_cursor>                 following pages
+
+Rows are ordered by their serial primary key (descending, which is also
+created_at order) and a page is "key < cursor LIMIT n": the cost of a page
+does not grow with how deep it is, unlike OFFSET. next_cursor is null on the
+last page.
+"""
+import os
+import re
+
+from fastapi import HTTPException
+
+from api.app import cache
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000))
+
+_COLUMN = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def columns(fields: str, key: str) -> str:
+    """select() column list for ?fields=a,b (always including the cursor key), or "*"."""
+    if not fields or fields.strip() == "*":
+        return "*"
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    bad = [name for name in names if not _COLUMN.match(name)]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(bad)}")
+    if key not in names:
+        names.insert(0, key)
+    return ",".join(dict.fromkeys(names))
+
+
+def page_size(limit: int) -> int:
+    if limit is None:
+        return PAGE_SIZE
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def page(rows: list, key: str, limit: int) -> dict:
+    """{"rows", "next_cursor"} from limit + 1 fetched rows."""
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {"rows": rows, "next_cursor": rows[-1][key] if more and rows else None}
+
+
+async def cached_page(namespace: str, entry, query, key: str, cursor=None, limit: int = None, fields: str = None):
+    """
+    (page, cache tier) of query(columns, after, limit), cached per page and
+    projection as fields of the (namespace, entry) cache entry, so invalidating
+    the entry drops every page of it.
+    """
+    select, size = columns(fields, key), page_size(limit)
+    rows, tier = await cache.load(namespace, entry, lambda: query(select, cursor, size),
+                                  field=f"{cursor or ''}|{size}|{select}")
+    return page(rows, key, size), tier
@@ -1,17 +1,37 @@
 from redis import asyncio as aioredis
+from redis import Redis
 import os
 import dotenv
 
 dotenv.load_dotenv()
 
 redis = None
+sync_redis = None
+fake_server = None
+
+# REDIS_BACKEND=fake uses an in-process fakeredis server (local runs, load tests)
+REDIS_BACKEND = os.getenv("REDIS_BACKEND", "redis")
 
 REDIS_HOST = os.getenv("REDIS_HOST", "redis-15041.crce179.ap-south-1-1.ec2.redns.redis-cloud.com")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 15041))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", "VK15bQhwwywvG3TvLB8lnJzfv2GTu9j2")
 
+def _fake_server():
+    global fake_server
+    if fake_server is None:
+        try:
+            import fakeredis
+        except ImportError as e:
+            raise SystemExit("REDIS_BACKEND=fake needs fakeredis:\n\n  pip install -r api/requirements-local.txt\n") from e
+        fake_server = fakeredis.FakeServer()
+    return fake_server
+
 async def get_redis():
     global redis
+    if not redis and REDIS_BACKEND == "fake":
+        import fakeredis
+        # unbounded like the real client's pool (fakeredis defaults to 100 connections)
+        redis = fakeredis.aioredis.FakeRedis(server=_fake_server(), decode_responses=True, max_connections=2 ** 31)
     if not redis:
         redis = await aioredis.from_url(
             f"redis://{REDIS_HOST}:{REDIS_PORT}",
@@ -19,3 +39,19 @@ async def get_redis():
             decode_responses=True
         )
     return redis
+
+
+def get_sync_redis():
+    """Blocking client for worker processes (no event loop)."""
+    global sync_redis
+    if not sync_redis and REDIS_BACKEND == "fake":
+        import fakeredis
+        sync_redis = fakeredis.FakeRedis(server=_fake_server(), decode_responses=True)
+    if not sync_redis:
+        sync_redis = Redis(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            password=REDIS_PASSWORD,
+            decode_responses=True
+        )
+    return sync_redis
@@ -0,0 +1,105 @@
+# backend/api/app/repository.py
+"""
+Async queries used by the routers (one function per query, results as rows).
+"""
+from api.app.db import get_db
+
+
+async def _rows(query) -> list:
+    return (await query.execute()).data or []
+
+
+async def _page(query, key: str, after=None, limit: int = None) -> list:
+    """Rows newest first by the serial key, after the cursor (limit + 1 to detect a next page)."""
+    query = query.order(key, desc=True)
+    if after is not None:
+        query = query.lt(key, after)
+    if limit:
+        query = query.limit(limit + 1)
+    return await _rows(query)
+
+
+async def _first(query):
+    rows = await _rows(query)
+    return rows[0] if rows else None
+
+
+# ---- Users ----
+async def get_user(user_id: str, columns: str = "*"):
+    db = await get_db()
+    return await _first(db.table("users").select(columns).eq("id", user_id))
+
+
+async def find_users(column: str, value: str, columns: str = "*") -> list:
+    db = await get_db()
+    return await _rows(db.table("users").select(columns).eq(column, value))
+
+
+async def profile(user_id: str) -> list:
+    """User rows without the password hash (safe to cache)."""
+    return [{k: v for k, v in row.items() if k != "password"} for row in await find_users("id", user_id)]
+
+
+async def create_user(values: dict):
+    db = await get_db()
+    return await _first(db.table("users").insert(values))
+
+
+async def update_user(user_id: str, values: dict) -> list:
+    db = await get_db()
+    return await _rows(db.table("users").update(values).eq("id", user_id))
+
+
+# ---- Departments ----
+async def department_id(name: str):
+    db = await get_db()
+    dept = await _first(db.table("departments").select("dept_id").eq("name", name))
+    return dept["dept_id"] if dept else None
+
+
+async def department_name(dept_id):
+    db = await get_db()
+    dept = await _first(db.table("departments").select("name").eq("dept_id", dept_id))
+    return dept["name"] if dept else None
+
+
+async def create_department(name: str):
+    db = await get_db()
+    return await _first(db.table("departments").insert({"name": name}))
+
+
+# ---- Documents ----
+async def department_documents(dept_id, columns: str = "*", after=None, limit: int = None) -> list:
+    db = await get_db()
+    return await _page(db.table("documents").select(columns).eq("department", dept_id), "doc_id", after, limit)
+
+
+async def summary(doc_id: str):
+    db = await get_db()
+    return await _first(db.table("summaries").select("content").eq("doc_id", doc_id))
+
+
+async def compliances(doc_id: str, columns: str = "*", after=None, limit: int = None) -> list:
+    db = await get_db()
+    return await _page(db.table("compliances").select(columns).eq("doc_id", doc_id), "id", after, limit)
+
+
+# ---- Views / transexions ----
+async def views(user_id: str, columns: str = "*", after=None, limit: int = None) -> list:
+    db = await get_db()
+    return await _page(db.table("views").select(columns).eq("user_id", user_id), "id", after, limit)
+
+
+async def has_viewed(user_id: str, doc_id: str) -> bool:
+    db = await get_db()
+    return bool(await _rows(db.table("views").select("*").eq("user_id", user_id).eq("doc_id", doc_id)))
+
+
+async def log_view(user_id: str, doc_id: str):
+    db = await get_db()
+    return await _first(db.table("views").insert({"user_id": user_id, "doc_id": doc_id}))
+
+
+async def transexions_from(user_id: str, columns: str = "*", after=None, limit: int = None) -> list:
+    db = await get_db()
+    return await _page(db.table("transexions").select(columns).eq("from_user", user_id), "id", after, limit)
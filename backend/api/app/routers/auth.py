@@ -1,54 +1,44 @@
-from fastapi import APIRouter, HTTPException
-from httpx import request
-from api.app.config import supabase
+from fastapi import APIRouter, Depends, HTTPException
+from api.app import repository, sessions
 from api.app.schemas.models import LoginRequest, RegisterRequest
-from api.app.utils.security import hash_password, verify_password
+from api.app.utils.security import hash_password_async, verify_password_async
 
 router = APIRouter()
 
 @router.post("/register")
 async def register(request: RegisterRequest):
-    response = supabase.table("users").select("*").eq("email", request.email).execute()
-    if response.data:
+    if await repository.find_users("email", request.email, "id"):
         raise HTTPException(status_code=400, detail="User already exists")
 
-    hashed_password = hash_password(request.password)
+    hashed_password = await hash_password_async(request.password)
 
-    dept_resp = supabase.table("departments").select("dept_id").eq("name", request.department).execute()
-    if not dept_resp.data:
+    dept_id = await repository.department_id(request.department)
+    if dept_id is None:
         raise HTTPException(status_code=400, detail="Department not found")
-    dept_id = dept_resp.data[0]["dept_id"]
 
-    response_1 = supabase.table("users").insert({
+    user = await repository.create_user({
         "email": request.email,
         "password": hashed_password,
         "role": request.role,
         "name": request.name,
         "department": dept_id,
         "phone": request.phone
-    }).execute()
-    return {"success": True, "message": "User registered successfully","user_id" : response_1.data[0]["id"]}
+    })
+    return {"success": True, "message": "User registered successfully","user_id" : user["id"]}
 
 
 @router.post("/login")
 async def login(request: LoginRequest):
     try:
         # Fetch user by ID
-        response = (
-            supabase.table("users")
-            .select("*")
-            .eq("id", request.user_id)
-            .execute()
-        )
-
-        if not response.data:
+        user = await repository.get_user(request.user_id)
+        if not user:
             raise HTTPException(status_code=401, detail="Invalid credentials")
 
-        user = response.data[0]
-
-        # Successful login
-        if verify_password(request.password, user["password"]):
-            return {"success": True, "message": "Login successful", "user": user}
+        # Successful login (bcrypt runs on the password thread pool, not the event loop)
+        if await verify_password_async(request.password, user["password"]):
+            user = {k: v for k, v in user.items() if k != "password"}
+            return {"success": True, "message": "Login successful", "user": user, **sessions.issue(user)}
         else:
             raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -59,7 +49,20 @@ async def login(request: LoginRequest):
         print("Login error:", str(e))
         raise HTTPException(status_code=500, detail="Login failed. Please try again.")
 
+@router.post("/logout")
+async def logout(all_sessions: bool = False, claims: dict = Depends(sessions.current_user)):
+    """Revoke this token, or with all_sessions=true every token issued to the user so far."""
+    if all_sessions:
+        await sessions.revoke_user(claims["sub"])
+        return {"success": True, "message": "Logged out of all sessions"}
+    await sessions.revoke(claims)
+    return {"success": True, "message": "Logged out"}
+
+@router.get("/me")
+async def me(claims: dict = Depends(sessions.current_user)):
+    return {"user_id": claims["sub"], "role": claims["role"], "expires_at": claims["exp"]}
+
 @router.post("/department")
 async def create_department(name: str):
-    response = supabase.table("departments").insert({"name": name}).execute()
-    return {"success": True, "message": response.data[0]}
\ No newline at end of file
+    department = await repository.create_department(name)
+    return {"success": True, "message": department}
\ No newline at end of file
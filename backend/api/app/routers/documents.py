@@ -1,165 +1,136 @@
-import os
-import aiohttp
-import cloudinary.uploader
+import asyncio
+
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from api.app.config import supabase
-from api.app.schemas.models import URLRequest, SUMMARYRequest, ListDocsRequest, compliancesRequest, searchRequest
-from nlpPipelne.ProcessPipeline import process_file
-from nlpPipelne.stages.EmbedIndex import search
-import json
+from api.app import cache, config, pagination, repository
+from api.app.job_queue import new_job_id, enqueue_job
+from api.app.schemas.models import URLRequest, SUMMARYRequest, ListDocsRequest, compliancesRequest, searchRequest, batchSearchRequest
+from api.app.utils.file_handler import UploadTooLarge, job_file_path, remove_job_files, save_upload_hashed
+from nlpPipelne.stages.EmbedIndex import MAX_BATCH_QUERIES, search, search_batch
 from fastapi import Request
 
 router = APIRouter()
 
-UPLOAD_DIR = "./temp"
-
 @router.post("/url")
-async def receive_url(request: URLRequest):
-    file_url = request.url
-    filename = file_url.split("/")[-1]
-    file_location = os.path.join(UPLOAD_DIR, filename)
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(file_url) as resp:
-            if resp.status != 200:
-                raise HTTPException(status_code=400, detail="Download failed")
-            content = await resp.read()
-            with open(file_location, "wb") as f:
-                f.write(content)
-
-    output = await process_file(file_location)
-    upload_result = cloudinary.uploader.upload(content, resource_type="auto")
-
-    dept_resp = supabase.table("departments").select("dept_id").eq("name", request.dept_name).execute()
-    if not dept_resp.data:
-        raise HTTPException(status_code=400, detail="Department not found")
-    dept_id = dept_resp.data[0]["dept_id"]
-
-    doc_resp = supabase.table("documents").insert({
-        "title": filename,
-        "department": dept_id,
-        "url": upload_result.get("secure_url"),
-        "medium": "url",
-        "priority": request.priority,
-    }).execute()
-    inserted_doc = doc_resp.data[0] if doc_resp.data else None
-
-    if inserted_doc:
-        doc_id = inserted_doc["doc_id"]
-        supabase.table("summaries").insert({
-            "doc_id": doc_id,
-            "content": output["doc_summary"]
-        }).execute()
-        supabase.table("transexions").insert({
-            "from_user": request.user_id,
-            "to_department": dept_id,
-            "doc_id": doc_id
-        }).execute()
-
-    os.remove(file_location)
-    return {
-        "document": doc_resp.data,
+async def receive_url(request: URLRequest, http_request: Request):
+    """Queue a remote file for processing; poll /jobs/{job_id} for the result."""
+    filename = request.url.split("/")[-1]
+    job_id = new_job_id()
+
+    await enqueue_job(http_request.app.state.redis, job_id, "url", {
+        "url": request.url,
         "filename": filename,
-        "processed": output,
-        "cloudinary_url": upload_result.get("secure_url")
-    }
+        "file_location": job_file_path(job_id, filename),
+        "user_id": request.user_id,
+        "dept_name": request.dept_name,
+        "priority": request.priority,
+        "previous_file_hash": request.previous_file_hash,
+    }, priority=request.priority, department=request.dept_name)
+    return {"job_id": job_id, "status": "queued", "filename": filename}
 
 @router.post("/file")
 async def receive_file(
+    request: Request,
     file: UploadFile = File(...),
     user_id: str = Form(...),
     dept_name: str = Form(...),
-    priority: str = Form(...)
+    priority: str = Form(...),
+    previous_file_hash: str = Form(None)
 ):
-    file_location = os.path.join(UPLOAD_DIR, file.filename)
-    content = await file.read()
-    with open(file_location, "wb") as f:
-        f.write(content)
-
+    """
+    Store the upload and queue it for processing; poll /jobs/{job_id} for the result.
+    previous_file_hash: the version this file replaces (only its changed chunks are reprocessed).
+    """
+    job_id = new_job_id()
+    file_location = job_file_path(job_id, file.filename)
     try:
-        output = await process_file(file_location)
-
-        dept_resp = supabase.table("departments").select("dept_id").eq("name", dept_name).execute()
-        if not dept_resp.data:
-            raise HTTPException(status_code=400, detail="Department not found")
-        dept_id = dept_resp.data[0]["dept_id"]
-
-        upload_result = cloudinary.uploader.upload(content, resource_type="auto")
-
-        doc_resp = supabase.table("documents").insert({
-            "title": file.filename,
-            "department": dept_id,
-            "url": upload_result.get("secure_url"),
-            "medium": "direct file",
-            "priority": priority,
-        }).execute()
-        inserted_doc = doc_resp.data[0] if doc_resp.data else None
-
-        if inserted_doc:
-            doc_id = inserted_doc["doc_id"]
-            supabase.table("summaries").insert({
-                "doc_id": doc_id,
-                "content": output.get("doc_summary", "")
-            }).execute()
-            supabase.table("transexions").insert({
-                "from_user": user_id,
-                "to_department": dept_id,
-                "doc_id": doc_id
-            }).execute()
-
-    finally:
-        os.remove(file_location)
-
-    return {
-        "document": doc_resp.data,
+        file_hash = await save_upload_hashed(file, file_location)
+    except UploadTooLarge as e:
+        remove_job_files(job_id)
+        raise HTTPException(status_code=413, detail=str(e))
+
+    await enqueue_job(request.app.state.redis, job_id, "file", {
         "filename": file.filename,
-        "processed": output,
-        "cloudinary_url": upload_result.get("secure_url")
-    }
+        "file_location": file_location,
+        "file_hash": file_hash,
+        "user_id": user_id,
+        "dept_name": dept_name,
+        "priority": priority,
+        "previous_file_hash": previous_file_hash,
+    }, priority=priority, department=dept_name)
+    return {"job_id": job_id, "status": "queued", "filename": file.filename}
 
 @router.get("/summary")
 async def summary(request: SUMMARYRequest):
-    response = supabase.table("summaries").select("content") \
-        .eq("doc_id", request.doc_id).execute()
-    if response.data:
-        return {"summary": response.data[0]["content"]}
+    row = await cache.get_or_load("summary", request.doc_id, lambda: repository.summary(request.doc_id))
+    if row:
+        return {"summary": row["content"]}
     return {"error": "No summary found"}
 
 @router.get("/listdocs")
-async def listdocs(request: Request, user_id: str):
-    redis_conn = request.app.state.redis
-    cache_key = f"user_docs:{user_id}"
-
-    # Check if cached
-    cached_data = await redis_conn.get(cache_key)
-    if cached_data:
-        return {"data": json.loads(cached_data), "cached": True}
-
+async def listdocs(user_id: str, cursor: int = None, limit: int = None, fields: str = None):
+    """Department documents, newest first; pass next_cursor back as cursor for the next page."""
     # Fetch department ID
-    dept_resp = supabase.table("users").select("department").eq("id", user_id).execute()
-    if not dept_resp.data:
+    user = await cache.get_or_load("profile", user_id, lambda: repository.profile(user_id))
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    dept_id = dept_resp.data[0]["department"]
-
-    # Fetch documents
-    response = supabase.table("documents").select("*").eq("department", dept_id).execute()
-    if not response.data:
+    # Fetch documents (invalidated by the worker when the department gets a new one)
+    dept_id = user[0]["department"]
+    docs, tier = await pagination.cached_page(
+        "dept_docs", dept_id, lambda *page: repository.department_documents(dept_id, *page),
+        "doc_id", cursor, limit, fields)
+    if not docs["rows"]:
         return {"error": "No docs found"}
 
-    # Cache result for 60 seconds
-    await redis_conn.set(cache_key, json.dumps(response.data), ex=60)
-
-    return {"data": response.data, "cached": False}
+    return {"data": docs["rows"], "next_cursor": docs["next_cursor"], "cached": tier != "miss"}
 
 @router.get("/compliances")
-async def compliances(request: compliancesRequest):
-    response = supabase.table("compliances").select("*").eq("doc_id", request.doc_id).execute()
-    if response.data:
-        return {"data": response.data}
+async def compliances(request: compliancesRequest, cursor: int = None, limit: int = None, fields: str = None):
+    rows, _ = await pagination.cached_page(
+        "compliances", request.doc_id, lambda *page: repository.compliances(request.doc_id, *page),
+        "id", cursor, limit, fields)
+    if rows["rows"]:
+        return {"data": rows["rows"], "next_cursor": rows["next_cursor"]}
     return {"error": "No compliances found"}
 
+def _check_top_k(top_k: int):
+    if not 1 <= top_k <= 100:
+        raise HTTPException(status_code=400, detail="top_k must be between 1 and 100")
+
+
 @router.get("/search")
 async def search_docs(request: searchRequest):
-    results = search(request.query)
+    # Off the event loop: encoding a new query takes a model call
+    _check_top_k(request.top_k)
+    results = await asyncio.to_thread(search, request.query, request.top_k, filters=request.filters)
+    return {"results": results}
+
+
+@router.post("/search/batch")
+async def search_docs_batch(request: batchSearchRequest):
+    """Several queries in one model call and one index search."""
+    _check_top_k(request.top_k)
+    if not 1 <= len(request.queries) <= MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {MAX_BATCH_QUERIES} queries")
+    results = await asyncio.to_thread(search_batch, request.queries, request.top_k, filters=request.filters)
+    return {"results": [{"query": q, "results": r} for q, r in zip(request.queries, results)]}
+
+
+@router.get("/keyword_search")
+async def keyword_search(q: str = None, entity: str = None, label: str = None, limit: int = 20):
+    """
+    Full-text search over chunk text (q: web search syntax) and/or extracted
+    entities (entity, label), on the Postgres GIN indexes.
+    """
+    if not config.PG_DOCUMENT_STORE:
+        raise HTTPException(status_code=503, detail="Keyword search needs PG_DOCUMENT_STORE=1")
+    if not (q or entity or label):
+        raise HTTPException(status_code=400, detail="Pass q, entity or label")
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    try:
+        from nlpPipelne.PgDocumentStore import get_store
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=str(e).strip())
+    results = await asyncio.to_thread(lambda: get_store().search(q, entity, label, limit))
     return {"results": results}
\ No newline at end of file
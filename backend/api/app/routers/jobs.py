@@ -0,0 +1,60 @@
+import json
+
+from fastapi import APIRouter, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from api.app.job_queue import get_job, job_events
+
+router = APIRouter()
+
+@router.get("/{job_id}")
+async def job_status(request: Request, job_id: str):
+    job = await get_job(request.app.state.redis, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job_id,
+        "status": job.get("status"),
+        "stage": job.get("stage"),
+        "attempts": job.get("attempts"),
+        "error": job.get("error"),
+        "result": job.get("result"),
+    }
+
+
+@router.get("/{job_id}/events")
+async def job_progress_sse(request: Request, job_id: str, after: int = 0, last_event_id: int = Header(None)):
+    """
+    Server-Sent Events: the job's progress events (see api.app.job_queue), from
+    the start or after Last-Event-ID on reconnect; the stream ends with the
+    "done" or "failed" event. Fetch /jobs/{job_id} for the full result.
+    """
+    redis = request.app.state.redis
+    if not await get_job(redis, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        async for event in job_events(redis, job_id, last_event_id or after):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"id: {event['seq']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/{job_id}/ws")
+async def job_progress_ws(websocket: WebSocket, job_id: str, after: int = 0):
+    """The same events as /jobs/{job_id}/events, one JSON message each."""
+    redis = websocket.app.state.redis
+    await websocket.accept()
+    if not await get_job(redis, job_id):
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    try:
+        async for event in job_events(redis, job_id, after):
+            if event is not None:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from api.app.metrics import collect
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint (stage / model-call histograms, cache counters)."""
+    return PlainTextResponse(
+        await collect(request.app.state.redis),
+        media_type="text/plain; version=0.0.4"
+    )
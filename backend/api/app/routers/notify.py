@@ -1,102 +1,41 @@
-from fastapi import APIRouter, Form, UploadFile, File
-import os
-from nlpPipelne.ProcessPipeline import process_file
-from api.app.config import supabase
-import cloudinary.uploader
+from fastapi import APIRouter, Form, UploadFile, File, Request, HTTPException
+from api.app import repository
+from api.app.job_queue import new_job_id, enqueue_job
+from api.app.utils.file_handler import UploadTooLarge, job_file_path, remove_job_files, save_upload_hashed
 
 router = APIRouter()
 
-UPLOAD_DIR = "./temp"
-
-@router.post("/email")
-async def send_email(file: UploadFile = File(...), emailAdr: str = Form(...)):
-    print(f"Received file: {file.filename} from email: {emailAdr}")
-    file_location = os.path.join(UPLOAD_DIR, file.filename)
-    content = await file.read()
-    with open(file_location, "wb") as f:
-        f.write(content)
-
+async def _sender_department(sender: dict) -> str:
+    """Department name of the user with this email / phone; "unknown" for unknown senders."""
+    (column, value), = sender.items()
+    users = await repository.find_users(column, value, "department")
+    name = await repository.department_name(users[0]["department"]) if users else None
+    return name or "unknown"
+
+async def _queue_upload(request: Request, file: UploadFile, kind: str, sender: dict):
+    # Scheduled in the sender's department lane, like direct uploads (the channel is in the payload)
+    department = await _sender_department(sender)
+    job_id = new_job_id()
+    file_location = job_file_path(job_id, file.filename)
     try:
-        output = process_file(file_location)
-        user_id = supabase.table("users").select("id").eq("email", emailAdr).execute().data[0]["id"]
-        dept_id = supabase.table("users").select("department").eq("email", emailAdr).execute().data[0]["department"]
-
-        upload_result = cloudinary.uploader.upload(content, resource_type="auto")
+        file_hash = await save_upload_hashed(file, file_location)
+    except UploadTooLarge as e:
+        remove_job_files(job_id)
+        raise HTTPException(status_code=413, detail=str(e))
 
-        doc_resp = supabase.table("documents").insert({
-            "title": file.filename,
-            "department": dept_id,
-            "url": upload_result.get("secure_url"),
-            "doc_type": "general",
-            "medium": "email",
-            "priority": "normal",
-        }).execute()
-        inserted_doc = doc_resp.data[0] if doc_resp.data else None
-
-        if inserted_doc:
-            doc_id = inserted_doc["doc_id"]
-            supabase.table("summaries").insert({
-                "doc_id": doc_id,
-                "content": output.get("doc_summary", "")
-            }).execute()
-            supabase.table("transexions").insert({
-                "from_user": user_id,
-                "to_department": dept_id,
-                "doc_id": doc_id
-            }).execute()
-
-    finally:
-        os.remove(file_location)
-
-    return {
-        "document": doc_resp.data,
+    await enqueue_job(request.app.state.redis, job_id, kind, {
         "filename": file.filename,
-        "processed": output,
-        "cloudinary_url": upload_result.get("secure_url")
-    }
-
-@router.post("/whatsapp")
-async def send_message(file: UploadFile = File(...), phone: str = Form(...)):
-    file_location = os.path.join(UPLOAD_DIR, file.filename)
-    content = await file.read()
-    with open(file_location, "wb") as f:
-        f.write(content)
+        "file_location": file_location,
+        "file_hash": file_hash,
+        **sender,
+    }, priority="normal", department=department)
+    return {"job_id": job_id, "status": "queued", "filename": file.filename}
 
-    try:
-        output = process_file(file_location)
-        user_id = supabase.table("users").select("id").eq("phone", phone).execute().data[0]["id"]
-        dept_id = supabase.table("users").select("department").eq("phone", phone).execute().data[0]["department"]
-
-        upload_result = cloudinary.uploader.upload(content, resource_type="auto")
-
-        doc_resp = supabase.table("documents").insert({
-            "title": file.filename,
-            "department": dept_id,
-            "url": upload_result.get("secure_url"),
-            "doc_type": "general",
-            "medium": "whatsapp",
-            "priority": "normal",
-        }).execute()
-        inserted_doc = doc_resp.data[0] if doc_resp.data else None
-
-        if inserted_doc:
-            doc_id = inserted_doc["doc_id"]
-            supabase.table("summaries").insert({
-                "doc_id": doc_id,
-                "content": output.get("doc_summary", "")
-            }).execute()
-            supabase.table("transexions").insert({
-                "from_user": user_id,
-                "to_department": dept_id,
-                "doc_id": doc_id
-            }).execute()
-
-    finally:
-        os.remove(file_location)
+@router.post("/email")
+async def send_email(request: Request, file: UploadFile = File(...), emailAdr: str = Form(...)):
+    print(f"Received file: {file.filename} from email: {emailAdr}")
+    return await _queue_upload(request, file, "email", {"email": emailAdr})
 
-    return {
-        "document": doc_resp.data,
-        "filename": file.filename,
-        "processed": output,
-        "cloudinary_url": upload_result.get("secure_url")
-    }
+@router.post("/whatsapp")
+async def send_message(request: Request, file: UploadFile = File(...), phone: str = Form(...)):
+    return await _queue_upload(request, file, "whatsapp", {"phone": phone})
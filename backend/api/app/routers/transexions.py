@@ -1,11 +1,12 @@
 from fastapi import APIRouter
-from api.app.config import supabase
+from api.app import pagination, repository
 
 router = APIRouter()
 
 @router.get("/{user_id}")
-async def get_transexions(user_id: str):
-    response = supabase.table("transexions").select("*").eq("from_user", user_id).execute()
-    if not response.data:
+async def get_transexions(user_id: str, cursor: int = None, limit: int = None, fields: str = None):
+    transexions, _ = await pagination.cached_page(
+        "transexions", user_id, lambda *page: repository.transexions_from(user_id, *page), "id", cursor, limit, fields)
+    if not transexions["rows"]:
         return {"message": "No transexions found"}
-    return {"transexions": response.data}
+    return {"transexions": transexions["rows"], "next_cursor": transexions["next_cursor"]}
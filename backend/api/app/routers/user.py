@@ -1,54 +1,50 @@
 from fastapi import APIRouter
-from api.app.config import supabase
+from api.app import cache, pagination, repository
 from api.app.schemas.models import VIEWRequest, changeNameRequest, changePhoneRequest, changeEmailRequest, changeDepartmentRequest
 
 router = APIRouter()
 
+async def _update(user_id: str, values: dict):
+    rows = await repository.update_user(user_id, values)
+    await cache.invalidate(("profile", user_id))
+    return rows
+
 @router.get("/{user_id}")
 async def get_profile(user_id: str):
-    response = supabase.table("users").select("*").eq("id", user_id).execute()
-    return {"user": response.data}
+    return {"user": await cache.get_or_load("profile", user_id, lambda: repository.profile(user_id))}
 
 @router.post("/cname")
 async def change_name(request: changeNameRequest):
-    response = supabase.table("users").update({"name": request.name}).eq("id", request.user_id).execute()
-    return {"user": response.data}
+    return {"user": await _update(request.user_id, {"name": request.name})}
 
 @router.post("/cemail")
 async def change_email(request: changeEmailRequest):
-    response = supabase.table("users").update({"email": request.email}).eq("id", request.user_id).execute()
-    return {"user": response.data}
+    return {"user": await _update(request.user_id, {"email": request.email})}
 
 @router.post("/cphone")
 async def change_phone(request: changePhoneRequest):
-    response = supabase.table("users").update({"phone": request.phone}).eq("id", request.user_id).execute()
-    return {"user": response.data}
+    return {"user": await _update(request.user_id, {"phone": request.phone})}
 
 @router.post("/cdept")
 async def change_department(request: changeDepartmentRequest):
-    dept_response = supabase.table("departments").select("dept_id").eq("name", request.dept_name).execute()
-    if not dept_response.data:
+    dept_id = await repository.department_id(request.dept_name)
+    if dept_id is None:
         return {"error": "Department not found"}
-    dept_id = dept_response.data[0]['dept_id']
-    response = supabase.table("users").update({"department": dept_id}).eq("id", request.user_id).execute()
-    return {"user": response.data}
+    return {"user": await _update(request.user_id, {"department": dept_id})}
 
 @router.get("/history/{user_id}")
-async def history(user_id: str):
-    response = supabase.table("views").select("*").eq("user_id", user_id).execute()
-    if response.data:
-        return {"history": response.data}
+async def history(user_id: str, cursor: int = None, limit: int = None, fields: str = None):
+    views, _ = await pagination.cached_page(
+        "history", user_id, lambda *page: repository.views(user_id, *page), "id", cursor, limit, fields)
+    if views["rows"]:
+        return {"history": views["rows"], "next_cursor": views["next_cursor"]}
     return {"error": "No history found"}
 
 @router.post("/viewed")
 async def viewed(request: VIEWRequest):
-    existing = supabase.table("views").select("*").eq("user_id", request.user_id).eq("doc_id", request.doc_id).execute()
-
-    if existing.data:
+    if await repository.has_viewed(request.user_id, request.doc_id):
         return {"message": "Already viewed"}
 
-    supabase.table("views").insert({
-        "user_id": request.user_id,
-        "doc_id": request.doc_id
-    }).execute()
+    await repository.log_view(request.user_id, request.doc_id)
+    await cache.invalidate(("history", request.user_id))
     return {"message": "View logged"}
@@ -1,3 +1,5 @@
+from typing import Any, Dict, List, Optional
+
 from pydantic import BaseModel
 
 class LoginRequest(BaseModel):
@@ -9,6 +11,7 @@ class URLRequest(BaseModel):
     url: str
     dept_name: str
     priority: str
+    previous_file_hash: Optional[str] = None  # file hash of the version this one replaces
 
 class VIEWRequest(BaseModel):
     user_id: str
@@ -57,4 +60,11 @@ class changeDepartmentRequest(BaseModel):
     dept_name: str
 
 class searchRequest(BaseModel):
-    query: str
\ No newline at end of file
+    query: str
+    top_k: int = 3
+    filters: Optional[Dict[str, Any]] = None
+
+class batchSearchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 3
+    filters: Optional[Dict[str, Any]] = None
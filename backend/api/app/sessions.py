@@ -0,0 +1,106 @@
+# backend/api/app/sessions.py
+"""
+Signed session tokens (JWT) issued by /auth/login.
+
+    claims = Depends(sessions.current_user)   # {"sub": user_id, "role", "jti", "iat", "exp"}
+
+Validating a token needs no database query. The signature and expiry are
+checked in process, and revocation with one Redis MGET. The token comes from
+"Authorization: Bearer ..." or, for EventSource / WebSocket clients, ?token=.
+
+    session:revoked:{jti}             one token (logout), until it would expire
+    session:revoked_before:{user_id}  every token issued to the user before then
+                                      (logout?all_sessions=true)
+
+AUTH_REQUIRED=1 makes the document, profile, transexion and job routes require
+a token (see main.py), and needs SECRET_KEY (shared by every API process): the
+API refuses to start without it. Otherwise a missing SECRET_KEY means a random
+per-process secret.
+"""
+import os
+import secrets
+import time
+import uuid
+
+import dotenv
+from fastapi import HTTPException
+from fastapi.requests import HTTPConnection
+from jose import JWTError, jwt
+
+from api.app.redis_client import get_redis
+
+dotenv.load_dotenv()
+
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0") == "1"
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    if AUTH_REQUIRED:
+        raise RuntimeError("AUTH_REQUIRED=1 needs SECRET_KEY, the same value in every API process")
+    print("SECRET_KEY is not set: tokens are only valid in this process")
+    SECRET_KEY = secrets.token_urlsafe(32)
+SESSION_ALGORITHM = "HS256"
+SESSION_TTL = int(os.getenv("SESSION_TTL", 12 * 3600))  # seconds
+KEY_PREFIX = "session:"
+
+
+def _unauthorized(detail: str):
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+def issue(user: dict) -> dict:
+    """Token response fields for a logged-in user."""
+    now = time.time()
+    claims = {"sub": str(user["id"]), "role": user.get("role"), "jti": uuid.uuid4().hex,
+              "iat": now, "exp": int(now + SESSION_TTL)}
+    return {"access_token": jwt.encode(claims, SECRET_KEY, algorithm=SESSION_ALGORITHM),
+            "token_type": "bearer", "expires_in": SESSION_TTL}
+
+
+async def validate(token: str) -> dict:
+    """Claims of a valid, unrevoked token; 401 otherwise."""
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[SESSION_ALGORITHM])
+    except JWTError:
+        raise _unauthorized("Invalid or expired token")
+
+    redis = await get_redis()
+    revoked, revoked_before = await redis.mget(f"{KEY_PREFIX}revoked:{claims['jti']}",
+                                               f"{KEY_PREFIX}revoked_before:{claims['sub']}")
+    if revoked or (revoked_before and claims["iat"] <= float(revoked_before)):
+        raise _unauthorized("Session revoked")
+    return claims
+
+
+async def revoke(claims: dict):
+    """Log one token out."""
+    ttl = int(claims["exp"] - time.time())
+    if ttl > 0:
+        redis = await get_redis()
+        await redis.set(f"{KEY_PREFIX}revoked:{claims['jti']}", 1, ex=ttl)
+
+
+async def revoke_user(user_id: str):
+    """Log out every session of a user issued until now."""
+    redis = await get_redis()
+    await redis.set(f"{KEY_PREFIX}revoked_before:{user_id}", repr(time.time()), ex=SESSION_TTL)
+
+
+def _token(connection: HTTPConnection):
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return connection.query_params.get("token")  # EventSource / WebSocket clients cannot set headers
+
+
+async def current_user(connection: HTTPConnection) -> dict:
+    """Dependency (HTTP and WebSocket routes): claims of the request's token."""
+    token = _token(connection)
+    if not token:
+        raise _unauthorized("Not authenticated")
+    return await validate(token)
+
+
+async def require_session(connection: HTTPConnection):
+    """Router dependency: current_user() when AUTH_REQUIRED, otherwise nothing."""
+    if AUTH_REQUIRED:
+        await current_user(connection)
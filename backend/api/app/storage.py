@@ -0,0 +1,91 @@
+# backend/api/app/storage.py
+"""
+Object storage for original uploads, selected by STORAGE_BACKEND:
+
+    cloudinary (default)  Cloudinary, configured in config.py
+    local                 files copied under LOCAL_STORAGE_DIR (default ./object_store),
+                          for local runs and load tests
+
+upload_async() starts an upload in a small thread pool as soon as the file is on
+disk, so it runs while the worker processes the same file; failed attempts are
+retried STORAGE_RETRIES times with exponential backoff.
+"""
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import cloudinary.uploader
+
+from nlpPipelne import Metrics
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "cloudinary")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "object_store")
+STORAGE_UPLOAD_THREADS = int(os.getenv("STORAGE_UPLOAD_THREADS", 4))
+STORAGE_RETRIES = int(os.getenv("STORAGE_RETRIES", 3))
+STORAGE_RETRY_BACKOFF = float(os.getenv("STORAGE_RETRY_BACKOFF", 1.0))  # seconds, doubled per retry
+LARGE_FILE_BYTES = int(os.getenv("STORAGE_LARGE_FILE_MB", 20)) * 2 ** 20  # chunked upload above this
+UPLOAD_CHUNK_BYTES = int(os.getenv("STORAGE_CHUNK_MB", 20)) * 2 ** 20
+
+
+class CloudinaryStore:
+    def upload(self, file_path: str) -> str:
+        """Upload a file and return its public URL (chunked for large files)."""
+        if os.path.getsize(file_path) > LARGE_FILE_BYTES:
+            result = cloudinary.uploader.upload_large(file_path, resource_type="auto", chunk_size=UPLOAD_CHUNK_BYTES)
+        else:
+            result = cloudinary.uploader.upload(file_path, resource_type="auto")
+        return result.get("secure_url")
+
+
+class LocalObjectStore:
+    def __init__(self, root=LOCAL_STORAGE_DIR):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def upload(self, file_path: str) -> str:
+        target = self.root / f"{uuid.uuid4().hex}_{Path(file_path).name}"
+        shutil.copyfile(file_path, target)
+        return target.resolve().as_uri()
+
+
+_store = None
+
+def get_object_store():
+    global _store
+    if _store is None:
+        _store = LocalObjectStore() if STORAGE_BACKEND == "local" else CloudinaryStore()
+    return _store
+
+
+def upload_with_retries(file_path: str, store=None, retries: int = STORAGE_RETRIES) -> str:
+    store = store or get_object_store()
+    for attempt in range(retries + 1):
+        try:
+            with Metrics.measure("storage_upload"):
+                return store.upload(file_path)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = STORAGE_RETRY_BACKOFF * 2 ** attempt
+            Metrics.inc("storage_upload_retries_total")
+            print(f"Upload of {Path(file_path).name} failed ({e!r}), retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+_executor = None
+
+def upload_async(file_path: str, then=None) -> Future:
+    """Upload in the background; the Future resolves to then(url) if given, else the URL."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=STORAGE_UPLOAD_THREADS, thread_name_prefix="storage")
+
+    def run():
+        url = upload_with_retries(file_path)
+        return then(url) if then else url
+    return _executor.submit(run)
@@ -0,0 +1,280 @@
+# backend/api/app/table_store.py
+"""
+In-memory stand-in for the Supabase client (DATA_BACKEND=memory).
+
+Implements the part of the supabase-py / postgrest query builder the routers
+and the worker use:
+
+    store.table("users").select("id,department").eq("email", email).execute().data
+    store.table("documents").insert({...}).execute()
+    store.table("users").update({...}).eq("id", user_id).execute()
+
+Like PostgREST, filter values are compared as text (eq("id", "3") matches 3).
+Database functions called through rpc() are the Python twins of the SQL ones in
+database/supabase/ (see PROCEDURES); each runs under the store lock, so it is
+atomic like the transaction of the real function.
+
+LOCAL_DB_FIXTURE points to a JSON file {"table": [rows]} loaded at start-up, and
+LOCAL_DB_LATENCY (seconds) is slept in every execute() to emulate the blocking
+HTTP round trip of the real client.
+"""
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+# Primary key column and generator per table (everything else: integer "id")
+PRIMARY_KEYS = {
+    "users": ("id", "uuid"),
+    "departments": ("dept_id", "serial"),
+    "documents": ("doc_id", "serial"),
+}
+
+
+class APIResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _text(value):
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def _compare(a, b):
+    """Order two values like Postgres would for numbers, else as text."""
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return (a > b) - (a < b)
+    try:
+        fa, fb = float(a), float(b)
+        return (fa > fb) - (fa < fb)
+    except (TypeError, ValueError):
+        a, b = _text(a), _text(b)
+        return (a > b) - (a < b)
+
+
+OPERATORS = {
+    "eq": lambda v, x: v is not None and _text(v) == _text(x),
+    "neq": lambda v, x: v is None or _text(v) != _text(x),
+    "gt": lambda v, x: v is not None and _compare(v, x) > 0,
+    "gte": lambda v, x: v is not None and _compare(v, x) >= 0,
+    "lt": lambda v, x: v is not None and _compare(v, x) < 0,
+    "lte": lambda v, x: v is not None and _compare(v, x) <= 0,
+    "in": lambda v, xs: v is not None and _text(v) in {_text(x) for x in xs},
+    "is": lambda v, x: v is None if x in (None, "null") else _text(v) == _text(x),
+}
+
+
+class Query:
+    def __init__(self, store, table: str):
+        self.store = store
+        self.table = table
+        self.operation = "select"
+        self.columns = "*"
+        self.payload = None
+        self.filters = []
+        self.ordering = []
+        self.offset = 0
+        self.max_rows = None
+        self.count = None
+        self.single_row = False
+
+    # --- operations ---
+    def select(self, *columns, count=None):
+        self.columns = ",".join(columns) if columns else "*"
+        self.count = count
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.operation, self.payload = "insert", rows
+        return self
+
+    def update(self, values, **kwargs):
+        self.operation, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self.operation = "delete"
+        return self
+
+    # --- filters / modifiers ---
+    def _filter(self, op, column, value):
+        self.filters.append((op, column, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def in_(self, column, values):
+        return self._filter("in", column, list(values))
+
+    def is_(self, column, value):
+        return self._filter("is", column, value)
+
+    def order(self, column, desc=False, **kwargs):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size, **kwargs):
+        self.max_rows = size
+        return self
+
+    def range(self, start, end, **kwargs):
+        self.offset, self.max_rows = start, end - start + 1
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def execute(self):
+        if self.store.latency:
+            time.sleep(self.store.latency)
+        with self.store.lock:
+            return self.store._run(self)
+
+
+class RPCCall:
+    def __init__(self, store, name: str, params: dict):
+        self.store = store
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        if self.store.latency:
+            time.sleep(self.store.latency)
+        with self.store.lock:
+            return self.store._call(self.name, self.params)
+
+
+def _ingest_document(store, params: dict):
+    """database/supabase/ingest_document.sql"""
+    doc = store._insert("documents", [params["p_document"]])[0]
+    store._insert("summaries", [{"doc_id": doc["doc_id"], "content": params.get("p_summary")}])
+    store._insert("transexions", [{
+        "from_user": params.get("p_from_user"),
+        "to_department": doc.get("department"),
+        "doc_id": doc["doc_id"],
+    }])
+    store._insert("chunks", [{
+        "doc_id": doc["doc_id"],
+        "chunk_id": c.get("chunk_id"),
+        "content": c.get("content"),
+        "summary": c.get("summary"),
+        "entities": c.get("entities") or {},
+    } for c in params.get("p_chunks") or []])
+    return doc
+
+
+PROCEDURES = {
+    "ingest_document": _ingest_document,
+}
+
+
+class MemoryTableStore:
+    def __init__(self, tables: dict = None, latency: float = 0.0):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.calls = 0  # executed queries (round trips), for benchmarks
+        self._serial = {}
+
+    @classmethod
+    def from_env(cls):
+        tables = {}
+        fixture = os.getenv("LOCAL_DB_FIXTURE")
+        if fixture:
+            with open(fixture, "r", encoding="utf-8") as f:
+                tables = json.load(f)
+        return cls(tables, latency=float(os.getenv("LOCAL_DB_LATENCY", "0")))
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: dict = None) -> RPCCall:
+        return RPCCall(self, name, params or {})
+
+    # -----------------------------
+    # Execution
+    # -----------------------------
+    def _next_id(self, table: str, column: str, kind: str):
+        if kind == "uuid":
+            return str(uuid.uuid4())
+        if table not in self._serial:
+            ids = [r[column] for r in self.tables.get(table, []) if isinstance(r.get(column), int)]
+            self._serial[table] = max(ids, default=0)
+        self._serial[table] += 1
+        return self._serial[table]
+
+    def _matches(self, row, filters):
+        return all(OPERATORS[op](row.get(column), value) for op, column, value in filters)
+
+    def _project(self, row, columns: str):
+        if columns.strip() == "*":
+            return copy.deepcopy(row)
+        return {c: copy.deepcopy(row.get(c)) for c in (c.strip() for c in columns.split(",")) if c}
+
+    def _insert(self, table: str, values: list) -> list:
+        rows = self.tables.setdefault(table, [])
+        column, kind = PRIMARY_KEYS.get(table, ("id", "serial"))
+        inserted = []
+        for value in values:
+            row = dict(value)
+            row.setdefault(column, self._next_id(table, column, kind))
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+            rows.append(row)
+            inserted.append(copy.deepcopy(row))
+        return inserted
+
+    def _call(self, name: str, params: dict) -> APIResponse:
+        if name not in PROCEDURES:
+            raise ValueError(f"Unknown database function: {name}")
+        self.calls += 1
+        return APIResponse(PROCEDURES[name](self, params))
+
+    def _run(self, q: Query) -> APIResponse:
+        self.calls += 1
+        rows = self.tables.setdefault(q.table, [])
+
+        if q.operation == "insert":
+            return APIResponse(self._insert(q.table, q.payload if isinstance(q.payload, list) else [q.payload]))
+
+        matched = [row for row in rows if self._matches(row, q.filters)]
+
+        if q.operation == "update":
+            for row in matched:
+                row.update(q.payload)
+            return APIResponse(copy.deepcopy(matched))
+
+        if q.operation == "delete":
+            self.tables[q.table] = [row for row in rows if not self._matches(row, q.filters)]
+            return APIResponse(copy.deepcopy(matched))
+
+        for column, desc in reversed(q.ordering):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        total = len(matched)
+        end = None if q.max_rows is None else q.offset + q.max_rows
+        data = [self._project(row, q.columns) for row in matched[q.offset:end]]
+        if q.single_row:
+            data = data[0] if data else None
+        return APIResponse(data, count=total if q.count else None)
@@ -1,25 +1,50 @@
+import hashlib
 import os
+import shutil
 from fastapi import UploadFile
 
 UPLOAD_DIR = "./temp"
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", 512)) * 2 ** 20
+CHUNK_SIZE = 2 ** 20
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-async def save_upload_file(upload_file: UploadFile) -> str:
-    """Save uploaded file locally and return file path"""
-    file_path = os.path.join(UPLOAD_DIR, upload_file.filename)
-    content = await upload_file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
-    return file_path, content
+class UploadTooLarge(Exception):
+    """Upload / download bigger than MAX_UPLOAD_BYTES"""
 
-def save_bytes(content: bytes, filename: str) -> str:
-    """Save raw bytes (from URL download)"""
-    file_path = os.path.join(UPLOAD_DIR, filename)
+async def save_stream_hashed(chunks, file_path: str, max_bytes: int = None) -> str:
+    """Write an async iterator of byte chunks to disk, returning its sha256"""
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    digest = hashlib.sha256()
+    size = 0
     with open(file_path, "wb") as f:
-        f.write(content)
-    return file_path
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"File larger than {max_bytes // 2 ** 20} MiB")
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+async def save_upload_hashed(upload_file: UploadFile, file_path: str, chunk_size: int = CHUNK_SIZE,
+                             max_bytes: int = None) -> str:
+    """Copy an upload to disk chunk by chunk, returning its sha256"""
+    async def chunks():
+        while chunk := await upload_file.read(chunk_size):
+            yield chunk
+    return await save_stream_hashed(chunks(), file_path, max_bytes)
 
 def remove_file(path: str):
     """Delete file if it exists"""
     if os.path.exists(path):
         os.remove(path)
+
+
+def job_file_path(job_id: str, filename: str) -> str:
+    """Per-job upload location; keeps the original filename (it becomes the doc_id)"""
+    job_dir = os.path.join(UPLOAD_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    return os.path.join(job_dir, os.path.basename(filename))
+
+def remove_job_files(job_id: str):
+    """Delete a job's upload directory"""
+    shutil.rmtree(os.path.join(UPLOAD_DIR, job_id), ignore_errors=True)
@@ -1,5 +1,14 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from api.app.config import pwd_context
 
+# bcrypt takes ~100-300 ms of CPU per call (and releases the GIL): run it here,
+# never on the event loop; at most PASSWORD_THREADS hashes at once per process
+PASSWORD_THREADS = int(os.getenv("PASSWORD_THREADS", os.cpu_count() or 2))
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_THREADS, thread_name_prefix="password")
+
 def hash_password(password: str) -> str:
     """Hash password for storage"""
     return pwd_context.hash(password)
@@ -7,3 +16,11 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify user password"""
     return pwd_context.verify(plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """hash_password() on the password thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(_executor, hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() on the password thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(_executor, verify_password, plain_password, hashed_password)
@@ -0,0 +1,173 @@
+# backend/api/app/worker.py
+"""
+Ingestion worker: runs queued uploads (download → process_file → object storage → Supabase)
+outside the API process.
+
+    cd backend && python -m api.app.worker --processes 2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import threading
+import time
+import traceback
+from concurrent.futures import wait
+
+from api.app import cache, http_client, ingestion, job_queue, metrics, storage
+from api.app.redis_client import get_sync_redis
+from api.app.utils.file_handler import (
+    CHUNK_SIZE, MAX_UPLOAD_BYTES, UploadTooLarge, remove_job_files, save_stream_hashed,
+)
+from nlpPipelne import Metrics, ProcessedIndex
+
+REAP_INTERVAL = 30  # seconds between scans for jobs of crashed workers
+METRICS_INTERVAL = 15  # seconds between metrics snapshots while idle
+
+
+class JobError(Exception):
+    """Permanent failure (bad input); the job is not retried."""
+
+
+PERMANENT_ERRORS = (JobError, ingestion.UnknownSender, UploadTooLarge)
+
+
+async def download(url: str, file_location: str) -> str:
+    """Stream a remote file to disk (shared session, size-capped); returns its sha256."""
+    session = await http_client.get_session()
+    async with session.get(url) as resp:
+        if resp.status != 200:
+            raise JobError(f"Download failed ({resp.status})")
+        if resp.content_length and resp.content_length > MAX_UPLOAD_BYTES:
+            raise UploadTooLarge(f"File larger than {MAX_UPLOAD_BYTES // 2 ** 20} MiB")
+        return await save_stream_hashed(resp.content.iter_chunked(CHUNK_SIZE), file_location)
+
+
+def _stored(file_hash: str, storage_url: str) -> str:
+    ProcessedIndex.record(file_hash, storage_url=storage_url)
+    return storage_url
+
+
+def run_job(job: dict, loop, redis) -> dict:
+    # Imported here so every worker process loads the models itself (not the parent)
+    from nlpPipelne.ProcessPipeline import process_file, processed_doc
+    from nlpPipelne.stages.EmbedIndex import index_for_department
+
+    job_id, kind, payload = job["id"], job["kind"], job["payload"]
+    file_location = payload["file_location"]
+
+    def progress(event):
+        job_queue.set_progress(redis, job_id, **event)
+
+    user_id, dept_id, fields = ingestion.resolve_sender(kind, payload)
+
+    file_hash = payload.get("file_hash")
+    if kind == "url":
+        job_queue.set_progress(redis, job_id, "download")
+        file_hash = loop.run_until_complete(download(payload["url"], file_location))
+
+    file_hash = file_hash or ProcessedIndex.file_sha256(file_location)
+    known = ProcessedIndex.lookup(file_hash)
+    output = processed_doc(file_hash) if known and known.get("storage_url") else None
+    deduplicated = output is not None
+    Metrics.cache("upload", deduplicated)
+
+    if deduplicated:
+        # Same bytes were ingested before: reuse Stage 4 output and the stored file
+        job_queue.set_progress(redis, job_id, "dedup")
+        storage_url = known["storage_url"]
+        index_for_department(output, dept_id)
+    else:
+        # Upload the original while the pipeline runs (an earlier attempt may have stored it already)
+        stored = known.get("storage_url") if known else None
+        upload = None if stored else storage.upload_async(file_location, then=lambda url: _stored(file_hash, url))
+        try:
+            output = loop.run_until_complete(process_file(file_location, progress=progress, file_hash=file_hash,
+                                                              previous_hash=payload.get("previous_file_hash"),
+                                                              department=dept_id))
+        except BaseException:
+            if upload:
+                wait([upload])  # keep the file until the upload is done; a retry reuses its URL
+            raise
+
+        job_queue.set_progress(redis, job_id, "storing")
+        storage_url = stored or upload.result()
+
+    with Metrics.measure("db_write"):
+        document = ingestion.record_document(user_id, dept_id, fields, payload["filename"], storage_url, file_hash, output)
+    cache.invalidate_sync(redis, ("dept_docs", dept_id), ("transexions", user_id),
+                          ("summary", document.get("doc_id") if document else None))
+
+    return {
+        "document": [document] if document else [],
+        "filename": payload["filename"],
+        "processed": output,
+        "cloudinary_url": storage_url,
+        "deduplicated": deduplicated,
+    }
+
+
+def _heartbeat(redis, job_id: str, lease: str, stop: threading.Event):
+    while not stop.wait(job_queue.VISIBILITY_TIMEOUT / 3):
+        if not job_queue.extend_lease(redis, job_id, lease):
+            print(f"Job {job_id}: lease lost, the job was handed to another worker")
+            return
+
+
+def worker_loop():
+    redis = get_sync_redis()
+    loop = asyncio.new_event_loop()
+    last_reap = last_publish = 0
+
+    while True:
+        if time.time() - last_publish > METRICS_INTERVAL:
+            metrics.publish(redis)
+            last_publish = time.time()
+
+        if time.time() - last_reap > REAP_INTERVAL:
+            recovered = job_queue.requeue_expired(redis)
+            if recovered:
+                print(f"Recovered {recovered} job(s) from lost workers")
+            last_reap = time.time()
+
+        job = job_queue.claim_job(redis)
+        if not job:
+            continue
+
+        print(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']}: {job['payload']['filename']}")
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(redis, job["id"], job["lease"], stop), daemon=True).start()
+        try:
+            with Metrics.measure("ingest_job", kind=job["kind"]):
+                result = run_job(job, loop, redis)
+            if job_queue.complete_job(redis, job["id"], job["lease"], result):
+                remove_job_files(job["id"])
+        except Exception as e:
+            traceback.print_exc()
+            Metrics.inc("ingest_job_failures_total", kind=job["kind"])
+            if not job_queue.fail_job(redis, job["id"], job["lease"], str(e), retry=not isinstance(e, PERMANENT_ERRORS)):
+                remove_job_files(job["id"])
+        finally:
+            stop.set()
+            metrics.publish(redis)
+            last_publish = time.time()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KMRL ingestion worker")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        worker_loop()
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=worker_loop, daemon=True) for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
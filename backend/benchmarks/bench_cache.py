@@ -0,0 +1,92 @@
+"""
+Effect of the API cache (api.app.cache) on read endpoints: throughput, latency,
+database queries per request and hit rates, plus a cold-key stampede.
+
+    cd backend && python -m benchmarks.bench_cache --db-latency 0.05
+
+Runs the API in-process on the local stand-ins (see benchmarks.loadgen) with
+every table-store query taking --db-latency seconds.
+
+    no-cache   CACHE_ENABLED=0: every request queries the database
+    redis      Redis only (CACHE_L1_SIZE=0)
+    l1+redis   the in-process LRU in front of Redis (default)
+
+The stampede sends --stampede concurrent requests for one cold key and counts
+the queries that reach the database (one per cached query with single-flight).
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+import httpx
+
+from benchmarks import loadgen
+
+MODES = {"no-cache": (False, 0), "redis": (True, 0), "l1+redis": (True, 2048)}
+
+
+async def bench(args):
+    app, users = await loadgen.local_app(args.users, args.docs_per_dept, args.db_latency, False, args.seed)
+    from api.app import cache
+    from api.app.config import supabase
+
+    mix = loadgen.parse_mix(args.mix)
+    docs = args.docs_per_dept * len(loadgen.DEPARTMENTS)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"{'mode':<9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'queries/req':>12} {'hit rate':>9}")
+        for mode, (enabled, l1_size) in MODES.items():
+            cache.CACHE_ENABLED, cache.CACHE_L1_SIZE = enabled, l1_size
+            cache.clear_l1()
+            cache.reset_stats()
+            await app.state.redis.flushall()
+            calls = supabase.calls
+            latencies, failures, wall = await loadgen.run_load(
+                client, mix, users, args.concurrency, args.duration, 0, args.seed, docs)
+            samples = [x for s in latencies.values() for x in s]
+            rates = cache.hit_rates().values()
+            lookups = sum(r["lookups"] for r in rates)
+            hit_rate = sum(r["lookups"] - r["miss"] for r in rates) / lookups if lookups else 0.0
+            print(f"{mode:<9} {len(samples) / wall:>8.1f} {loadgen.percentile(samples, 50):>8.1f} "
+                  f"{loadgen.percentile(samples, 99):>8.1f} {(supabase.calls - calls) / len(samples):>12.2f} "
+                  f"{hit_rate:>9.1%}")
+            if mode == "l1+redis":
+                for namespace, r in cache.hit_rates().items():
+                    print(f"  {namespace:<12} {r['lookups']:>7} lookups, hit rate {r['hit_rate']:.1%} "
+                          f"(l1 {r['l1']}, redis {r['redis']}, shared {r['shared']}, miss {r['miss']})")
+
+        print(f"\nstampede: {args.stampede} concurrent /documents/listdocs for one user, cold cache")
+        for mode, (enabled, l1_size) in MODES.items():
+            cache.CACHE_ENABLED, cache.CACHE_L1_SIZE = enabled, l1_size
+            cache.clear_l1()
+            await app.state.redis.flushall()
+            calls = supabase.calls
+            await asyncio.gather(*(client.get("/documents/listdocs", params={"user_id": users[0]["id"]})
+                                   for _ in range(args.stampede)))
+            print(f"  {mode:<9} {supabase.calls - calls:>5} database queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="listdocs=4,profile=2,summary=2,transexions=1,history=1")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--stampede", type=int, default=200)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--docs-per-dept", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            asyncio.run(bench(args))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
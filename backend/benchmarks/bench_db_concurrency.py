@@ -0,0 +1,69 @@
+"""
+Requests/sec of DB-bound endpoints with blocking vs pooled async data access.
+
+    cd backend && python -m benchmarks.bench_db_concurrency --db-latency 0.02 --concurrency 1 8 32 128
+
+Runs the API in-process on the local stand-ins (see benchmarks.loadgen), with
+every table-store query taking --db-latency seconds like a PostgREST round trip.
+"blocking" = each query's execute() runs on the event loop, as the routers did
+with the sync supabase client; "pooled" = the api.app.db layer (a DB_POOL_SIZE
+thread pool here, an httpx connection pool against Supabase).
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+import httpx
+
+from benchmarks import loadgen
+
+
+async def bench(args):
+    app, users = await loadgen.local_app(args.users, args.docs_per_dept, args.db_latency, False, args.seed)
+    from api.app import db
+
+    pooled_execute = db.ThreadedQuery.execute
+
+    async def blocking_execute(self):
+        return self._query.execute()
+
+    mix = loadgen.parse_mix(args.mix)
+    print(f"{'mode':<9} {'users':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, execute in (("blocking", blocking_execute), ("pooled", pooled_execute)):
+        db.ThreadedQuery.execute = execute
+        for concurrency in args.concurrency:
+            await app.state.redis.flushall()  # listdocs cache starts cold for every run
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                latencies, failures, wall = await loadgen.run_load(
+                    client, mix, users, concurrency, args.duration, 0, args.seed)
+            samples = [x for s in latencies.values() for x in s]
+            errors = sum(failures.values())
+            print(f"{mode:<9} {concurrency:>6} {len(samples) / wall:>8.1f} {loadgen.percentile(samples, 50):>8.1f} "
+                  f"{loadgen.percentile(samples, 99):>8.1f}" + (f"  ({errors} errors)" if errors else ""))
+    db.ThreadedQuery.execute = pooled_execute
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="listdocs=4,profile=3,transexions=2")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--docs-per-dept", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            asyncio.run(bench(args))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
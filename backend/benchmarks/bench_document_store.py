@@ -0,0 +1,159 @@
+"""
+Rows per second written to the Postgres document tables (documents, chunks,
+entities, summaries of database/init.sql) by nlpPipelne.PgDocumentStore,
+against one INSERT per row, then keyword / entity search latency:
+
+    cd backend && python -m benchmarks.bench_document_store --dsn "host=localhost dbname=kmrl_db user=kmrl_user" --docs 2000
+
+The tables are created from database/init.sql in their own schema
+(bench_documents, dropped at the end), without its CREATE EXTENSION lines:
+the database needs the vector extension already. The documents are
+synthetic Stage 4 output.
+
+    per-row   INSERT ... RETURNING id per document, chunk, entity and summary, one transaction per document
+    bulk      PgDocumentStore.write(): binary COPY + INSERT ... SELECT, one transaction per --batch-docs documents
+
+Against a local server round trips cost almost nothing; "at RTT" adds --rtt ms
+per round trip (statement, COPY, BEGIN / COMMIT) for a database across the network.
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+
+import psycopg
+from psycopg import conninfo
+
+from benchmarks import loadgen
+
+SCHEMA = "bench_documents"
+INIT_SQL = Path(__file__).resolve().parents[2] / "database" / "init.sql"
+ENTITIES = {
+    "LOC": ["Aluva", "Edappally", "Kaloor", "Vyttila", "Petta", "Muttom depot"],
+    "ORG": ["KMRL", "Alstom", "Kerala PWD", "DMRC"],
+    "PER": ["Station Controller", "Chief Engineer"],
+    "DATE": ["2024", "12/03/2024", "2025"],
+}
+
+
+def make_docs(n: int, chunks: int, entities: int, seed: int) -> list:
+    rng = random.Random(seed)
+    words = " ".join(loadgen.QUERIES).split() + [f"term{i}" for i in range(2000)]
+    labels = list(ENTITIES)
+    docs = []
+    for i in range(n):
+        doc_chunks = []
+        for c in range(chunks):
+            sentences = [" ".join(rng.choices(words, k=20)) + "." for _ in range(5)]
+            found = {}
+            for _ in range(entities):
+                label = rng.choice(labels)
+                found.setdefault(label, []).append(rng.choice(ENTITIES[label]))
+            doc_chunks.append({"chunk_id": c + 1, "sentences": sentences, "words": " ".join(sentences).split(),
+                               "summary": sentences[0], "entities": found})
+        text = " ".join(s for ch in doc_chunks for s in ch["sentences"])
+        docs.append({"doc_id": f"circular_{i}.pdf", "file_hash": f"{seed}-{i:08d}", "file_type": "pdf",
+                     "raw_text": text, "cleaned_text": text, "doc_summary": doc_chunks[0]["summary"],
+                     "num_sentences": 5 * chunks, "num_words": len(text.split()), "chunks": doc_chunks})
+    return docs
+
+
+def write_per_row(conn, doc: dict, config: str) -> int:
+    """The row-at-a-time path: one statement per row, ids fetched back for the foreign keys; returns round trips."""
+    trips = 2 + 2 + len(doc["chunks"]) * 2  # BEGIN / COMMIT, document + summary, chunk + summary
+    with conn.transaction():
+        doc_id = conn.execute(
+            "INSERT INTO documents (doc_key, original_filename, file_hash, raw_text, clean_text, raw_text_tsv, "
+            "doc_summary, num_sentences, num_words, processed) "
+            "VALUES (%s, %s, %s, %s, %s, to_tsvector(%s::regconfig, %s), %s, %s, %s, TRUE) RETURNING id",
+            (doc["file_hash"], doc["doc_id"], doc["file_hash"], doc["raw_text"], doc["cleaned_text"], config,
+             doc["cleaned_text"], doc["doc_summary"], doc["num_sentences"], doc["num_words"])).fetchone()[0]
+        conn.execute("INSERT INTO summaries (document_id, summary_type, content) VALUES (%s, 'document', %s)",
+                     (doc_id, doc["doc_summary"]))
+        for chunk in doc["chunks"]:
+            text = " ".join(chunk["sentences"])
+            chunk_id = conn.execute(
+                "INSERT INTO chunks (document_id, chunk_index, chunk_key, chunk_text, chunk_text_tsv, num_sentences, "
+                "num_tokens) VALUES (%s, %s, %s, %s, to_tsvector(%s::regconfig, %s), %s, %s) RETURNING id",
+                (doc_id, chunk["chunk_id"], f"{doc['file_hash']}:{chunk['chunk_id']}", text, config, text,
+                 len(chunk["sentences"]), len(chunk["words"]))).fetchone()[0]
+            conn.execute("INSERT INTO summaries (document_id, chunk_id, summary_type, content) VALUES (%s, %s, 'chunk', %s)",
+                         (doc_id, chunk_id, chunk["summary"]))
+            for label, values in chunk["entities"].items():
+                for value in set(values):
+                    trips += 1
+                    conn.execute("INSERT INTO entities (document_id, chunk_id, entity_text, normalized_text, label) "
+                                 "VALUES (%s, %s, %s, %s, %s)", (doc_id, chunk_id, value, value.lower(), label))
+    return trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", required=True, help="libpq connection string or URL")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=8, help="chunks per document")
+    parser.add_argument("--entities", type=int, default=4, help="entity mentions per chunk")
+    parser.add_argument("--batch-docs", type=int, default=8, help="documents per bulk write (nlpPipelne.ingest batch)")
+    parser.add_argument("--rtt", type=float, default=1.0, help="ms per round trip for the 'at RTT' column")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from nlpPipelne.PgDocumentStore import FAN_OUT, TEXT_SEARCH_CONFIG, PgDocumentStore
+
+    dsn = conninfo.make_conninfo(args.dsn, options=f"-c search_path={SCHEMA},public")
+    admin = psycopg.connect(args.dsn, autocommit=True)
+    docs = make_docs(args.docs, args.chunks, args.entities, args.seed)
+    try:
+        admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        admin.execute(f"CREATE SCHEMA {SCHEMA}")
+        with psycopg.connect(dsn, autocommit=True) as conn:
+            conn.execute("\n".join(line for line in INIT_SQL.read_text().splitlines()
+                                   if not line.startswith("CREATE EXTENSION")))
+        store = PgDocumentStore(dsn)
+
+        print(f"{args.docs} documents x {args.chunks} chunks x {args.entities} entities")
+        print(f"{'mode':<9} {'seconds':>8} {'docs/s':>8} {'rows':>9} {'rows/s':>9} {'trips/doc':>10} "
+              f"{'rows/s at ' + str(args.rtt) + ' ms RTT':>22}")
+        with psycopg.connect(dsn, autocommit=True) as conn:
+            for mode in ["per-row", "bulk"]:
+                conn.execute("TRUNCATE documents CASCADE")
+                t0 = time.perf_counter()
+                if mode == "per-row":
+                    trips = sum(write_per_row(conn, doc, TEXT_SEARCH_CONFIG) for doc in docs)
+                else:
+                    trips = 0
+                    for start in range(0, len(docs), args.batch_docs):
+                        store.write(docs[start:start + args.batch_docs])
+                        trips += 4 + len(FAN_OUT)  # BEGIN, 2 COPY, the INSERT / DELETE statements, COMMIT
+                seconds = time.perf_counter() - t0
+                rows = sum(conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                           for table in ("documents", "chunks", "entities", "summaries"))
+                remote = seconds + trips * args.rtt / 1000
+                print(f"{mode:<9} {seconds:>8.2f} {args.docs / seconds:>8.0f} {rows:>9} {rows / seconds:>9.0f} "
+                      f"{trips / args.docs:>10.1f} {rows / remote:>22.0f}")
+            conn.execute("ANALYZE")
+
+        rng = random.Random(args.seed)
+        words = " ".join(loadgen.QUERIES).split()
+        searches = {
+            "keyword": lambda: store.search(" ".join(rng.sample(words, 2))),
+            "keyword+entity": lambda: store.search(rng.choice(words), entity=rng.choice(ENTITIES["LOC"]), label="LOC"),
+            "entity": lambda: store.search(entity=rng.choice(ENTITIES["ORG"])),
+        }
+        print(f"\n{'search':<15} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, call in searches.items():
+            latencies = []
+            for _ in range(args.queries):
+                t0 = time.perf_counter()
+                call()
+                latencies.append(time.perf_counter() - t0)
+            print(f"{name:<15} {loadgen.percentile(latencies, 50):>8.2f} {loadgen.percentile(latencies, 99):>8.2f}")
+        store.close()
+    finally:
+        admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Database round trips and latency of recording one processed upload.
+
+    cd backend && python -m benchmarks.bench_ingest_db --db-latency 0.02 --uploads 200
+
+Runs against the in-memory table store (DATA_BACKEND=memory) seeded like
+benchmarks.loadgen, with every query sleeping --db-latency seconds like a
+PostgREST round trip. Uploads cycle through the four channels.
+
+    before     the per-upload sequence the worker used to run: department or
+               user lookup(s), then documents / summaries / transexions inserts
+    per-table  api.app.ingestion with INGEST_RPC=0 (cached lookup, one insert per table)
+    rpc        api.app.ingestion (cached lookup, one ingest_document call)
+
+"before" writes no chunk rows; the other two also store every chunk.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from benchmarks import loadgen
+
+CHANNELS = ["file", "url", "email", "whatsapp"]
+
+
+def legacy_upload(supabase, kind, payload, output, storage_url, file_hash):
+    """The worker's database calls before api.app.ingestion."""
+    if kind in ("file", "url"):
+        dept_resp = supabase.table("departments").select("dept_id").eq("name", payload["dept_name"]).execute()
+        user_id, dept_id = payload["user_id"], dept_resp.data[0]["dept_id"]
+        fields = {"medium": "direct file" if kind == "file" else "url", "priority": payload["priority"]}
+    else:
+        column = "email" if kind == "email" else "phone"
+        user_id = supabase.table("users").select("id").eq(column, payload[column]).execute().data[0]["id"]
+        dept_id = supabase.table("users").select("department").eq(column, payload[column]).execute().data[0]["department"]
+        fields = {"doc_type": "general", "medium": kind, "priority": "normal"}
+
+    doc = supabase.table("documents").insert({
+        "title": payload["filename"], "department": dept_id, "url": storage_url, "file_hash": file_hash, **fields,
+    }).execute().data[0]
+    supabase.table("summaries").insert({"doc_id": doc["doc_id"], "content": output["doc_summary"]}).execute()
+    supabase.table("transexions").insert({"from_user": user_id, "to_department": dept_id, "doc_id": doc["doc_id"]}).execute()
+    return doc
+
+
+def service_upload(supabase, kind, payload, output, storage_url, file_hash):
+    from api.app import ingestion
+    user_id, dept_id, fields = ingestion.resolve_sender(kind, payload)
+    return ingestion.record_document(user_id, dept_id, fields, payload["filename"], storage_url, file_hash, output)
+
+
+def make_uploads(users, count: int, chunks: int, seed: int):
+    rng = random.Random(seed)
+    uploads = []
+    for i in range(count):
+        kind = CHANNELS[i % len(CHANNELS)]
+        user = rng.choice(users)
+        payload = {"filename": f"upload_{i}.pdf", "user_id": user["id"], "priority": "normal",
+                   "dept_name": loadgen.DEPARTMENTS[user["department"] - 1],
+                   "email": user["email"], "phone": user["phone"]}
+        output = {
+            "doc_summary": rng.choice(loadgen.QUERIES),
+            "chunks": [{"chunk_id": c + 1, "sentences": [rng.choice(loadgen.QUERIES) + "."] * 8,
+                        "summary": rng.choice(loadgen.QUERIES), "entities": {"ORG": ["KMRL"]}}
+                       for c in range(chunks)],
+        }
+        uploads.append((kind, payload, output))
+    return uploads
+
+
+def run(supabase, upload, uploads):
+    calls, seconds = [], []
+    for i, (kind, payload, output) in enumerate(uploads):
+        before = supabase.calls
+        t0 = time.perf_counter()
+        upload(supabase, kind, payload, output, f"file:///object_store/upload_{i}.pdf", f"{i:064x}")
+        seconds.append(time.perf_counter() - t0)
+        calls.append(supabase.calls - before)
+    return calls, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=12, help="chunks per processed document")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update(loadgen.LOCAL_BACKENDS, LOCAL_DB_LATENCY=str(args.db_latency))
+    from api.app import ingestion
+    from api.app.config import supabase
+
+    tables = loadgen.make_fixture(args.users, 0, args.seed)
+    uploads = make_uploads(tables["users"], args.uploads, args.chunks, args.seed)
+
+    print(f"{'mode':<10} {'round trips':>12} {'rows':>6} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, upload, rpc in (("before", legacy_upload, False), ("per-table", service_upload, False),
+                              ("rpc", service_upload, True)):
+        supabase.tables.clear()
+        supabase.tables.update({name: [dict(r) for r in rows] for name, rows in tables.items()})
+        ingestion.INGEST_RPC = rpc
+        ingestion.forget_senders()
+
+        calls, seconds = run(supabase, upload, uploads)
+        rows = sum(len(supabase.tables.get(t, [])) for t in ("documents", "summaries", "transexions", "chunks"))
+        print(f"{mode:<10} {statistics.mean(calls):>12.2f} {rows / len(uploads):>6.1f} "
+              f"{statistics.mean(seconds) * 1000:>8.1f} {loadgen.percentile(seconds, 50):>8.1f} "
+              f"{loadgen.percentile(seconds, 99):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Latency of unrelated endpoints during a login storm: --rate logins per second
+are fired (open loop) while --concurrency clients keep requesting --mix.
+
+    cd backend && python -m benchmarks.bench_login_storm --rate 100 --duration 10
+
+Runs the API in-process on the local stand-ins (see benchmarks.loadgen), with
+the fixture's real bcrypt hashes.
+
+    idle        no logins: the baseline
+    blocking    logins verified on the event loop, as /auth/login used to
+    pool        /auth/login (bcrypt on api.app.utils.security's thread pool)
+    pool+auth   as pool, and the other requests carry a session token
+                validated by api.app.sessions (AUTH_REQUIRED=1)
+
+Logins still pending when the run ends are cancelled: bcrypt at 100/s takes
+far more CPU than most machines have, so the pool queues them.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+from benchmarks import loadgen
+
+MODES = ["idle", "blocking", "pool", "pool+auth"]
+
+
+def add_legacy_route(app):
+    """/auth/login as it was: bcrypt on the event loop."""
+    from fastapi import HTTPException
+    from api.app import repository
+    from api.app.schemas.models import LoginRequest
+    from api.app.utils.security import verify_password
+
+    @app.post("/bench/login_blocking")
+    async def login_blocking(request: LoginRequest):
+        user = await repository.get_user(request.user_id)
+        if not user or not verify_password(request.password, user["password"]):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        return {"success": True, "message": "Login successful", "user": user}
+
+
+async def storm(client, url: str, users: list, rate: float, duration: float):
+    """(login latencies, logins fired) for duration seconds at rate per second."""
+    loop = asyncio.get_running_loop()
+    latencies, tasks = [], []
+
+    async def one(user):
+        t0 = time.perf_counter()
+        response = await client.post(url, json={"user_id": user["id"], "password": loadgen.PASSWORD})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - t0)
+
+    start = loop.time()
+    while loop.time() - start < duration:
+        tasks.append(asyncio.create_task(one(users[len(tasks) % len(users)])))
+        await asyncio.sleep(max(0.0, start + len(tasks) / rate - loop.time()))
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies, len(tasks)
+
+
+async def bench(args):
+    app, users = await loadgen.local_app(args.users, args.docs_per_dept, args.db_latency, False, args.seed)
+    add_legacy_route(app)
+    from api.app import sessions
+
+    mix = loadgen.parse_mix(args.mix)
+    transport = httpx.ASGITransport(app=app)
+    print(f"{'mode':<10} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'logins ok':>10} {'fired':>6} {'login p50':>10}")
+    for mode in args.modes:
+        headers = {}
+        sessions.AUTH_REQUIRED = mode == "pool+auth"
+        if sessions.AUTH_REQUIRED:
+            headers["Authorization"] = f"Bearer {sessions.issue(users[0])['access_token']}"
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as logins, \
+                httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600, headers=headers) as client:
+            await loadgen.run_load(client, mix, users, args.concurrency, 1.0, 0, args.seed)  # warm the caches
+            jobs = [loadgen.run_load(client, mix, users, args.concurrency, args.duration, 0, args.seed)]
+            if mode != "idle":
+                url = "/bench/login_blocking" if mode == "blocking" else "/auth/login"
+                jobs.append(storm(logins, url, users, args.rate, args.duration))
+            results = await asyncio.gather(*jobs)
+
+        latencies, failures, _ = results[0]
+        samples = [x for s in latencies.values() for x in s]
+        login_latencies, fired = results[1] if mode != "idle" else ([], 0)
+        print(f"{mode:<10} {len(samples):>9} {loadgen.percentile(samples, 50):>8.1f} "
+              f"{loadgen.percentile(samples, 99):>8.1f} {max(samples) * 1000:>8.1f} "
+              f"{len(login_latencies):>10} {fired:>6} {loadgen.percentile(login_latencies, 50):>10.1f}")
+        if sum(failures.values()):
+            print(f"  failed requests: {failures}")
+    sessions.AUTH_REQUIRED = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=100.0, help="logins per second")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", default="profile=2,listdocs=2,history=1")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--docs-per-dept", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            asyncio.run(bench(args))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Near-duplicate detection (nlpPipelne.NearDuplicates): signature time, which
+edits of a circular are still found, false positives between unrelated
+circulars, and LSH lookup latency as the index grows:
+
+    cd backend && python -m benchmarks.bench_near_duplicates --docs 2000 --sizes 10000 100000 1000000
+
+Detection: --docs synthetic circulars (--words words each) are indexed, then
+each is looked up again after one edit:
+
+    date        the issue date and reference number changed
+    paragraph   one paragraph (~1/8 of the text) rewritten
+    ocr         a re-scan: 2% of the words with one character misread
+    unrelated   a different circular (any match is a false positive)
+
+Lookup: an index of N random signatures (with one near-duplicate per query
+planted), timed against a linear scan comparing the query with every stored
+signature in numpy. The index files go to a temporary directory.
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import loadgen
+from nlpPipelne import NearDuplicates
+from nlpPipelne.NearDuplicates import NUM_PERM, NearDuplicateIndex, signature
+
+
+def make_circular(rng: random.Random, vocabulary: list, words: int) -> list:
+    paragraphs = [" ".join(rng.choices(vocabulary, k=words // 8)) + "." for _ in range(8)]
+    return [f"Ref No KMRL/{rng.randint(1000, 9999)}/{rng.randint(2019, 2025)} dated "
+            f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/{rng.randint(2019, 2025)}"] + paragraphs
+
+
+def edit(kind: str, circular: list, rng: random.Random, vocabulary: list, words: int) -> str:
+    if kind == "date":
+        circular = [f"Ref No KMRL/{rng.randint(1000, 9999)}/2025 dated {rng.randint(1, 28)}/{rng.randint(1, 12)}/2025"] \
+                   + circular[1:]
+    elif kind == "paragraph":
+        i = rng.randrange(1, len(circular))
+        circular = circular[:i] + [" ".join(rng.choices(vocabulary, k=words // 8)) + "."] + circular[i + 1:]
+    elif kind == "ocr":
+        tokens = " ".join(circular).split()
+        for i in rng.sample(range(len(tokens)), max(1, len(tokens) // 50)):
+            word = tokens[i]
+            j = rng.randrange(len(word))
+            tokens[i] = word[:j] + rng.choice("il1o0rn") + word[j + 1:]
+        return " ".join(tokens)
+    elif kind == "unrelated":
+        circular = make_circular(rng, vocabulary, words)
+    return "\n".join(circular)
+
+
+def detection(args, directory: Path):
+    rng = random.Random(args.seed)
+    vocabulary = " ".join(loadgen.QUERIES).split() + [f"term{i}" for i in range(3000)]
+    circulars = [make_circular(rng, vocabulary, args.words) for _ in range(args.docs)]
+
+    t0 = time.perf_counter()
+    signatures = [signature("\n".join(c)) for c in circulars]
+    per_doc = (time.perf_counter() - t0) / args.docs
+    index = NearDuplicateIndex(directory / "detection.sqlite3")
+    t0 = time.perf_counter()
+    index.add_many((f"doc-{i}", sig, None) for i, sig in enumerate(signatures))
+    add_s = time.perf_counter() - t0
+    print(f"{args.docs} circulars of {args.words} words: signature {per_doc * 1000:.2f} ms/doc, "
+          f"indexed in {add_s:.2f} s")
+
+    print(f"\n{'edit':<10} {'mean sim':>9} {'linked':>8} {'reused':>8} {'same doc':>9}")
+    for kind in ["date", "paragraph", "ocr", "unrelated"]:
+        sims, linked, reused, same = [], 0, 0, 0
+        for i, circular in enumerate(circulars):
+            sig = signature(edit(kind, circular, rng, vocabulary, args.words))
+            match = index.query(sig)
+            sims.append(NearDuplicates.similarity(sig, signatures[i]))
+            if match:
+                linked += 1
+                reused += match["similarity"] >= NearDuplicates.NEAR_DUP_REUSE
+                same += match["doc_key"] == f"doc-{i}"
+        n = len(circulars)
+        print(f"{kind:<10} {np.mean(sims):>9.3f} {linked / n:>8.1%} {reused / n:>8.1%} {same / n:>9.1%}")
+    index.close()
+
+
+def lookup(args, directory: Path):
+    rng = np.random.default_rng(args.seed)
+    print(f"\n{'documents':>10} {'build s':>8} {'MiB':>7} {'lsh p50 ms':>11} {'lsh p99 ms':>11} "
+          f"{'scan p50 ms':>12} {'found':>7}")
+    for size in args.sizes:
+        path = directory / f"lookup-{size}.sqlite3"
+        index = NearDuplicateIndex(path)
+        stored = rng.integers(0, 2 ** 32, (size, NUM_PERM), dtype=np.uint32)
+        t0 = time.perf_counter()
+        for start in range(0, size, 10000):
+            index.add_many((f"doc-{i}", stored[i], None) for i in range(start, min(start + 10000, size)))
+        build = time.perf_counter() - t0
+
+        targets = rng.choice(size, args.queries, replace=False)
+        queries = []
+        for target in targets:  # a near-duplicate of a stored signature: ~10% of the values differ
+            sig = stored[target].copy()
+            changed = rng.choice(NUM_PERM, NUM_PERM // 10, replace=False)
+            sig[changed] = rng.integers(0, 2 ** 32, len(changed), dtype=np.uint32)
+            queries.append(sig)
+
+        lsh, found = [], 0
+        for target, sig in zip(targets, queries):
+            t0 = time.perf_counter()
+            match = index.query(sig)
+            lsh.append(time.perf_counter() - t0)
+            found += match is not None and match["doc_key"] == f"doc-{target}"
+        scan = []
+        for sig in queries[:max(5, args.queries // 20)]:
+            t0 = time.perf_counter()
+            scores = np.count_nonzero(stored == sig, axis=1)
+            int(scores.argmax())
+            scan.append(time.perf_counter() - t0)
+        index.close()
+        print(f"{size:>10} {build:>8.1f} {path.stat().st_size / 2 ** 20:>7.0f} {loadgen.percentile(lsh, 50):>11.2f} "
+              f"{loadgen.percentile(lsh, 99):>11.2f} {loadgen.percentile(scan, 50):>12.2f} {found / len(queries):>7.1%}")
+        del stored
+        path.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000, help="circulars for the detection table")
+    parser.add_argument("--words", type=int, default=800, help="words per circular")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=500, help="lookups per index size")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        detection(args, Path(directory))
+        lookup(args, Path(directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Response size and latency of /documents/listdocs against department size:
+the whole department as before (select("*"), no limit) vs one keyset page
+(api.app.pagination), with and without a column projection.
+
+    cd backend && python -m benchmarks.bench_pagination --sizes 100 1000 10000 30000
+
+Runs the API in-process on the local stand-ins (see benchmarks.loadgen) with
+every table-store query taking --db-latency seconds. "cold" is the first
+request after the cache was emptied (one database query), "warm" the mean of
+--repeat requests served from the cache.
+
+    before        every row and column of the department
+    page          ?limit=--limit
+    page+fields   ?limit=--limit&fields=--fields
+    deep page     ?limit=--limit&cursor=... near the oldest document
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from benchmarks import loadgen
+
+
+def add_legacy_route(app):
+    """listdocs as it was before pagination: the whole department, cached as one entry."""
+    from api.app import cache, repository
+    from api.app.db import get_db
+
+    @app.get("/bench/listdocs_all")
+    async def listdocs_all(user_id: str):
+        user = await cache.get_or_load("profile", user_id, lambda: repository.profile(user_id))
+        dept_id = user[0]["department"]
+
+        async def query():
+            db = await get_db()
+            return (await db.table("documents").select("*").eq("department", dept_id).execute()).data or []
+        return {"data": await cache.get_or_load("bench_dept_docs", dept_id, query)}
+
+
+async def timed(client, url: str, params: dict):
+    t0 = time.perf_counter()
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    return time.perf_counter() - t0, len(response.content), response.json()
+
+
+async def measure(app, client, url, params, repeat):
+    from api.app import cache
+    cache.clear_l1()
+    await app.state.redis.flushall()
+    cold, size, body = await timed(client, url, params)
+    warm = [(await timed(client, url, params))[0] for _ in range(repeat)]
+    return cold, statistics.mean(warm), size, len(body["data"])
+
+
+async def bench_size(app, client, users, size, args):
+    from api.app.config import supabase
+
+    user = users[0]
+    docs = sorted((d["doc_id"] for d in supabase.tables["documents"] if d["department"] == user["department"]),
+                  reverse=True)
+    base = {"user_id": user["id"]}
+    cases = [
+        ("before", "/bench/listdocs_all", base),
+        ("page", "/documents/listdocs", {**base, "limit": args.limit}),
+        ("page+fields", "/documents/listdocs", {**base, "limit": args.limit, "fields": args.fields}),
+        ("deep page", "/documents/listdocs", {**base, "limit": args.limit, "cursor": docs[-args.limit - 1]}),
+    ]
+    for name, url, params in cases:
+        cold, warm, nbytes, rows = await measure(app, client, url, params, args.repeat)
+        print(f"{size:>7} {name:<12} {rows:>6} {nbytes / 1024:>10.1f} {cold * 1000:>9.1f} {warm * 1000:>9.1f}")
+
+
+async def bench(args):
+    app, users = await loadgen.local_app(5, 0, args.db_latency, False, args.seed)
+    add_legacy_route(app)
+    from api.app.config import supabase
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        print(f"{'docs':>7} {'mode':<12} {'rows':>6} {'bytes KiB':>10} {'cold ms':>9} {'warm ms':>9}")
+        for size in args.sizes:
+            supabase.tables.update(loadgen.make_fixture(len(users), size, args.seed))
+            await bench_size(app, client, users, size, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="documents per department")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--fields", default="doc_id,title,priority,created_at")
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            asyncio.run(bench(args))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Per-stage and end-to-end benchmark of the five-stage pipeline on the synthetic corpus.
+
+    cd backend && python -m benchmarks.bench_pipeline --corpus /tmp/kmrl_corpus --repeat 3 \\
+        --out results.json --baseline benchmarks/baseline.json
+
+The corpus is generated (benchmarks.corpus) if the directory has no manifest.
+By default translation and the Stage 4/5 models are replaced by the offline
+stand-ins in benchmarks.stubs; --real-models loads the real models (the
+translator stays stubbed unless --real-translator).
+
+Results are written as JSON:
+    {"meta": {...}, "results": {"<stage>/<file>": {...}, "stage/<stage>": {...}, "e2e/...": {...}}, "errors": {...}}
+where every result holds the median / min / max seconds over --repeat runs.
+With --baseline every key present in both files is compared; a median more
+than --threshold slower is a regression (exit code 1 with --fail-on-regression).
+--save-baseline writes the results as the new baseline.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import corpus, stubs
+
+STAGES = ("extraction", "normalisation", "chunking", "entity_summary", "indexing")
+
+
+def summarise(runs):
+    return {"median": statistics.median(runs), "min": min(runs), "max": max(runs), "runs": runs}
+
+
+def describe(e: Exception) -> str:
+    return f"{type(e).__name__}: {' '.join(str(e).split())}"
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def quiet(verbose: bool):
+    """The stages print a lot; keep it out of the timings' way."""
+    if verbose:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def workdir():
+    """Fresh cwd: checkpoints, dedup index, stage 4 store and vector store start empty."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield Path(tmp)
+        finally:
+            os.chdir(cwd)
+
+
+def stage_functions(stages):
+    """Stage name -> callable(doc, file_path, index_dir) (imports only what is benchmarked)."""
+    from nlpPipelne.stages.TextExtraction import extract_text
+    funcs = {"extraction": lambda doc, path, index_dir: extract_text(path)}
+    if "normalisation" in stages:
+        from nlpPipelne.stages.CleaningNormalisation import clean_normalise
+        funcs["normalisation"] = lambda doc, path, index_dir: asyncio.run(clean_normalise(doc))
+    if "chunking" in stages:
+        from nlpPipelne.stages.ChunkingPlaceholding import chunking
+        funcs["chunking"] = lambda doc, path, index_dir: chunking(doc, doc_id=doc["doc_id"])
+    if "entity_summary" in stages:
+        from nlpPipelne.stages.EntitySummary import entity_summary
+        funcs["entity_summary"] = lambda doc, path, index_dir: entity_summary(doc)
+    if "indexing" in stages:
+        from nlpPipelne.stages.EmbedIndex import indexing
+        funcs["indexing"] = lambda doc, path, index_dir: indexing(doc, index_dir) or doc
+    return funcs
+
+
+def bench_stages(files, stages, repeat, verbose):
+    """Run the stages in order on every file; {"<stage>/<file>": [seconds per run]}."""
+    funcs = stage_functions(stages)
+    timings, errors = {}, {}
+    for path in files:
+        for _ in range(repeat):
+            with workdir() as tmp, quiet(verbose):
+                doc = None
+                for stage in STAGES[:max(STAGES.index(s) for s in stages) + 1]:
+                    t0 = time.perf_counter()
+                    try:
+                        doc = funcs[stage](doc, str(path), str(tmp / "vectorStore"))
+                    except Exception as e:
+                        errors[f"{stage}/{path.name}"] = describe(e)
+                        break
+                    if stage in stages:
+                        timings.setdefault(f"{stage}/{path.name}", []).append(time.perf_counter() - t0)
+    return timings, errors
+
+
+def bench_e2e(files, repeat, verbose):
+    """process_file over the whole corpus in a fresh working directory per run."""
+    from nlpPipelne.ProcessPipeline import process_file
+
+    totals, docs, errors = [], 0, {}
+    for _ in range(repeat):
+        with workdir(), quiet(verbose):
+            t0, docs = time.perf_counter(), 0
+            for path in files:
+                try:
+                    asyncio.run(process_file(str(path)))
+                    docs += 1
+                except Exception as e:
+                    errors[f"e2e/{path.name}"] = describe(e)
+            totals.append(time.perf_counter() - t0)
+    return totals, docs, errors
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """
+    [(key, baseline median, current median, ratio, verdict)] for shared keys;
+    keys faster than min_seconds in the baseline are too noisy and skipped.
+    """
+    rows = []
+    for key in sorted(set(results) & set(baseline)):
+        base, cur = baseline[key]["median"], results[key]["median"]
+        if base < min_seconds:
+            continue
+        ratio = cur / base
+        verdict = "REGRESSION" if ratio > 1 + threshold else "improved" if ratio < 1 - threshold else "ok"
+        rows.append((key, base, cur, ratio, verdict))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "kmrl_corpus"))
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5], help="sizes when generating the corpus")
+    parser.add_argument("--formats", nargs="+", default=None, help="only these corpus formats")
+    parser.add_argument("--languages", nargs="+", default=None, help="only these corpus languages")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--no-e2e", action="store_true", help="skip the process_file run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--real-models", action="store_true", help="load the real NER / summary / embedding models")
+    parser.add_argument("--real-translator", action="store_true", help="use googletrans (network)")
+    parser.add_argument("--translate-latency", type=float, default=0.0, help="simulated seconds per stub translation")
+    parser.add_argument("--out", default="bench_pipeline_results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--save-baseline", help="also write the results here")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown counted as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="ignore baseline entries faster than this")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus).resolve()
+    if not (corpus_dir / "manifest.json").exists():
+        print(f"Generating corpus in {corpus_dir}…")
+        corpus.generate(corpus_dir, pages=args.pages)
+    with open(corpus_dir / "manifest.json", "r", encoding="utf-8") as f:
+        manifest = [m for m in json.load(f)
+                    if (not args.formats or m["format"] in args.formats)
+                    and (not args.languages or m["language"] in args.languages)]
+    files = [corpus_dir / m["file"] for m in manifest]
+
+    if not args.real_translator:
+        stubs.install_translator(args.translate_latency)
+    needs_models = not args.no_e2e or {"entity_summary", "indexing"} & set(args.stages)
+    if needs_models and not args.real_models:
+        stubs.install_models()
+
+    timings, errors = bench_stages(files, args.stages, args.repeat, args.verbose)
+    results = {key: summarise(runs) for key, runs in timings.items()}
+
+    # Corpus totals per stage (sum over files of each run)
+    for stage in args.stages:
+        keys = [k for k in timings if k.startswith(stage + "/")]
+        if keys and all(len(timings[k]) == args.repeat for k in keys):
+            results[f"stage/{stage}"] = summarise([sum(timings[k][i] for k in keys) for i in range(args.repeat)])
+
+    if not args.no_e2e:
+        totals, docs, e2e_errors = bench_e2e(files, args.repeat, args.verbose)
+        errors.update(e2e_errors)
+        results["e2e/corpus"] = summarise(totals)
+        if docs:
+            results["e2e/seconds_per_doc"] = summarise([t / docs for t in totals])
+            print(f"end to end: {docs} docs, median {results['e2e/corpus']['median']:.2f}s "
+                  f"→ {docs / results['e2e/corpus']['median'] * 3600:.0f} docs/hour")
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_rev": git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "stand_in_models": not args.real_models,
+            "stub_translator": not args.real_translator,
+            "corpus": {"dir": str(corpus_dir), "files": len(files), "bytes": sum(m["bytes"] for m in manifest)},
+        },
+        "results": results,
+        "errors": errors,
+    }
+
+    print(f"\n{'benchmark':<48} {'median s':>10} {'min s':>10}")
+    for key, r in sorted(results.items()):
+        if key.startswith(("stage/", "e2e/")):
+            print(f"{key:<48} {r['median']:>10.4f} {r['min']:>10.4f}")
+    for key, error in sorted(errors.items()):
+        print(f"error {key}: {error[:160]}")
+
+    for path in filter(None, [args.out, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {path}")
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("stand_in_models") != report["meta"]["stand_in_models"]:
+            print("warning: baseline was recorded with a different model setup")
+        print(f"\n{'vs baseline ' + (baseline['meta'].get('git_rev') or '?'):<48} {'base s':>10} {'now s':>10} {'ratio':>7}")
+        for key, base, cur, ratio, verdict in compare(results, baseline["results"], args.threshold, args.min_seconds):
+            regressions += verdict == "REGRESSION"
+            if verdict != "ok" or key.startswith(("stage/", "e2e/")):
+                print(f"{key:<48} {base:>10.4f} {cur:>10.4f} {ratio:>6.2f}x {verdict}")
+        print(f"{regressions} regression(s) over {args.threshold:.0%}")
+
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Insert latency of the Stage 4 result sink as the number of stored documents grows.
+
+    cd backend && python -m benchmarks.bench_result_store --sizes 10000 100000
+
+"legacy"  = the old save_stage4_output (read whole JSON array, rebuild the dedup
+            set, rewrite the file with indent=2) — only run up to --legacy-max docs.
+"store"   = nlpPipelne.ResultStore (sharded append-only JSONL + key index).
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from nlpPipelne.ResultStore import ResultStore
+
+
+def make_doc(i: int, rng: random.Random, sentences: int) -> dict:
+    words = "kmrl metro safety directive depot train signal inspection maintenance circular".split()
+    chunks = [{
+        "chunk_id": c + 1,
+        "sentences": [" ".join(rng.choices(words, k=15)) + "." for _ in range(4)],
+        "entities": {"ORG": ["KMRL"]},
+        "summary": " ".join(rng.choices(words, k=12)),
+    } for c in range(max(1, sentences // 4))]
+    return {"doc_id": f"doc-{i}.pdf", "file_type": "pdf", "chunks": chunks, "doc_summary": "summary", "entities": {}}
+
+
+def legacy_save(doc, output_path: Path):
+    """The pre-ResultStore implementation, verbatim in behaviour."""
+    if output_path.exists():
+        with open(output_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = []
+    existing_ids = {(d.get("doc_id"), d.get("chunk_id")) for d in data}
+    if (doc.get("doc_id"), doc.get("chunk_id")) not in existing_ids:
+        data.append(doc)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000
+    return pick(50), pick(99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--inserts", type=int, default=500, help="timed inserts per size (store)")
+    parser.add_argument("--legacy-inserts", type=int, default=5)
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    parser.add_argument("--sentences", type=int, default=8, help="sentences per synthetic doc")
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    print(f"{'stored docs':>12} {'sink':>7} {'p50 ms':>9} {'p99 ms':>9} {'lookup ms':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ResultStore(Path(tmp) / "store")
+            for i in range(size):
+                store.put(f"doc-{i}.pdf", make_doc(i, rng, args.sentences))
+
+            timings = []
+            for i in range(size, size + args.inserts):
+                doc = make_doc(i, rng, args.sentences)
+                t0 = time.perf_counter()
+                store.put(doc["doc_id"], doc)
+                timings.append(time.perf_counter() - t0)
+
+            fresh = ResultStore(Path(tmp) / "store")  # cold process: index read from disk
+            t0 = time.perf_counter()
+            fresh.get(f"doc-{size // 2}.pdf")
+            cold = (time.perf_counter() - t0) * 1000
+            p50, p99 = percentiles(timings)
+            print(f"{size:>12} {'store':>7} {p50:>9.3f} {p99:>9.3f} {cold:>10.1f}")
+
+            if size <= args.legacy_max:
+                legacy = Path(tmp) / "stage4_results.json"
+                with open(legacy, "w", encoding="utf-8") as f:
+                    json.dump([make_doc(i, rng, args.sentences) for i in range(size)], f, indent=2)
+                timings = []
+                for i in range(size, size + args.legacy_inserts):
+                    doc = make_doc(i, rng, args.sentences)
+                    t0 = time.perf_counter()
+                    legacy_save(doc, legacy)
+                    timings.append(time.perf_counter() - t0)
+                p50, p99 = percentiles(timings)
+                print(f"{size:>12} {'legacy':>7} {p50:>9.1f} {p99:>9.1f} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
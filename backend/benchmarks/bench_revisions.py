@@ -0,0 +1,158 @@
+"""
+Processing time of a new version of a long document: a --pages page PDF is
+processed, then a copy with --edit-pages pages rewritten, three ways:
+
+    full           the new version from scratch (no link to the previous one)
+    revision       process_file(previous_hash=...): nlpPipelne.Revisions
+    near-duplicate no hint, found by nlpPipelne.NearDuplicates and reused
+
+    cd backend && python -m benchmarks.bench_revisions --pages 200 --edit-pages 1
+
+The models are the stand-ins of benchmarks.stubs with a simulated cost per
+text (--ner-ms, --summary-ms, --embed-ms: defaults are rough CPU figures for
+bert-base-NER, bart-large-cnn and MiniLM on one ~100 word chunk), or the real
+ones with --real-models. Each way runs in a fresh working directory where
+the previous version was processed first (not timed).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import time
+from pathlib import Path
+
+from benchmarks import corpus, stubs
+from benchmarks.bench_pipeline import quiet, workdir
+
+STAGES = ("extraction", "normalisation", "chunking", "entity_summary", "indexing")
+
+
+def make_versions(directory: Path, pages: int, edit_pages: int, seed: int):
+    rng = random.Random(seed)
+    first = corpus.pages_of(rng, "en", pages)
+    second = list(first)
+    middle = pages // 2
+    for page in range(middle, min(pages, middle + edit_pages)):
+        second[page] = corpus.sentences(rng, "en", corpus.WORDS_PER_PAGE)
+    paths = directory / "circular_v1.pdf", directory / "circular_v2.pdf"
+    corpus.write_text_pdf(paths[0], first)
+    corpus.write_text_pdf(paths[1], second)
+    return paths
+
+
+def reset_state():
+    """The pipeline's module-level stores point at the working directory they were opened in."""
+    from nlpPipelne import NearDuplicates, ProcessPipeline, ProcessedIndex
+    from nlpPipelne.Checkpoints import CHECKPOINT_DIR, Checkpoints, RunLog
+    from nlpPipelne.stages import EmbedIndex
+
+    ProcessPipeline.checkpoints = Checkpoints(ProcessPipeline.STAGE_VERSIONS, CHECKPOINT_DIR)
+    ProcessPipeline.run_log = RunLog(CHECKPOINT_DIR)
+    ProcessPipeline._stage4_store = None
+    ProcessedIndex._cache.update(path=None, size=-1, records={})
+    if NearDuplicates._index is not None:
+        NearDuplicates._index.close()
+        NearDuplicates._index = None
+    EmbedIndex.clear_search_cache()
+
+
+@contextlib.contextmanager
+def free_models():
+    """No simulated model cost while the previous version is processed (it is not timed)."""
+    from nlpPipelne.stages import EmbedIndex, EntitySummary
+    stand_ins = [EntitySummary.ner_pipeline, EntitySummary.summarizer_pipeline, *EmbedIndex._models.values()]
+    costs = [getattr(model, "per_text", None) for model in stand_ins]
+    for model, cost in zip(stand_ins, costs):
+        if cost is not None:
+            model.per_text = 0.0
+    try:
+        yield
+    finally:
+        for model, cost in zip(stand_ins, costs):
+            if cost is not None:
+                model.per_text = cost
+
+
+def run(way: str, v1: Path, v2: Path, verbose: bool) -> dict:
+    from nlpPipelne import NearDuplicates, ProcessedIndex
+    from nlpPipelne.ProcessPipeline import process_file
+    from nlpPipelne.stages import EmbedIndex, EntitySummary
+
+    counted = {"ner": 0, "summaries": 0, "embedded": 0}
+    ner, summarise, embed = EntitySummary.extract_entities_batch, EntitySummary.summarize_texts, EmbedIndex._embed_texts
+
+    def count(name, fn, size=len):
+        def wrapper(texts, *args, **kwargs):
+            counted[name] += size(texts)
+            return fn(texts, *args, **kwargs)
+        return wrapper
+
+    def count_embedded(model, texts, *args, **kwargs):
+        counted["embedded"] += len(texts)
+        return embed(model, texts, *args, **kwargs)
+
+    stages = {}
+
+    def progress(event):
+        if event.get("status") == "done" and event["stage"] in STAGES:
+            stages[event["stage"]] = event["seconds"]
+
+    with workdir() as tmp, quiet(verbose):
+        reset_state()
+        NearDuplicates.NEAR_DUP_POLICY = "reuse" if way == "near-duplicate" else "off"
+        with free_models():
+            asyncio.run(process_file(str(v1), index_dir=str(tmp / "vectorStore")))
+
+        EntitySummary.extract_entities_batch = count("ner", ner)
+        EntitySummary.summarize_texts = count("summaries", summarise, lambda texts: sum(len(t.split()) >= 25 for t in texts))
+        EmbedIndex._embed_texts = count_embedded
+        try:
+            t0 = time.perf_counter()
+            doc = asyncio.run(process_file(
+                str(v2), index_dir=str(tmp / "vectorStore"), progress=progress,
+                previous_hash=ProcessedIndex.file_sha256(v1) if way == "revision" else None))
+            seconds = time.perf_counter() - t0
+        finally:
+            EntitySummary.extract_entities_batch, EntitySummary.summarize_texts = ner, summarise
+            EmbedIndex._embed_texts = embed
+
+        with open(tmp / "vectorStore" / EmbedIndex.METADATA_FILE, encoding="utf-8") as f:
+            metas = [json.loads(line) for line in f]
+        reset_state()
+    return {"seconds": seconds, "stages": stages, "chunks": len(doc["chunks"]), "revision": doc.get("revision_of"),
+            "vectors": len(metas), "tombstones": sum(1 for m in metas if m.get("tombstone")), **counted}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--edit-pages", type=int, default=1)
+    parser.add_argument("--ner-ms", type=float, default=40.0, help="simulated NER cost per chunk")
+    parser.add_argument("--summary-ms", type=float, default=1500.0, help="simulated summarisation cost per text")
+    parser.add_argument("--embed-ms", type=float, default=8.0, help="simulated embedding cost per chunk")
+    parser.add_argument("--real-models", action="store_true", help="load the real NER / summary / embedding models")
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    args = parser.parse_args()
+
+    stubs.install_translator()
+    if not args.real_models:
+        stubs.install_models(args.ner_ms / 1000, args.summary_ms / 1000, args.embed_ms / 1000)
+
+    with workdir() as tmp:
+        v1, v2 = make_versions(tmp, args.pages, args.edit_pages, args.seed)
+        print(f"{args.pages} pages, {args.edit_pages} rewritten; "
+              + ("real models" if args.real_models else
+                 f"simulated ms per text: ner {args.ner_ms:g}, summary {args.summary_ms:g}, embed {args.embed_ms:g}"))
+        print(f"\n{'way':<15} {'seconds':>8} " + " ".join(f"{s[:9]:>9}" for s in STAGES)
+              + f" {'chunks':>7} {'reused':>7} {'ner':>5} {'summ':>5} {'embed':>6} {'tombst':>7}")
+        for way in ["full", "revision", "near-duplicate"]:
+            r = run(way, v1, v2, args.verbose)
+            reused = (r["revision"] or {}).get("chunks_reused", 0)
+            print(f"{way:<15} {r['seconds']:>8.2f} " + " ".join(f"{r['stages'].get(s, 0):>9.2f}" for s in STAGES)
+                  + f" {r['chunks']:>7} {reused:>7} {r['ner']:>5} {r['summaries']:>5} {r['embedded']:>6} {r['tombstones']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Discrete-event simulation of the ingestion scheduler under mixed load.
+
+    cd backend && python -m benchmarks.bench_scheduler --workers 4 --hours 8
+
+Load: a bulk archive import (thousands of normal jobs queued at t=0), steady normal
+uploads from several departments and a trickle of urgent safety directives.
+Reports queueing delay (enqueue -> dispatch) per priority class and per department
+for plain FIFO and for api.app.scheduler.
+"""
+import argparse
+import heapq
+import random
+from collections import deque
+
+from api.app.scheduler import Scheduler, priority_class
+
+
+class Fifo:
+    def __init__(self):
+        self.queue = deque()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def push(self, job, priority, department, now):
+        self.queue.append((now, job, (priority_class(priority), department)))
+
+    def pop(self, now):
+        if not self.queue:
+            return None
+        enqueued_at, job, lane = self.queue.popleft()
+        return job, lane, enqueued_at
+
+
+def make_arrivals(hours: float, archive_jobs: int, seed: int):
+    rng = random.Random(seed)
+    horizon = hours * 3600
+    arrivals = [(0.0, "normal", "Archive") for _ in range(archive_jobs)]
+
+    streams = [
+        ("normal", "Operations", 120),   # mean seconds between uploads
+        ("normal", "Finance", 300),
+        ("normal", "Engineering", 180),
+        ("urgent", "Safety", 600),
+        ("urgent", "Operations", 1800),
+    ]
+    for priority, dept, mean_gap in streams:
+        t = rng.expovariate(1 / mean_gap)
+        while t < horizon:
+            arrivals.append((t, priority, dept))
+            t += rng.expovariate(1 / mean_gap)
+
+    arrivals.sort(key=lambda a: a[0])
+    return arrivals
+
+
+def simulate(queue, arrivals, workers: int, mean_service: float, seed: int):
+    rng = random.Random(seed)
+    events = [(t, 0, i) for i, (t, _, _) in enumerate(arrivals)]  # kind 0 = arrival, 1 = worker free
+    heapq.heapify(events)
+    idle = workers
+    delays = []
+
+    def dispatch(now):
+        nonlocal idle
+        while idle and len(queue):
+            job, lane, enqueued_at = queue.pop(now)
+            delays.append((lane, now - enqueued_at))
+            idle -= 1
+            heapq.heappush(events, (now + rng.expovariate(1 / mean_service), 1, job))
+
+    while events:
+        now, kind, i = heapq.heappop(events)
+        if kind == 0:
+            _, priority, dept = arrivals[i]
+            queue.push(i, priority, dept, now)
+        else:
+            idle += 1
+        dispatch(now)
+
+    return delays
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else 0.0
+
+
+def report(name, delays):
+    print(f"\n== {name} ==")
+    print(f"{'group':<22} {'jobs':>6} {'mean (min)':>11} {'p50':>8} {'p95':>8} {'max':>8}")
+    groups = {}
+    for (cls, dept), delay in delays:
+        groups.setdefault(f"class={cls}", []).append(delay)
+        groups.setdefault(f"  {cls}/{dept}", []).append(delay)
+    for group in sorted(groups, key=lambda g: (g.strip().split("/")[0].replace("class=", ""), g.startswith(" "), g)):
+        values = [d / 60 for d in groups[group]]
+        print(f"{group:<22} {len(values):>6} {sum(values) / len(values):>11.1f} "
+              f"{percentile(values, 50):>8.1f} {percentile(values, 95):>8.1f} {max(values):>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--hours", type=float, default=8)
+    parser.add_argument("--archive-jobs", type=int, default=3000)
+    parser.add_argument("--mean-service", type=float, default=40, help="mean seconds per document")
+    parser.add_argument("--aging", type=float, default=1800, help="aging interval in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    arrivals = make_arrivals(args.hours, args.archive_jobs, args.seed)
+    print(f"{len(arrivals)} jobs, {args.workers} workers, mean service {args.mean_service}s, aging {args.aging}s")
+
+    report("FIFO", simulate(Fifo(), arrivals, args.workers, args.mean_service, args.seed))
+    report("priority + fair share + aging",
+           simulate(Scheduler(aging=args.aging, weights={}), arrivals, args.workers, args.mean_service, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Search throughput (queries per second) of nlpPipelne.stages.EmbedIndex.
+
+    cd backend && python -m benchmarks.bench_search --docs 2000 --encode-latency 0.01
+
+The index is built in a temporary directory with the stub encoder
+(benchmarks.stubs), which then simulates --encode-latency seconds per model
+call plus --per-text seconds per query. --concurrency threads issue queries:
+
+    before     the search as it was: load the index from disk, encode the query, one-row index.search
+    uncached   search() with queries never seen before (embedding and result caches miss)
+    cached     search() with the dashboard queries (benchmarks.loadgen.QUERIES), warm caches
+    batched    search_batch() with --batch new queries per call
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import loadgen, stubs
+
+
+def legacy_search(query: str, top_k: int = 3):
+    """EmbedIndex.search before the caches: index and metadata read on every call."""
+    from nlpPipelne.stages import EmbedIndex
+    index, metas = EmbedIndex._load_index(Path(EmbedIndex.INDEX_DIR))
+    model = EmbedIndex._get_model(EmbedIndex.MODEL_NAME, EmbedIndex._device_str())
+    q = model.encode([query], convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+    distances, ids = index.search(q, top_k)
+    return [{"rank": i, "score": float(s), **metas[idx]} for i, (idx, s) in enumerate(zip(ids[0], distances[0]), 1)]
+
+
+def run(call, batches, concurrency: int):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(call, batches))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000, help="documents in the index (4 chunks each)")
+    parser.add_argument("--queries", type=int, default=2000, help="queries per mode")
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--encode-latency", type=float, default=0.01, help="seconds per model call")
+    parser.add_argument("--per-text", type=float, default=0.0005, help="seconds per query in a model call")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                loadgen.build_search_index(args.docs, args.seed)
+            stubs.install_encoder(args.encode_latency, args.per_text)
+            from nlpPipelne.stages import EmbedIndex
+
+            rng = random.Random(args.seed)
+            words = " ".join(loadgen.QUERIES).split()
+
+            def fresh(n):
+                return [f"{' '.join(rng.choices(words, k=3))} {rng.randrange(10 ** 9)}" for _ in range(n)]
+
+            dashboard = [loadgen.QUERIES[i % len(loadgen.QUERIES)] for i in range(args.queries)]
+            EmbedIndex.search_batch(loadgen.QUERIES)  # warm the cached mode
+
+            modes = [
+                ("before", lambda q: legacy_search(q[0]), [[q] for q in fresh(args.queries)]),
+                ("uncached", lambda q: EmbedIndex.search(q[0]), [[q] for q in fresh(args.queries)]),
+                ("cached", lambda q: EmbedIndex.search(q[0]), [[q] for q in dashboard]),
+                ("batched", EmbedIndex.search_batch,
+                 [fresh(args.batch) for _ in range(max(1, args.queries // args.batch))]),
+            ]
+            print(f"index: {args.docs * 4} vectors; model call {args.encode_latency * 1000:.1f} ms "
+                  f"+ {args.per_text * 1000:.2f} ms/query; {args.concurrency} threads")
+            print(f"{'mode':<9} {'queries':>8} {'seconds':>8} {'QPS':>9}")
+            for name, call, batches in modes:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    seconds = run(call, batches, args.concurrency)
+                n = sum(len(b) for b in batches)
+                print(f"{name:<9} {n:>8} {seconds:>8.2f} {n / seconds:>9.1f}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
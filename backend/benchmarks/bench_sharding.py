@@ -0,0 +1,125 @@
+"""
+Department-sharded FAISS store (VECTOR_SHARD_BY=department, nlpPipelne.stages.EmbedIndex)
+against the single index, as the number of departments grows:
+
+    cd backend && python -m benchmarks.bench_sharding --chunks 200000 --departments 4 16 64
+
+The vectors are synthetic, clustered and normalised (bench_vector_store); the
+departments have Zipf-like sizes, so the largest shards can cross
+--ann-min-vectors and get an HNSW index while the others stay flat. Each
+query comes from one department:
+
+    scoped   filters={"department": ...}: the single index over-fetches and filters,
+             the sharded store searches that department's shard only
+    global   no filter: the single index, or every shard on the thread pool (--threads), merged
+
+p50 / p99 are the latency of one query through EmbedIndex (shard lookup and
+merge included), recall@k against exact search over the same chunks.
+"""
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import loadgen
+from benchmarks.bench_pipeline import quiet
+from benchmarks.bench_vector_store import exact_top_k, make_vectors, recall
+from nlpPipelne.stages import EmbedIndex
+
+
+def departments(n: int, count: int, rng: np.random.Generator) -> np.ndarray:
+    weights = 1 / np.arange(1, count + 1) ** 0.8
+    return rng.choice(count, n, p=weights / weights.sum())
+
+
+def save(directory: Path, vectors: np.ndarray, ids: np.ndarray, depts: np.ndarray, ann: bool):
+    index = EmbedIndex._build_faiss_index(vectors[ids], "fp32", ann=ann)
+    metas = [{"doc_id": f"doc_{i // 8}", "chunk_id": int(i), "text_hash": f"{i:016x}", "department": str(depts[i])}
+             for i in ids]
+    EmbedIndex._save_index(index, None, metas, directory)
+
+
+def build_sharded(root: Path, vectors: np.ndarray, depts: np.ndarray, ann_min_vectors: int) -> dict:
+    t0 = time.perf_counter()
+    sizes = np.bincount(depts)
+    for dept in np.flatnonzero(sizes):
+        directory = root / EmbedIndex.SHARDS_DIR / EmbedIndex._shard_key({"department": str(dept)})
+        save(directory, vectors, np.flatnonzero(depts == dept), depts, sizes[dept] >= ann_min_vectors)
+    return {"seconds": time.perf_counter() - t0, "hnsw": int((sizes >= ann_min_vectors).sum()), "largest": sizes.max()}
+
+
+def measure(call, queries: np.ndarray, expected: list) -> tuple:
+    """(p50 ms, p99 ms, recall) of call(i, query vector) -> results, one query at a time."""
+    latencies, found = [], []
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        results = call(i, q[None, :])[0]
+        latencies.append(time.perf_counter() - t0)
+        found.append({r["chunk_id"] for r in results})
+    return loadgen.percentile(latencies, 50), loadgen.percentile(latencies, 99), recall(found, expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--departments", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ann-min-vectors", type=int, default=EmbedIndex.SHARD_ANN_MIN_VECTORS)
+    parser.add_argument("--threads", type=int, default=EmbedIndex.SHARD_SEARCH_THREADS)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    EmbedIndex._shard_pool = ThreadPoolExecutor(args.threads, thread_name_prefix="shard-search") if args.threads > 1 else None
+    rng = np.random.default_rng(args.seed)
+    vectors = make_vectors(args.chunks, args.dim, args.clusters, rng)
+    picked = rng.choice(args.chunks, args.queries, replace=False)
+    queries = vectors[picked] + rng.standard_normal((args.queries, args.dim), dtype=np.float32) * 0.05
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    expected = exact_top_k(vectors, queries, args.top_k)
+    k = args.top_k
+
+    print(f"{args.chunks} chunks, {args.dim} dimensions, {args.queries} queries, top {k}, "
+          f"HNSW from {args.ann_min_vectors} vectors per shard, {args.threads} search threads\n")
+    print(f"{'depts':>6} {'layout':<8} {'hnsw':>5} {'largest':>8} {'build s':>8} "
+          f"{'scoped p50':>11} {'p99':>7} {'recall':>7} {'global p50':>11} {'p99':>7} {'recall':>7}")
+    for count in args.departments:
+        depts = departments(args.chunks, count, rng)
+        query_depts = [str(d) for d in depts[picked]]
+        scoped_expected = [exact_top_k(vectors, q[None, :], k, depts == int(d))[0]
+                           for q, d in zip(queries, query_depts)]
+        with tempfile.TemporaryDirectory() as tmp, quiet(False):
+            t0 = time.perf_counter()
+            save(Path(tmp) / "single", vectors, np.arange(args.chunks), depts, False)
+            single_stats = {"seconds": time.perf_counter() - t0, "hnsw": 0, "largest": args.chunks}
+            sharded_stats = build_sharded(Path(tmp) / "sharded", vectors, depts, args.ann_min_vectors)
+
+            single = EmbedIndex._snapshot(str(Path(tmp) / "single"))[1]
+            sharded = str(Path(tmp) / "sharded")
+            EmbedIndex._shard_snapshots(sharded)  # every shard loaded before timing
+            rows = []
+            layouts = {
+                "single": (single_stats,
+                           lambda i, q: EmbedIndex._rank(single, q, k, {"department": query_depts[i]}),
+                           lambda i, q: EmbedIndex._rank(single, q, k)),
+                "sharded": (sharded_stats,
+                            lambda i, q: EmbedIndex._rank_shards(
+                                EmbedIndex._shard_snapshots(sharded, {"department": query_depts[i]}), q, k),
+                            lambda i, q: EmbedIndex._rank_shards(EmbedIndex._shard_snapshots(sharded), q, k)),
+            }
+            for layout, (stats, scoped, global_) in layouts.items():
+                s50, s99, s_recall = measure(scoped, queries, scoped_expected)
+                g50, g99, g_recall = measure(global_, queries, expected)
+                rows.append(f"{count:>6} {layout:<8} {stats['hnsw']:>5} {stats['largest']:>8} {stats['seconds']:>8.1f} "
+                            f"{s50:>11.2f} {s99:>7.2f} {s_recall:>7.3f} {g50:>11.2f} {g99:>7.2f} {g_recall:>7.3f}")
+            EmbedIndex.clear_search_cache()
+        print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
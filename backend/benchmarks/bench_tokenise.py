@@ -0,0 +1,81 @@
+"""
+Stage 2+3 tokenisation/chunking benchmark (translation excluded).
+
+    cd backend && python -m benchmarks.bench_tokenise --words 50000 --repeat 5
+
+"before" = separate sent_tokenize + word_tokenize, then chunking re-splits sentences.
+"after"  = single tokenise() pass, chunking reuses the token counts and offsets.
+"""
+import argparse
+import random
+import time
+
+from nltk.tokenize import sent_tokenize, word_tokenize
+
+from nlpPipelne.stages.CleaningNormalisation import clean_text, tokenise
+from nlpPipelne.stages.ChunkingPlaceholding import chunk_sentences, CHUNK_SIZE
+
+VOCAB = (
+    "kmrl metro rail train track signal maintenance depot station safety directive "
+    "rolling stock inspection platform aluva pettah kochi engineering finance circular "
+    "urgent schedule contractor tender inspection report brake door coach power"
+).split()
+
+
+def make_text(num_words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences, count = [], 0
+    while count < num_words:
+        n = rng.randint(6, 30)
+        words = [rng.choice(VOCAB) for _ in range(n)]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(n), str(rng.randint(1, 2025)))
+        sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", "!", "?"]))
+        count += n
+    return clean_text(" ".join(sentences))
+
+
+def before(cleaned: str):
+    sentences = sent_tokenize(cleaned)
+    words = word_tokenize(cleaned)
+    return chunk_sentences(sentences, words, CHUNK_SIZE)
+
+
+def after(cleaned: str):
+    tokenised = tokenise(cleaned)
+    sentences = [s["text"] for s in tokenised]
+    words = [token for s in tokenised for token, _, _ in s["tokens"]]
+    return chunk_sentences(
+        sentences,
+        words,
+        CHUNK_SIZE,
+        sentence_tokens=[s["tokens"] for s in tokenised],
+        sentence_spans=[[s["start"], s["end"]] for s in tokenised],
+    )
+
+
+def best_of(fn, text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'words':>8} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>8}")
+    for n in args.words:
+        text = make_text(n)
+        t_before = best_of(before, text, args.repeat)
+        t_after = best_of(after, text, args.repeat)
+        print(f"{n:>8} {t_before * 1000:>12.1f} {t_after * 1000:>12.1f} {t_before / t_after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
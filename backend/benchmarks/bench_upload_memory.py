@@ -0,0 +1,143 @@
+"""
+Peak RSS of receiving a large upload and of downloading a large URL upload,
+buffered (the whole body in memory, as the endpoints and worker used to do)
+vs streamed (api.app.utils.file_handler / api.app.worker.download).
+
+    cd backend && python -m benchmarks.bench_upload_memory --size-mb 500
+
+Each mode runs in a fresh process and reports how far its peak RSS rose above
+the RSS it had before the transfer. Uploads go through the API app in-process
+(local stand-ins, see benchmarks.loadgen); downloads are served by a local
+`python -m http.server`.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ["upload-buffered", "upload-streamed", "download-buffered", "download-streamed"]
+
+
+def rss_mib() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def make_file(path: str, size_mb: int):
+    block = os.urandom(2 ** 20)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+async def upload(mode: str, path: str):
+    import httpx
+    from fastapi import File, Form, UploadFile
+    from benchmarks import loadgen
+    app, users = await loadgen.local_app(1, 0, 0.0, False, 7)
+
+    @app.post("/bench/buffered")
+    async def buffered(file: UploadFile = File(...), user_id: str = Form(...)):
+        # the endpoints before streaming: whole upload in memory, then to disk
+        content = await file.read()
+        with open(os.path.join("temp", file.filename), "wb") as f:
+            f.write(content)
+        return {"size": len(content)}
+
+    url = "/bench/buffered" if mode == "upload-buffered" else "/documents/file"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        baseline = rss_mib()
+        with open(path, "rb") as f:
+            response = await client.post(url, files={"file": ("big.pdf", f, "application/pdf")}, data={
+                "user_id": users[0]["id"], "dept_name": "Operations", "priority": "normal"})
+        response.raise_for_status()
+    return baseline
+
+
+async def download(mode: str, url: str):
+    if mode == "download-buffered":
+        import aiohttp
+        baseline = rss_mib()
+        # the worker before streaming: new session per job, whole body in memory
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as resp:
+                content = await resp.read()
+        with open("downloaded.bin", "wb") as f:
+            f.write(content)
+        return baseline
+
+    from api.app import http_client
+    from api.app.worker import download as stream_download
+    baseline = rss_mib()
+    await stream_download(url, "downloaded.bin")
+    await http_client.close_session()
+    return baseline
+
+
+def child(mode: str, path: str, url: str):
+    from benchmarks import loadgen
+    os.environ.update(loadgen.LOCAL_BACKENDS)
+    t0 = time.perf_counter()
+    if mode.startswith("upload"):
+        baseline = asyncio.run(upload(mode, path))
+    else:
+        baseline = asyncio.run(download(mode, url))
+    print(f"{mode:<18} {time.perf_counter() - t0:>8.1f} {baseline:>12.0f} {peak_rss_mib():>10.0f} "
+          f"{peak_rss_mib() - baseline:>10.0f}", flush=True)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.path, args.url)
+        return
+
+    backend = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.pdf")
+        make_file(path, args.size_mb)
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-m", "http.server", str(port), "--bind", "127.0.0.1",
+                                   "--directory", tmp], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(1)
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [backend, os.getenv("PYTHONPATH")]))}
+        print(f"{args.size_mb} MiB file")
+        print(f"{'mode':<18} {'seconds':>8} {'rss before':>12} {'peak rss':>10} {'peak rise':>10}  (MiB)")
+        try:
+            for mode in args.modes:
+                work = tempfile.mkdtemp(dir=tmp)
+                subprocess.run([sys.executable, "-m", "benchmarks.bench_upload_memory", "--child", mode,
+                                "--path", path, "--url", f"http://127.0.0.1:{port}/big.pdf"],
+                               cwd=work, env=env, check=True, stdout=None, stderr=subprocess.DEVNULL)
+        finally:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    main()
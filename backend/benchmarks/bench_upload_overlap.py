@@ -0,0 +1,142 @@
+"""
+End-to-end latency of an upload (POST /documents/file until the worker has
+stored and recorded it), with the object-storage upload after the pipeline
+("sequential", as before) or overlapped with it ("overlapped", storage.upload_async).
+
+    cd backend && python -m benchmarks.bench_upload_overlap --storage-latency 0.5 --storage-mbps 10
+
+"sequential" uploads before the pipeline instead of after it, which costs the
+same. Each mode runs in a fresh process and working directory with the API and
+one worker in-process on the local stand-ins (benchmarks.loadgen) and the
+offline models (benchmarks.stubs). The object store is the local one
+slowed down to --storage-latency seconds per upload plus --storage-mbps of
+bandwidth, standing in for Cloudinary.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from benchmarks import corpus, loadgen, stubs
+from benchmarks.bench_pipeline import describe
+
+MODES = ["sequential", "overlapped"]
+
+
+def upload_inline(file_path, then=None) -> Future:
+    """storage.upload_async without the thread: the upload and the pipeline add up."""
+    from api.app import storage
+    future = Future()
+    url = storage.upload_with_retries(file_path)
+    future.set_result(then(url) if then else url)
+    return future
+
+
+def slow_store(latency: float, mbps: float):
+    from api.app.storage import LocalObjectStore
+
+    class SlowObjectStore(LocalObjectStore):
+        def upload(self, file_path: str) -> str:
+            time.sleep(latency + os.path.getsize(file_path) * 8 / (mbps * 1e6))
+            return super().upload(file_path)
+    return SlowObjectStore()
+
+
+def run_mode(mode, files, users, app, api_loop, verbose):
+    from api.app import job_queue, storage
+    from api.app.redis_client import get_sync_redis
+    from api.app.worker import run_job
+    import httpx
+
+    overlapped_upload = storage.upload_async
+    if mode == "sequential":
+        storage.upload_async = upload_inline
+
+    redis, worker_loop = get_sync_redis(), asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=600)
+    rows = []
+    try:
+        for path in files:
+            t0 = time.perf_counter()
+            with open(path, "rb") as f:
+                response = api_loop.run_until_complete(client.post("/documents/file", files={"file": (path.name, f)}, data={
+                    "user_id": users[0]["id"], "dept_name": loadgen.DEPARTMENTS[0], "priority": "normal"}))
+            response.raise_for_status()
+            endpoint = time.perf_counter() - t0
+
+            job = job_queue.claim_job(redis)
+            try:
+                with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+                    result = run_job(job, worker_loop, redis)
+            except Exception as e:
+                job_queue.fail_job(redis, job["id"], job["lease"], str(e), retry=False)
+                print(f"{mode:<11} {path.name:<24} failed: {describe(e)[:80]}")
+                continue
+            job_queue.complete_job(redis, job["id"], job["lease"], result)
+            rows.append((path.name, endpoint, time.perf_counter() - t0))
+    finally:
+        storage.upload_async = overlapped_upload
+        api_loop.run_until_complete(client.aclose())
+        worker_loop.close()
+    return rows
+
+
+def child(mode, corpus_dir, args):
+    """One mode in a fresh working directory: empty dedup index / checkpoints, every file is processed."""
+    os.environ.update(loadgen.LOCAL_BACKENDS)
+    stubs.install_translator()
+    stubs.install_models()
+
+    from api.app import storage
+    storage._store = slow_store(args.storage_latency, args.storage_mbps)
+    api_loop = asyncio.new_event_loop()
+    app, users = api_loop.run_until_complete(loadgen.local_app(5, 0, 0.0, False, 7))
+
+    files = sorted(Path(corpus_dir).glob("en_*"))
+    samples = []
+    for name, endpoint, total in run_mode(mode, files, users, app, api_loop, args.verbose):
+        print(f"{mode:<11} {name:<24} {endpoint * 1000:>12.1f} {total * 1000:>10.1f}")
+        samples.append(total)
+    if samples:
+        print(f"{mode}: mean {statistics.mean(samples) * 1000:.0f} ms, total {sum(samples):.2f} s "
+              f"for {len(samples)} uploads", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storage-latency", type=float, default=0.5, help="seconds per upload")
+    parser.add_argument("--storage-mbps", type=float, default=10.0, help="upload bandwidth, megabits/s")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--formats", nargs="+", default=["pdf", "scanned_pdf", "docx", "txt"])
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.corpus, args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = Path(tmp, "corpus")
+        corpus.generate(corpus_dir, pages=args.pages, languages=("en",), formats=args.formats)
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.getenv("PYTHONPATH")]))}
+        print(f"{'mode':<11} {'file':<24} {'endpoint ms':>12} {'total ms':>10}", flush=True)
+        for mode in MODES:
+            work = tempfile.mkdtemp(dir=tmp)
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_upload_overlap", "--child", mode,
+                            "--corpus", str(corpus_dir), "--storage-latency", str(args.storage_latency),
+                            "--storage-mbps", str(args.storage_mbps)] + (["--verbose"] if args.verbose else []),
+                           cwd=work, env=env, check=True, stderr=None if args.verbose else subprocess.DEVNULL)
+
+
+if __name__ == "__main__":
+    main()
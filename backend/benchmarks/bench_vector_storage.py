@@ -0,0 +1,123 @@
+"""
+Disk size, load time, memory and recall of the FAISS vector store
+(nlpPipelne.stages.EmbedIndex) per storage mode:
+
+    cd backend && python -m benchmarks.bench_vector_storage --chunks 200000
+
+    mode               VECTOR_STORAGE  STORE_RAW_EMBEDDINGS  CHUNK_TEXT_STORE
+    fp32+raw inline    fp32            1                     inline   (the previous layout)
+    fp32 blob          fp32            0                     blob
+    fp16 blob          fp16            0                     blob
+    int8 blob          int8            0                     blob
+    int8+raw blob      int8            1                     blob     (candidates re-scored on the mmapped raw copy)
+
+The vectors are synthetic, clustered and normalised (bench_vector_store); each
+chunk has five sentences drawn from a Zipf-distributed vocabulary. Every mode
+is loaded in a fresh process: "load s" is the time until the first search can
+run, "RSS MiB" the memory that took. recall@k is against exact float32 search;
+the latency is one query through EmbedIndex._rank (summary read included).
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import loadgen
+from benchmarks.bench_vector_store import exact_top_k, make_vectors, recall
+
+MODES = {
+    "fp32+raw inline": ("fp32", True, "inline"),
+    "fp32 blob": ("fp32", False, "blob"),
+    "fp16 blob": ("fp16", False, "blob"),
+    "int8 blob": ("int8", False, "blob"),
+    "int8+raw blob": ("int8", True, "blob"),
+}
+
+
+def make_metas(n: int, rng: np.random.Generator) -> list:
+    vocabulary = np.array([f"w{i}" for i in range(20000)] + " ".join(loadgen.QUERIES).split())
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    metas = []
+    for i in range(n):
+        words = vocabulary[rng.choice(len(vocabulary), 100, p=weights)]
+        sentences = [" ".join(words[j:j + 20]) + "." for j in range(0, 100, 20)]
+        metas.append({"doc_id": f"doc_{i // 8}.pdf", "file_type": "pdf", "file_path": f"uploads/doc_{i // 8}.pdf",
+                      "chunk_id": i, "text_hash": f"{i:016x}", "summary": sentences[0], "sentences": sentences})
+    return metas
+
+
+def build(directory: Path, mode: str, vectors: np.ndarray, metas: list):
+    from nlpPipelne.stages import EmbedIndex
+    storage, raw, text = MODES[mode]
+    EmbedIndex.CHUNK_TEXT_STORE = text
+    index = EmbedIndex._build_faiss_index(vectors, storage)
+    EmbedIndex._save_index(index, vectors if raw else None, metas, directory)
+
+
+def measure(directory: str, queries: np.ndarray, top_k: int) -> dict:
+    """In a fresh process: load the store, then search it."""
+    import psutil
+    from nlpPipelne.stages import EmbedIndex
+
+    process = psutil.Process()
+    rss = process.memory_info().rss
+    t0 = time.perf_counter()
+    snapshot = EmbedIndex._load_snapshot(directory, None)
+    load = time.perf_counter() - t0
+    loaded_rss = process.memory_info().rss - rss
+
+    found, latencies = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results = EmbedIndex._rank(snapshot, q[None, :], top_k)[0]
+        latencies.append(time.perf_counter() - t0)
+        found.append({r["chunk_id"] for r in results})
+    return {"load": load, "rss": loaded_rss, "found": found, "p50": loadgen.percentile(latencies, 50),
+            "p99": loadgen.percentile(latencies, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = make_vectors(args.chunks, args.dim, args.clusters, rng)
+    metas = make_metas(args.chunks, rng)
+    queries = vectors[rng.choice(args.chunks, args.queries, replace=False)]
+    queries = queries + rng.standard_normal(queries.shape, dtype=np.float32) * 0.05
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    expected = exact_top_k(vectors, queries, args.top_k)
+
+    print(f"{args.chunks} chunks, {args.dim} dimensions, {args.queries} queries, top {args.top_k}\n")
+    print(f"{'mode':<16} {'index MiB':>10} {'raw MiB':>8} {'meta MiB':>9} {'text MiB':>9} {'total MiB':>10} "
+          f"{'load s':>7} {'RSS MiB':>8} {'p50 ms':>7} {'p99 ms':>7} {'recall@' + str(args.top_k):>9}")
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes:
+            directory = Path(tmp) / mode.replace(" ", "_").replace("+", "_")
+            build(directory, mode, vectors, [dict(m) for m in metas])
+            from nlpPipelne.stages import EmbedIndex
+            sizes = [(directory / name).stat().st_size / 2 ** 20 if (directory / name).exists() else 0.0
+                     for name in (f"{EmbedIndex.INDEX_NAME}.faiss", EmbedIndex.EMBEDDINGS_FILE,
+                                  EmbedIndex.METADATA_FILE, EmbedIndex.CHUNK_TEXT_FILE)]
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                r = pool.submit(measure, str(directory), queries, args.top_k).result()
+            print(f"{mode:<16} {sizes[0]:>10.0f} {sizes[1]:>8.0f} {sizes[2]:>9.0f} {sizes[3]:>9.0f} {sum(sizes):>10.0f} "
+                  f"{r['load']:>7.2f} {r['rss'] / 2 ** 20:>8.0f} {r['p50']:>7.2f} {r['p99']:>7.2f} "
+                  f"{recall(r['found'], expected):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Vector search on FAISS (the files in vectorStore/) against pgvector
+(nlpPipelne.stages.PgVectorStore) at --sizes chunks, on a local Postgres
+with the vector extension:
+
+    cd backend && python -m benchmarks.bench_vector_store --dsn "host=localhost dbname=kmrl_db user=kmrl_user" \\
+        --sizes 100000 1000000
+
+The vectors are synthetic, clustered and normalised, with --dim dimensions (384:
+paraphrase-multilingual-MiniLM-L12-v2); each chunk is in one of --departments.
+The store runs in its own schema (bench_vectors, dropped at the end).
+
+    load         seconds to add the vectors (FAISS: index.add; pgvector: binary COPY, without the ANN index)
+    build        seconds to build the ANN index, and its size
+    p50 / p99    latency of one query
+    QPS          throughput of --batch queries per call (pgvector: one statement)
+    recall@k     share of the exact top k found; "filtered" rows restrict to one department
+"""
+import argparse
+import time
+
+import numpy as np
+import psycopg
+from psycopg import conninfo
+
+from benchmarks import loadgen
+
+SCHEMA = "bench_vectors"
+MODEL = "bench"
+
+
+def make_vectors(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """n normalised vectors around `clusters` random centres, like embeddings of similar documents."""
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        stop = min(n, start + 100_000)
+        out[start:stop] = centres[rng.integers(0, clusters, stop - start)]
+        out[start:stop] += rng.standard_normal((stop - start, dim), dtype=np.float32) * 0.6
+    out /= np.linalg.norm(out, axis=1, keepdims=True)
+    return out
+
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int, mask: np.ndarray = None) -> list:
+    ids = np.arange(len(data)) if mask is None else np.flatnonzero(mask)
+    scores = queries @ data[ids].T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(ids[row].tolist()) for row in top]
+
+
+def recall(found: list, expected: list) -> float:
+    return float(np.mean([len(f & e) / len(e) for f, e in zip(found, expected)]))
+
+
+def timed(call, queries: np.ndarray, batch: int):
+    """(one-query latencies, batched QPS, results per query)."""
+    latencies, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(call(q[None, :])[0])
+        latencies.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for start in range(0, len(queries), batch):
+        call(queries[start:start + batch])
+    return latencies, len(queries) / (time.perf_counter() - t0), results
+
+
+def report(name: str, param: str, latencies, qps, found, expected, load="", build="", size=""):
+    qps = f"{qps:.0f}" if qps else "-"
+    print(f"{name:<18} {param:<14} {load:>8} {build:>8} {size:>9} {loadgen.percentile(latencies, 50):>8.2f} "
+          f"{loadgen.percentile(latencies, 99):>8.2f} {qps:>8} {recall(found, expected):>9.3f}")
+
+
+def bench_faiss(data, queries, depts, query_depts, args, expected, expected_filtered):
+    import faiss
+
+    t0 = time.perf_counter()
+    index = faiss.IndexFlatIP(data.shape[1])
+    index.add(data)
+    load = time.perf_counter() - t0
+
+    def call(vectors):
+        _, ids = index.search(vectors, args.k)
+        return [set(row.tolist()) for row in ids]
+
+    latencies, qps, found = timed(call, queries, args.batch)
+    report("faiss flat", "exact", latencies, qps, found, expected, f"{load:.1f}", "-", f"{data.nbytes / 2 ** 20:.0f}")
+
+    # EmbedIndex filters after the search, fetching FILTER_OVERFETCH x top_k candidates
+    from nlpPipelne.stages.EmbedIndex import FILTER_OVERFETCH
+
+    def filtered(vectors, dept):
+        _, ids = index.search(vectors, args.k * FILTER_OVERFETCH)
+        return [set([i for i in row if depts[i] == dept][:args.k]) for row in ids]
+
+    latencies, found = [], []
+    for q, dept in zip(queries, query_depts):
+        t0 = time.perf_counter()
+        found.append(filtered(q[None, :], dept)[0])
+        latencies.append(time.perf_counter() - t0)
+    report("faiss flat", "filtered", latencies, None, found, expected_filtered)
+
+
+def bench_pgvector(store, data, queries, query_depts, args, expected, expected_filtered):
+    def hits(rows):
+        return [{int(meta["text_hash"]) for _, meta in row} for row in rows]
+
+    with psycopg.connect(store.dsn, autocommit=True) as conn:
+        for kind in args.indexes:
+            t0 = time.perf_counter()
+            store.build_index(kind, m=args.m, ef_construction=args.ef_construction)
+            build = time.perf_counter() - t0
+            size = conn.execute(f"SELECT pg_relation_size('{SCHEMA}.idx_embeddings_vector')").fetchone()[0]
+
+            sweep = [("ef_search", v) for v in args.ef_search] if kind == "hnsw" else [("probes", v) for v in args.probes]
+            for i, (param, value) in enumerate(sweep):
+                def call(vectors):
+                    return hits(store.search(vectors, args.k, MODEL, **{param: value}))
+
+                latencies, qps, found = timed(call, queries, args.batch)
+                extra = (f"{build:.1f}", f"{size / 2 ** 20:.0f}") if i == 0 else ("", "")
+                report(f"pgvector {kind}", f"{param}={value}", latencies, qps, found, expected, "", *extra)
+
+            latencies, found = [], []
+            for q, dept in zip(queries, query_depts):
+                t0 = time.perf_counter()
+                found.append(hits(store.search(q[None, :], args.k, MODEL, {"department": int(dept)}))[0])
+                latencies.append(time.perf_counter() - t0)
+            report(f"pgvector {kind}", "filtered", latencies, None, found, expected_filtered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", required=True, help="libpq connection string or URL; needs CREATE EXTENSION vector")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--departments", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--indexes", nargs="+", default=["hnsw", "ivfflat"], choices=["hnsw", "ivfflat"])
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=64)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200])
+    parser.add_argument("--probes", type=int, nargs="+", default=[10, 32])
+    parser.add_argument("--copy-batch", type=int, default=50_000, help="rows per add() call")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from nlpPipelne.stages.PgVectorStore import PgVectorStore
+
+    dsn = conninfo.make_conninfo(args.dsn, options=f"-c search_path={SCHEMA},public")
+    admin = psycopg.connect(args.dsn, autocommit=True)
+    admin.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    version = admin.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'").fetchone()[0]
+    print(f"pgvector {version}, {args.dim} dimensions, {args.queries} queries, top {args.k}")
+    try:
+        for n in args.sizes:
+            rng = np.random.default_rng(args.seed)
+            data = make_vectors(n, args.dim, args.clusters, rng)
+            depts = rng.integers(0, args.departments, n)
+            queries = make_vectors(args.queries, args.dim, args.clusters, np.random.default_rng(args.seed))
+            query_depts = rng.integers(0, args.departments, args.queries)
+            expected = exact_top_k(data, queries, args.k)
+            expected_filtered = [exact_top_k(data, q[None, :], args.k, depts == d)[0] for q, d in zip(queries, query_depts)]
+
+            print(f"\n{n} vectors")
+            print(f"{'backend':<18} {'param':<14} {'load s':>8} {'build s':>8} {'size MiB':>9} {'p50 ms':>8} "
+                  f"{'p99 ms':>8} {'QPS':>8} {'recall@' + str(args.k):>9}")
+            bench_faiss(data, queries, depts, query_depts, args, expected, expected_filtered)
+
+            admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            admin.execute(f"CREATE SCHEMA {SCHEMA}")
+            store = PgVectorStore(args.dim, dsn)
+            store.drop_index()
+            t0 = time.perf_counter()
+            for start in range(0, n, args.copy_batch):
+                stop = min(n, start + args.copy_batch)
+                metas = [{"text_hash": str(i), "department": int(depts[i]), "chunk_id": i} for i in range(start, stop)]
+                store.add(metas, data[start:stop], MODEL, ensure_index=False)
+            load = time.perf_counter() - t0
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                conn.execute("VACUUM ANALYZE embeddings")
+                table = conn.execute("SELECT pg_total_relation_size('embeddings')").fetchone()[0]
+            print(f"{'pgvector COPY':<18} {f'{n / load:.0f} rows/s':<14} {load:>8.1f} {'-':>8} {table / 2 ** 20:>9.0f}")
+            bench_pgvector(store, data, queries, query_depts, args, expected, expected_filtered)
+            store.close()
+    finally:
+        admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Deterministic synthetic KMRL document corpus.
+
+    cd backend && python -m benchmarks.corpus /tmp/kmrl_corpus --pages 1 5 20 --languages en ml
+
+Writes, for every language and size, one file per format: text PDF, scanned
+(image-only) PDF, DOCX, CSV, XLSX, HTML, EML and TXT, plus manifest.json
+({"file", "format", "language", "pages", "words", "bytes"} per file). The same
+seed always gives byte-identical text content.
+
+Notes:
+- Text PDFs use the built-in Helvetica font, which has no Malayalam glyphs, so
+  Malayalam text PDFs are not generated; Malayalam PDFs are scanned only.
+- Scanned pages are rendered with --font (default DejaVuSans). Pass a Malayalam
+  TTF (e.g. NotoSansMalayalam-Regular.ttf) for realistic Malayalam scans.
+- XLSX needs openpyxl; it is skipped (with a note) when that is not installed.
+"""
+import argparse
+import csv
+import json
+import random
+from email.message import EmailMessage
+from pathlib import Path
+
+import docx
+from PIL import Image, ImageDraw, ImageFont
+
+WORDS_PER_PAGE = 350
+DEFAULT_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+FORMATS = ("pdf", "scanned_pdf", "docx", "csv", "xlsx", "html", "eml", "txt")
+
+VOCAB = {
+    "en": (
+        "kmrl metro rail train track signal maintenance depot station safety directive "
+        "rolling stock inspection platform aluva pettah kochi engineering finance circular "
+        "urgent schedule contractor tender report brake door coach power overhead traction "
+        "substation commissioning audit compliance passenger ticketing escalator lift"
+    ).split(),
+    "ml": (
+        "കൊച്ചി മെട്രോ ട്രെയിൻ സ്റ്റേഷൻ സുരക്ഷ നിർദ്ദേശം പരിശോധന അറ്റകുറ്റപ്പണി ഡിപ്പോ "
+        "യാത്രക്കാർ ടിക്കറ്റ് പ്ലാറ്റ്ഫോം സിഗ്നൽ വൈദ്യുതി റിപ്പോർട്ട് ധനകാര്യം എഞ്ചിനീയറിംഗ് "
+        "അടിയന്തിരം സമയക്രമം കരാർ ടെൻഡർ ബ്രേക്ക് വാതിൽ കോച്ച് ഓഡിറ്റ് ആലുവ പേട്ട"
+    ).split(),
+}
+NAMES = ["Loknath Behera", "Anita Menon", "Rajesh Kumar", "Priya Nair", "Suresh Babu"]
+DEPARTMENTS = ["Operations", "Engineering", "Safety", "Finance", "HR"]
+
+
+# -----------------------------
+# Text
+# -----------------------------
+def sentences(rng: random.Random, language: str, num_words: int):
+    vocab = VOCAB[language]
+    out, count = [], 0
+    while count < num_words:
+        n = rng.randint(6, 24)
+        words = [rng.choice(vocab) for _ in range(n)]
+        r = rng.random()
+        if r < 0.15:
+            words.insert(rng.randrange(n), f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/20{rng.randint(18, 25)}")
+        elif r < 0.25:
+            words.insert(rng.randrange(n), rng.choice(NAMES))
+        elif r < 0.3:
+            words.insert(rng.randrange(n), f"KMRL{rng.randint(100, 9999)}")
+        sentence = " ".join(words)
+        out.append((sentence[0].upper() + sentence[1:] if language == "en" else sentence) + ".")
+        count += n
+    return out
+
+
+def pages_of(rng, language, pages):
+    return [sentences(rng, language, WORDS_PER_PAGE) for _ in range(pages)]
+
+
+def wrap(text: str, width: int):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: Path, pages):
+    """Minimal PDF 1.4 with one Helvetica text stream per page (no dependencies)."""
+    objects = []  # bodies, object n is objects[n - 1]
+    page_ids = []
+    for page in pages:
+        lines = wrap(" ".join(page), 95)[:60]
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        data = stream.encode("latin-1", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"")  # page, filled in once the pages object id is known
+        page_ids.append((len(objects), content_id))
+
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    font_id = len(objects)
+    kids = " ".join(f"{pid} 0 R" for pid, _ in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+    pages_id = len(objects)
+    for pid, content_id in page_ids:
+        objects[pid - 1] = (f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 595 842] "
+                            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>").encode()
+    objects.append(f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode())
+    catalog_id = len(objects)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref)
+    path.write_bytes(bytes(out))
+
+
+def write_scanned_pdf(path: Path, pages, font_path: str, seed: int):
+    """Image-only PDF (150 dpi A4 greyscale with a little noise) -> forces the OCR path."""
+    rng = random.Random(seed)
+    font = ImageFont.truetype(font_path, 22)
+    images = []
+    for page in pages:
+        img = Image.new("L", (1240, 1754), 255)
+        draw = ImageDraw.Draw(img)
+        y = 80
+        for line in wrap(" ".join(page), 80)[:55]:
+            draw.text((80 + rng.randint(-2, 2), y), line, font=font, fill=rng.randint(0, 40))
+            y += 30
+        for _ in range(400):  # scanner speckle
+            draw.point((rng.randrange(1240), rng.randrange(1754)), fill=rng.randint(120, 200))
+        images.append(img)
+    images[0].save(path, "PDF", resolution=150, save_all=True, append_images=images[1:])
+
+
+def write_docx(path: Path, pages):
+    document = docx.Document()
+    document.add_heading("KMRL Circular", level=1)
+    for page in pages:
+        for i in range(0, len(page), 5):
+            document.add_paragraph(" ".join(page[i:i + 5]))
+    document.save(path)
+
+
+def _rows(rng, language, pages):
+    vocab = VOCAB[language]
+    for i in range(pages * 40):
+        yield {
+            "id": f"KMRL{i:05d}",
+            "date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+            "department": rng.choice(DEPARTMENTS),
+            "owner": rng.choice(NAMES),
+            "remarks": " ".join(rng.choice(vocab) for _ in range(rng.randint(4, 10))),
+            "amount": rng.randint(1000, 500000),
+        }
+
+
+def write_csv(path: Path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_xlsx(path: Path, rows) -> bool:
+    try:
+        import pandas as pd
+        pd.DataFrame(rows).to_excel(path, index=False)
+        return True
+    except ImportError as e:
+        print(f"skipping {path.name}: {e}")
+        return False
+
+
+def write_html(path: Path, pages, language: str):
+    body = "\n".join(
+        f"<section><h2>Section {i + 1}</h2>" + "".join(f"<p>{s}</p>" for s in page) + "</section>"
+        for i, page in enumerate(pages)
+    )
+    path.write_text(
+        f'<!DOCTYPE html><html lang="{language}"><head><meta charset="utf-8"><title>KMRL notice</title>'
+        f"<style>p {{ margin: 0 }}</style></head><body><nav>Home | Circulars</nav>{body}</body></html>",
+        encoding="utf-8",
+    )
+
+
+def write_eml(path: Path, pages, rng):
+    msg = EmailMessage()
+    msg["From"] = "operations@kochimetro.org"
+    msg["To"] = "documents@kochimetro.org"
+    msg["Subject"] = f"Directive KMRL{rng.randint(100, 9999)}"
+    msg.set_content("\n\n".join(" ".join(page) for page in pages))
+    path.write_bytes(bytes(msg))
+
+
+# -----------------------------
+# Corpus
+# -----------------------------
+def generate(out_dir, pages=(1, 5), languages=("en", "ml"), formats=FORMATS, font_path=DEFAULT_FONT, seed=0):
+    """Write the corpus and return the manifest entries."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = []
+    for language in languages:
+        for n in pages:
+            rng = random.Random(f"{seed}-{language}-{n}")
+            text_pages = pages_of(rng, language, n)
+            rows = list(_rows(rng, language, n))
+            stem = f"{language}_{n}p"
+            for fmt in formats:
+                if fmt == "pdf" and language != "en":
+                    continue  # Helvetica has no Malayalam glyphs, see module docstring
+                ext = {"scanned_pdf": "pdf"}.get(fmt, fmt)
+                path = out_dir / f"{stem}_{fmt}.{ext}"
+                if fmt == "pdf":
+                    write_text_pdf(path, text_pages)
+                elif fmt == "scanned_pdf":
+                    write_scanned_pdf(path, text_pages, font_path, seed)
+                elif fmt == "docx":
+                    write_docx(path, text_pages)
+                elif fmt == "csv":
+                    write_csv(path, rows)
+                elif fmt == "xlsx" and not write_xlsx(path, rows):
+                    continue
+                elif fmt == "html":
+                    write_html(path, text_pages, language)
+                elif fmt == "eml":
+                    write_eml(path, text_pages, rng)
+                elif fmt == "txt":
+                    path.write_text("\n".join(" ".join(page) for page in text_pages), encoding="utf-8")
+                manifest.append({
+                    "file": path.name,
+                    "format": fmt,
+                    "language": language,
+                    "pages": n,
+                    "words": n * WORDS_PER_PAGE,
+                    "bytes": path.stat().st_size,
+                })
+
+    with open(out_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--languages", nargs="+", default=["en", "ml"], choices=sorted(VOCAB))
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    parser.add_argument("--font", default=DEFAULT_FONT, help="TTF used to render scanned pages")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate(args.out_dir, args.pages, args.languages, args.formats, args.font, args.seed)
+    total = sum(m["bytes"] for m in manifest)
+    print(f"wrote {len(manifest)} files ({total / 2 ** 20:.1f} MiB) to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Async load generator for the API: replays a weighted request mix and reports
+throughput and latency percentiles per endpoint.
+
+In-process (default): the FastAPI app runs on local stand-ins — in-memory table
+store (DATA_BACKEND=memory), filesystem object store (STORAGE_BACKEND=local),
+fakeredis (REDIS_BACKEND=fake) and the stub embedding model — seeded with
+synthetic departments, users and documents, and is driven through httpx's ASGI
+transport on one event loop, like a single uvicorn worker.
+
+    cd backend && python -m benchmarks.loadgen --mix listdocs=6,search=2,login=2 --concurrency 32 --duration 20
+    cd backend && python -m benchmarks.loadgen --db-latency 0.03   # emulate the Supabase round trip
+
+Against a running server (start it with DATA_BACKEND=memory LOCAL_DB_FIXTURE=fixture.json
+STORAGE_BACKEND=local REDIS_BACKEND=fake so it has the same seed data):
+
+    cd backend && python -m benchmarks.loadgen --write-fixture fixture.json
+    cd backend && python -m benchmarks.loadgen --url http://localhost:8000 --fixture fixture.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+PASSWORD = "loadtest-password"
+DEPARTMENTS = ["Operations", "Engineering", "Safety", "Finance", "HR"]
+LOCAL_BACKENDS = {"DATA_BACKEND": "memory", "STORAGE_BACKEND": "local", "REDIS_BACKEND": "fake"}
+QUERIES = [
+    "safety directive for depot inspection", "rolling stock maintenance schedule",
+    "signal failure report aluva", "tender for escalator contract", "finance circular march",
+]
+
+
+# -----------------------------
+# Seed data
+# -----------------------------
+def make_fixture(users: int, docs_per_dept: int, seed: int) -> dict:
+    from api.app.utils.security import hash_password
+
+    rng = random.Random(seed)
+    password_hash = hash_password(PASSWORD)  # bcrypt once, shared by every user
+    departments = [{"dept_id": i + 1, "name": name} for i, name in enumerate(DEPARTMENTS)]
+    tables = {
+        "departments": departments,
+        "users": [{
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "name": f"User {i}",
+            "email": f"user{i}@kochimetro.org",
+            "phone": f"+9190000{i:05d}",
+            "password": password_hash,
+            "role": "staff",
+            "department": rng.choice(departments)["dept_id"],
+        } for i in range(users)],
+        "documents": [],
+        "summaries": [],
+    }
+    for dept in departments:
+        for _ in range(docs_per_dept):
+            doc_id = len(tables["documents"]) + 1
+            tables["documents"].append({
+                "doc_id": doc_id,
+                "title": f"circular_{doc_id}.pdf",
+                "department": dept["dept_id"],
+                "url": f"file:///object_store/circular_{doc_id}.pdf",
+                "medium": rng.choice(["direct file", "url", "email", "whatsapp"]),
+                "priority": rng.choice(["normal", "normal", "high", "urgent"]),
+                "doc_type": "general",
+            })
+            tables["summaries"].append({"id": doc_id, "doc_id": doc_id, "content": rng.choice(QUERIES)})
+    return tables
+
+
+def build_search_index(docs: int, seed: int):
+    """Small FAISS index in ./vectorStore embedded with the stub encoder."""
+    from benchmarks import stubs
+    from nlpPipelne.stages.EmbedIndex import indexing_batch
+
+    stubs.install_encoder()
+    rng = random.Random(seed)
+    words = " ".join(QUERIES).split()
+    batch = [{
+        "doc_id": f"circular_{i}.pdf",
+        "file_type": "pdf",
+        "doc_summary": rng.choice(QUERIES),
+        "chunks": [{"chunk_id": c + 1, "summary": "", "sentences": [" ".join(rng.choices(words, k=20)) + "."]}
+                   for c in range(4)],
+    } for i in range(docs)]
+    indexing_batch(batch)
+
+
+# -----------------------------
+# Requests
+# -----------------------------
+def request_for(endpoint: str, rng: random.Random, users: list, docs: int = 1):
+    user = rng.choice(users)
+    if endpoint == "listdocs":
+        return "GET", "/documents/listdocs", {"params": {"user_id": user["id"]}}
+    if endpoint == "search":
+        return "GET", "/documents/search", {"json": {"query": rng.choice(QUERIES)}}
+    if endpoint == "login":
+        return "POST", "/auth/login", {"json": {"user_id": user["id"], "password": PASSWORD}}
+    if endpoint == "profile":
+        return "GET", f"/profile/{user['id']}", {}
+    if endpoint == "transexions":
+        return "GET", f"/transexions/{user['id']}", {}
+    if endpoint == "history":
+        return "GET", f"/profile/history/{user['id']}", {}
+    if endpoint == "summary":
+        return "GET", "/documents/summary", {"json": {"doc_id": str(rng.randint(1, docs))}}
+    raise ValueError(f"Unknown endpoint in mix: {endpoint}")
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+async def run_load(client, mix: dict, users: list, concurrency: int, duration: float, total: int, seed: int,
+                   docs: int = 1):
+    latencies = {name: [] for name in mix}
+    failures = {name: 0 for name in mix}
+    names, weights = list(mix), list(mix.values())
+    sent = 0
+    deadline = time.perf_counter() + duration
+
+    async def user_loop(i):
+        nonlocal sent
+        rng = random.Random(seed * 1000 + i)
+        while time.perf_counter() < deadline and (not total or sent < total):
+            sent += 1
+            endpoint = rng.choices(names, weights)[0]
+            method, path, kwargs = request_for(endpoint, rng, users, docs)
+            t0 = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies[endpoint].append(time.perf_counter() - t0)
+            failures[endpoint] += not ok
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user_loop(i) for i in range(concurrency)))
+    return latencies, failures, time.perf_counter() - t0
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000 if samples else 0.0
+
+
+def report(latencies, failures, wall):
+    rows = {}
+    print(f"{'endpoint':<12} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    for name, samples in sorted(latencies.items()):
+        rows[name] = {
+            "requests": len(samples),
+            "errors": failures[name],
+            "rps": len(samples) / wall,
+            "mean_ms": statistics.mean(samples) * 1000 if samples else 0.0,
+            "p50_ms": percentile(samples, 50),
+            "p90_ms": percentile(samples, 90),
+            "p99_ms": percentile(samples, 99),
+            "max_ms": max(samples) * 1000 if samples else 0.0,
+        }
+        r = rows[name]
+        print(f"{name:<12} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p90_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    total = sum(len(s) for s in latencies.values())
+    print(f"total: {total} requests in {wall:.1f}s → {total / wall:.1f} req/s")
+    return {"wall_seconds": wall, "total_rps": total / wall, "endpoints": rows}
+
+
+async def local_app(users: int, docs_per_dept: int, db_latency: float, search: bool, seed: int):
+    """The API app on local stand-ins, seeded; returns (app, seeded users)."""
+    # Before anything imports api.app.config
+    os.environ.update(LOCAL_BACKENDS, LOCAL_DB_LATENCY=str(db_latency))
+    from api.app.config import supabase
+
+    tables = make_fixture(users, docs_per_dept, seed)
+    supabase.tables.update(tables)
+    if search:
+        build_search_index(docs_per_dept * len(DEPARTMENTS), seed)
+
+    from api.app.main import app
+    from api.app.redis_client import get_redis
+    app.state.redis = await get_redis()  # startup event (not run by the ASGI transport)
+    return app, tables["users"]
+
+
+async def main_async(args):
+    mix = parse_mix(args.mix)
+
+    if args.url:
+        with open(args.fixture, "r", encoding="utf-8") as f:
+            users = json.load(f)["users"]
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            return await run_load(client, mix, users, args.concurrency, args.duration, args.requests, args.seed,
+                                  args.docs_per_dept * len(DEPARTMENTS))
+
+    app, users = await local_app(args.users, args.docs_per_dept, args.db_latency, "search" in mix, args.seed)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=args.timeout) as client:
+        result = await run_load(client, mix, users, args.concurrency, args.duration, args.requests, args.seed,
+                                args.docs_per_dept * len(DEPARTMENTS))
+
+    from api.app import cache
+    for namespace, rates in cache.hit_rates().items():
+        print(f"cache {namespace:<12} {rates['lookups']:>7} lookups, hit rate {rates['hit_rate']:.1%} "
+              f"(l1 {rates['l1']}, redis {rates['redis']}, shared {rates['shared']}, miss {rates['miss']})")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="listdocs=6,search=2,login=2",
+                        help="endpoint=weight,... (listdocs, search, login, profile, transexions, history, summary)")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = duration only)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--docs-per-dept", type=int, default=200)
+    parser.add_argument("--db-latency", type=float, default=0.0, help="seconds slept per table-store query")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--url", help="load a running server instead of the in-process app")
+    parser.add_argument("--fixture", help="seed data the server was started with (--url mode)")
+    parser.add_argument("--write-fixture", help="only write the seed data to this file")
+    parser.add_argument("--out", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.write_fixture:
+        os.environ.update(LOCAL_BACKENDS)
+        with open(args.write_fixture, "w", encoding="utf-8") as f:
+            json.dump(make_fixture(args.users, args.docs_per_dept, args.seed), f)
+        print(f"seed data written to {args.write_fixture}")
+        return
+    if args.url and not args.fixture:
+        parser.error("--url needs --fixture (the seed data the server runs with)")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.url:
+            os.chdir(tmp)  # vector store, object store and temp uploads stay out of the repo
+        try:
+            latencies, failures, wall = asyncio.run(main_async(args))
+        finally:
+            os.chdir(cwd)
+
+    result = report(latencies, failures, wall)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), **result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
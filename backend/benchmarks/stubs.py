@@ -0,0 +1,122 @@
+"""
+Offline stand-ins for the network translator and the HF / sentence-transformers
+models, so the pipeline can be benchmarked without downloads or GPUs.
+
+The stand-ins keep the call signatures and output shapes of the real objects
+and cost roughly linear time in their input. They measure everything around
+the models (I/O, OCR, tokenisation, batching, index writes); run without them
+(--real-models in bench_pipeline) to include model inference.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+EMBEDDING_DIM = 384
+_CAPITALISED = re.compile(r"\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b|\b[A-Z]{2,}\d*\b")
+
+
+class StubTranslator:
+    """googletrans.Translator without the network: returns the text unchanged."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency  # simulated round trip per call, seconds
+
+    async def translate(self, text, dest="en", src="auto"):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return SimpleNamespace(text=text, src=src, dest=dest)
+
+
+class TinyNER:
+    """
+    'ner' pipeline with grouped_entities: capitalised spans as ORG/PER/MISC.
+    per_text: simulated model cost per text, seconds.
+    """
+
+    def __init__(self, per_text: float = 0.0):
+        self.per_text = per_text
+
+    def _one(self, text):
+        entities = []
+        for m in _CAPITALISED.finditer(text):
+            word = m.group()
+            label = "ORG" if word.isupper() else "PER" if " " in word else "MISC"
+            entities.append({"entity_group": label, "word": word, "score": 1.0, "start": m.start(), "end": m.end()})
+        return entities
+
+    def __call__(self, texts, batch_size=None, **kwargs):
+        if self.per_text:
+            time.sleep(self.per_text * (1 if isinstance(texts, str) else len(texts)))
+        if isinstance(texts, str):
+            return self._one(texts)
+        return [self._one(t) for t in texts]
+
+
+class TinySummarizer:
+    """'summarization' pipeline: the first max_length words. per_text: simulated model cost per text, seconds."""
+
+    def __init__(self, per_text: float = 0.0):
+        self.per_text = per_text
+
+    def __call__(self, texts, max_length=60, min_length=10, do_sample=False, batch_size=None, **kwargs):
+        batch = [texts] if isinstance(texts, str) else texts
+        if self.per_text:
+            time.sleep(self.per_text * len(batch))
+        return [{"summary_text": " ".join(t.split()[:max_length])} for t in batch]
+
+
+class TinyEncoder:
+    """
+    SentenceTransformer.encode: hashed bag of words, EMBEDDING_DIM floats.
+    latency / per_text: simulated model cost per encode() call and per sentence, seconds.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, latency: float = 0.0, per_text: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_text = per_text
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False,
+               show_progress_bar=False, **kwargs):
+        if self.latency or self.per_text:
+            time.sleep(self.latency + self.per_text * len(sentences))
+        vecs = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for i, text in enumerate(sentences):
+            for word in text.lower().split():
+                h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+                vecs[i, h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+            vecs /= np.where(norms == 0, 1, norms)
+        return vecs
+
+
+def install_translator(latency: float = 0.0):
+    from nlpPipelne.stages import CleaningNormalisation
+    CleaningNormalisation.translator = StubTranslator(latency)
+
+
+def install_encoder(latency: float = 0.0, per_text: float = 0.0):
+    """Replace the embedding model (Stage 5 and /documents/search)."""
+    from nlpPipelne.stages import EmbedIndex
+    EmbedIndex._models[(EmbedIndex.MODEL_NAME, EmbedIndex._device_str())] = TinyEncoder(latency=latency, per_text=per_text)
+
+
+def install_models(ner_per_text: float = 0.0, summary_per_text: float = 0.0, encoder_per_text: float = 0.0):
+    """Replace the Stage 4/5 models; call before importing nlpPipelne.ProcessPipeline."""
+    from nlpPipelne.stages import EntitySummary
+
+    def init_models(device: str = "cpu"):
+        EntitySummary.ner_pipeline = TinyNER(ner_per_text)
+        EntitySummary.summarizer_pipeline = TinySummarizer(summary_per_text)
+
+    EntitySummary.init_models = init_models
+    init_models()
+    install_encoder(per_text=encoder_per_text)
@@ -0,0 +1,110 @@
+"""
+Per-stage checkpoints so a failed run resumes instead of starting over.
+
+Every stage's output is stored under (file hash, stage) together with the version
+chain of all stages up to it. A checkpoint is only reused while that chain still
+matches the current STAGE_VERSIONS, so bumping one stage's version (new model,
+new chunk size, ...) invalidates that stage and everything after it, while the
+earlier stages (OCR, translation) are still reused.
+
+Retention: checkpoints only live while a file is in flight. Once its run has
+finished (its result is in the stage 4 store / processed-file index) drop()
+removes all of them, and the store compacts itself as removed records pile up
+(nlpPipelne.ResultStore). A file whose run keeps failing keeps its checkpoints
+until it succeeds or is dropped by hand (Checkpoints(...).drop(file_hash)).
+
+Runs and stage transitions are written to a local equivalent of the
+pipeline_runs / pipeline_logs tables (runs.jsonl / logs.jsonl, same columns).
+"""
+import json
+import time
+import uuid
+from pathlib import Path
+
+from nlpPipelne.ResultStore import ResultStore
+
+CHECKPOINT_DIR = "checkpoints"
+STAGES = ("extraction", "normalisation", "chunking", "entity_summary", "indexing")
+
+
+class Checkpoints:
+    def __init__(self, versions: dict, root=CHECKPOINT_DIR):
+        self.versions = versions
+        self.store = ResultStore(Path(root) / "stages")
+
+    def _chain(self, stage: str) -> list:
+        return [self.versions[s] for s in STAGES[:STAGES.index(stage) + 1]]
+
+    def save(self, file_hash: str, stage: str, output):
+        self.store.put(f"{file_hash}:{stage}", {
+            "file_hash": file_hash,
+            "stage": stage,
+            "chain": self._chain(stage),
+            "output": output,
+            "saved_at": time.time(),
+        }, overwrite=True)
+
+    def load(self, file_hash: str, stage: str):
+        """(found, output) of a checkpoint that is still valid for the current versions."""
+        rec = self.store.get(f"{file_hash}:{stage}")
+        if not rec or rec.get("invalid") or rec.get("chain") != self._chain(stage):
+            return False, None
+        return True, rec["output"]
+
+    def resume_point(self, file_hash: str):
+        """(number of completed stages, output of the last one) — (0, None) for a fresh run."""
+        for i in range(len(STAGES), 0, -1):
+            found, output = self.load(file_hash, STAGES[i - 1])
+            if found:
+                return i, output
+        return 0, None
+
+    def drop(self, file_hash: str) -> int:
+        """Remove every checkpoint of a file (its run finished); returns how many there were."""
+        return sum(self.store.delete(f"{file_hash}:{stage}") for stage in STAGES)
+
+    def invalidate(self, file_hash: str, stage: str):
+        """Force `stage` (and therefore the stages after it) to run again for one file."""
+        self.store.put(f"{file_hash}:{stage}", {"invalid": True}, overwrite=True)
+
+
+class RunLog:
+    """Append-only pipeline_runs / pipeline_logs records."""
+
+    def __init__(self, root=CHECKPOINT_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _append(self, name: str, record: dict):
+        with open(self.root / name, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def start(self, file_hash: str, **metadata) -> str:
+        run_uuid = str(uuid.uuid4())
+        self._append("runs.jsonl", {
+            "run_uuid": run_uuid,
+            "status": "running",
+            "started_at": time.time(),
+            "metadata": {"file_hash": file_hash, **metadata},
+        })
+        return run_uuid
+
+    def log(self, run_uuid: str, stage: str, message: str, level: str = "info", model_name: str = None,
+            model_version: str = None):
+        self._append("logs.jsonl", {
+            "run_uuid": run_uuid,
+            "stage": stage,
+            "message": message,
+            "model_name": model_name,
+            "model_version": model_version,
+            "level": level,
+            "created_at": time.time(),
+        })
+
+    def finish(self, run_uuid: str, status: str, **metadata):
+        self._append("runs.jsonl", {
+            "run_uuid": run_uuid,
+            "status": status,
+            "finished_at": time.time(),
+            "metadata": metadata,
+        })
@@ -0,0 +1,178 @@
+"""
+In-process instrumentation of pipeline stages and model calls.
+
+    with Metrics.measure("pipeline_stage", sizes=Metrics.doc_sizes(doc), stage="chunking") as m:
+        ...
+    m -> {"wall_seconds", "cpu_seconds", "rss_peak_delta_bytes", "pages", "chars", ...}
+
+Every measured block is recorded as histograms (wall time, CPU time, growth of
+the peak RSS and the input sizes), labelled with the keyword labels. Cache hits
+and misses are counters. Each process has its own registry: snapshot() gives a
+JSON-serialisable copy, merge() adds up the snapshots of several processes
+(API + workers) and render() formats one in the Prometheus text format.
+"""
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "kmrl_"
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(2 ** i * 1024 * 1024 for i in range(13))  # 1 MiB .. 4 GiB
+SIZE_BUCKETS = (1, 10, 100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+SIZES = ("pages", "chars", "chunks", "tokens")
+
+# ru_maxrss is in KiB on Linux, bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> {"buckets", "counts", "sum", "count"}
+_counters = {}    # (name, labels) -> value
+
+
+def _buckets_for(name: str):
+    if name.endswith("_seconds"):
+        return TIME_BUCKETS
+    if name.endswith("_bytes"):
+        return BYTES_BUCKETS
+    return SIZE_BUCKETS
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, value: float, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            buckets = _buckets_for(name)
+            hist = _histograms[key] = {"buckets": list(buckets), "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(hist["buckets"]):
+            if value <= bound:
+                hist["counts"][i] += 1
+                break
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def inc(name: str, value: float = 1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def cache(name: str, hit: bool):
+    """Count one lookup in the cache called `name`."""
+    inc("pipeline_cache_hits_total" if hit else "pipeline_cache_misses_total", cache=name)
+
+
+def _peak_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+@contextmanager
+def measure(name: str, sizes: dict = None, **labels):
+    """
+    Time the block and record {name}_wall_seconds, {name}_cpu_seconds,
+    {name}_rss_peak_delta_bytes and {name}_input_{pages,chars,chunks,tokens}.
+    The yielded dict holds the measurements after the block (sizes may be
+    filled in inside it); nothing is recorded if the block raises.
+    """
+    record = dict(sizes or {})
+    rss0, cpu0, wall0 = _peak_rss(), time.process_time(), time.perf_counter()
+    yield record
+    record.update(
+        wall_seconds=time.perf_counter() - wall0,
+        cpu_seconds=time.process_time() - cpu0,
+        rss_peak_delta_bytes=_peak_rss() - rss0,
+    )
+    for field in ("wall_seconds", "cpu_seconds", "rss_peak_delta_bytes"):
+        observe(f"{name}_{field}", record[field], **labels)
+    for field in SIZES:
+        if record.get(field) is not None:
+            observe(f"{name}_input_{field}", record[field], **labels)
+
+
+def doc_sizes(doc: dict) -> dict:
+    """Input size of a pipeline document at whatever stage it is."""
+    if not doc:
+        return {}
+    text = doc.get("cleaned_text") or doc.get("translated_text") or doc.get("raw_text") or ""
+    sizes = {"pages": doc.get("pages"), "chars": len(text)}
+    if "sentence_tokens" in doc:
+        sizes["tokens"] = sum(len(tokens) for tokens in doc["sentence_tokens"])
+    if "chunks" in doc:
+        sizes["chunks"] = len(doc["chunks"])
+    return sizes
+
+
+def texts_sizes(texts) -> dict:
+    """Input size of a model call over a list of texts."""
+    return {"chunks": len(texts), "chars": sum(len(t) for t in texts)}
+
+
+# -----------------------------
+# Snapshots / exposition
+# -----------------------------
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "histograms": [{"name": n, "labels": dict(l), **h, "counts": list(h["counts"])}
+                           for (n, l), h in _histograms.items()],
+            "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in _counters.items()],
+        }
+
+
+def merge(snapshots) -> dict:
+    """Add up snapshots of several processes (same metric + labels are summed)."""
+    histograms, counters = {}, {}
+    for snap in snapshots:
+        for h in snap.get("histograms", []):
+            key = _key(h["name"], h["labels"])
+            if key not in histograms:
+                histograms[key] = {**h, "counts": list(h["counts"])}
+                continue
+            merged = histograms[key]
+            merged["counts"] = [a + b for a, b in zip(merged["counts"], h["counts"])]
+            merged["sum"] += h["sum"]
+            merged["count"] += h["count"]
+        for c in snap.get("counters", []):
+            key = _key(c["name"], c["labels"])
+            counters[key] = {**c, "value": counters.get(key, {}).get("value", 0) + c["value"]}
+    return {"histograms": list(histograms.values()), "counters": list(counters.values())}
+
+
+def _labels(labels: dict, **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in items.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(items, escaped)) + "}"
+
+
+def render(snap: dict) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines, typed = [], set()
+    for h in sorted(snap.get("histograms", []), key=lambda h: (h["name"], sorted(h["labels"].items()))):
+        name = PREFIX + h["name"]
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(h["buckets"], h["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(h['labels'], le=repr(float(bound)))} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(h['labels'], le='+Inf')} {h['count']}")
+        lines.append(f"{name}_sum{_labels(h['labels'])} {h['sum']}")
+        lines.append(f"{name}_count{_labels(h['labels'])} {h['count']}")
+    for c in sorted(snap.get("counters", []), key=lambda c: (c["name"], sorted(c["labels"].items()))):
+        name = PREFIX + c["name"]
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_labels(c['labels'])} {c['value']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,244 @@
+"""
+Near-duplicate documents: MinHash signatures of the cleaned text and a
+persistent LSH index, checked right after Stage 2 so reissued circulars (new
+date, one edited paragraph, a re-scan) are recognised. A reused match is
+processed as a new version of it (nlpPipelne.Revisions): only the chunks that
+differ go through Stage 4-5. A match's doc_key is its file hash, so its Stage 4
+output is ProcessPipeline.processed_doc(match["doc_key"]).
+
+    sig = signature(doc["cleaned_text"])
+    match = get_index().query(sig)          # {"doc_key", "doc_id", "similarity"} or None
+    get_index().add(doc_key, sig, doc_id)
+
+Signature: the minimum of NUM_PERM multiply-shift hashes over the document's
+SHINGLE_SIZE-word shingles; the share of equal positions in two signatures
+estimates the Jaccard similarity of their shingle sets.
+
+LSH: the signature is cut into LSH_BANDS bands of NUM_PERM / LSH_BANDS values
+and each band hashed to a bucket. Documents sharing a bucket are candidates;
+only those are compared, so a lookup costs LSH_BANDS index probes whatever the
+number of documents. With 20 bands of 6 rows a pair at similarity 0.8 is a
+candidate with probability 0.998, at 0.7 with 0.92 and at 0.3 with 0.015.
+
+The index is a SQLite file (NEAR_DUP_DB) shared by the API workers and
+nlpPipelne.ingest. What happens to a match is decided by `policy`, replaceable
+with set_policy().
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+NEAR_DUP_DB = os.getenv("NEAR_DUP_DB", "near_duplicates.sqlite3")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", 0.7))  # link at or above this estimated Jaccard
+NEAR_DUP_REUSE = float(os.getenv("NEAR_DUP_REUSE", 0.85))         # reuse the earlier results at or above this
+NEAR_DUP_POLICY = os.getenv("NEAR_DUP_POLICY", "reuse")           # reuse | link | off
+
+# Changing these makes existing signatures incomparable: start a new NEAR_DUP_DB
+SHINGLE_SIZE = 4
+NUM_PERM = 120
+LSH_BANDS = 20
+SEED = 1
+SHINGLE_BLOCK = 8192  # shingles hashed per numpy step (bounds memory on long documents)
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)  # odd multipliers
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+_EMPTY = np.full(NUM_PERM, 2 ** 32 - 1, dtype=np.uint32)
+
+
+# -----------------------------
+# Signatures
+# -----------------------------
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = _WORD.findall(text.casefold())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def signature(text: str):
+    """
+    NUM_PERM uint32 MinHash values of the text's shingles; None for text without
+    words (empty pages, failed OCR), which is not comparable to anything.
+    """
+    words = shingles(text)
+    if not words:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in words),
+        dtype=np.uint64)
+    sig = _EMPTY.copy()
+    for start in range(0, len(hashes), SHINGLE_BLOCK):
+        block = hashes[start:start + SHINGLE_BLOCK]
+        # multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits
+        permuted = ((_A[:, None] * block[None, :] + _B[:, None]) >> np.uint64(32)).astype(np.uint32)
+        np.minimum(sig, permuted.min(axis=1), out=sig)
+    return sig
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def band_buckets(sig: np.ndarray) -> list:
+    """One signed 64-bit bucket id per band (the band number is part of the hash)."""
+    rows = NUM_PERM // LSH_BANDS
+    return [int.from_bytes(hashlib.blake2b(bytes([band]) + sig[band * rows:(band + 1) * rows].tobytes(),
+                                           digest_size=8).digest(), "little", signed=True)
+            for band in range(LSH_BANDS)]
+
+
+# -----------------------------
+# LSH index
+# -----------------------------
+class NearDuplicateIndex:
+    def __init__(self, path=NEAR_DUP_DB):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+              id INTEGER PRIMARY KEY,
+              doc_key TEXT UNIQUE NOT NULL,
+              doc_id TEXT,
+              signature BLOB NOT NULL,
+              created REAL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+              bucket INTEGER NOT NULL,
+              doc INTEGER NOT NULL,
+              PRIMARY KEY (bucket, doc)
+            ) WITHOUT ROWID;
+        """)
+
+    def add(self, doc_key: str, sig: np.ndarray, doc_id: str = None):
+        """Index a document (doc_key: its file hash); re-adding a key is a no-op."""
+        self.add_many([(doc_key, sig, doc_id)])
+
+    def add_many(self, docs):
+        """(doc_key, signature, doc_id) tuples in one transaction."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                for doc_key, sig, doc_id in docs:
+                    cur.execute("INSERT OR IGNORE INTO signatures (doc_key, doc_id, signature, created) VALUES (?, ?, ?, ?)",
+                                (doc_key, doc_id, sig.astype(np.uint32).tobytes(), now))
+                    if cur.rowcount:
+                        doc = cur.lastrowid
+                        cur.executemany("INSERT OR IGNORE INTO buckets (bucket, doc) VALUES (?, ?)",
+                                        [(bucket, doc) for bucket in band_buckets(sig)])
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+
+    def candidates(self, sig: np.ndarray) -> list:
+        """(doc_key, doc_id, signature) of the documents sharing at least one band bucket."""
+        buckets = band_buckets(sig)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT doc_key, doc_id, signature FROM signatures WHERE id IN "
+                f"(SELECT doc FROM buckets WHERE bucket IN ({','.join('?' * len(buckets))}))", buckets).fetchall()
+        return [(key, doc_id, np.frombuffer(blob, dtype=np.uint32)) for key, doc_id, blob in rows]
+
+    def query(self, sig: np.ndarray, threshold: float = NEAR_DUP_THRESHOLD, exclude: str = None):
+        """The most similar indexed document at or above threshold, or None."""
+        best = None
+        for doc_key, doc_id, other in self.candidates(sig):
+            if doc_key == exclude:
+                continue
+            score = similarity(sig, other)
+            if score >= threshold and (best is None or score > best["similarity"]):
+                best = {"doc_key": doc_key, "doc_id": doc_id, "similarity": score}
+        return best
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM signatures").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+_index = None
+
+
+def get_index() -> NearDuplicateIndex:
+    global _index
+    if _index is None:
+        _index = NearDuplicateIndex()
+    return _index
+
+
+# -----------------------------
+# Policy
+# -----------------------------
+def default_policy(doc: dict, match: dict) -> str:
+    """Reuse the match's results when similar enough for NEAR_DUP_REUSE, otherwise only link to it."""
+    if NEAR_DUP_POLICY == "reuse" and match["similarity"] >= NEAR_DUP_REUSE:
+        return "reuse"
+    return "link"
+
+
+policy = default_policy
+
+
+def set_policy(fn):
+    """fn(doc, match) -> "reuse" | "link" | "ignore", called for every near-duplicate found."""
+    global policy
+    policy = fn
+
+
+def _text(doc: dict) -> str:
+    return doc.get("cleaned_text") or doc.get("raw_text") or ""
+
+
+def check(doc: dict):
+    """
+    (signature, match, decision) for a Stage 2 document; match and decision
+    are None when nothing similar is indexed (all three with NEAR_DUP_POLICY=off
+    or for a document without text).
+    """
+    if NEAR_DUP_POLICY == "off":
+        return None, None, None
+    sig = signature(_text(doc))
+    if sig is None:
+        return None, None, None
+    match = get_index().query(sig, exclude=doc.get("file_hash"))
+    if match is None:
+        return sig, None, None
+    decision = policy(doc, match)
+    if decision == "ignore":
+        return sig, None, None
+    return sig, match, decision
+
+
+def remember(docs, signatures: dict = None):
+    """
+    Index processed documents (signatures: file_hash -> signature already
+    computed by check()). Documents without text are not indexed.
+    """
+    if NEAR_DUP_POLICY == "off":
+        return
+    signatures = signatures or {}
+    entries = []
+    for doc in docs:
+        if doc.get("file_hash"):
+            key = doc["file_hash"]
+            sig = signatures[key] if key in signatures else signature(_text(doc))
+            if sig is not None:
+                entries.append((key, sig, doc.get("doc_id")))
+    if entries:
+        get_index().add_many(entries)
+
@@ -1,72 +1,214 @@
-import json
+import os
 from pathlib import Path
 
 from nlpPipelne.stages.TextExtraction import extract_text
 from nlpPipelne.stages.CleaningNormalisation import clean_normalise
-from nlpPipelne.stages.ChunkingPlaceholding import chunking
-from nlpPipelne.stages.EntitySummary import entity_summary, init_models
-from nlpPipelne.stages.EmbedIndex import indexing
+from nlpPipelne.stages.ChunkingPlaceholding import chunking, CHUNK_SIZE
+from nlpPipelne.stages.EntitySummary import entity_summary, init_models, NER_MODEL_NAME, SUM_MODEL_NAME
+from nlpPipelne.stages.EmbedIndex import indexing, index_for_department, MODEL_NAME as EMBED_MODEL_NAME
+from nlpPipelne import Metrics, NearDuplicates, ProcessedIndex, Revisions
+from nlpPipelne.Checkpoints import Checkpoints, RunLog, STAGES, CHECKPOINT_DIR
+from nlpPipelne.ResultStore import ResultStore
 
 
 
-STAGE4_OUTPUT_FILE = "stage4_results.json"
+STAGE4_OUTPUT_FILE = "stage4_results.json"  # legacy single-array file, imported once
+STAGE4_STORE_DIR = "stage4_store"
+PG_DOCUMENT_STORE = os.getenv("PG_DOCUMENT_STORE", "0") == "1"  # also write Stage 3/4 output to Postgres
 
 init_models(device="cpu")
 
-def save_stage4_output(doc, output_file=STAGE4_OUTPUT_FILE):
-    output_path = Path(output_file)
-
-    if output_path.exists():
-        try:
-            with open(output_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if not isinstance(data, list):
-                data = []
-        except Exception:
-            data = []
-    else:
-        data = []
-
-    # Avoid duplicates
-    existing_ids = {(d.get("doc_id"), d.get("chunk_id")) for d in data}
-    if (doc.get("doc_id"), doc.get("chunk_id")) not in existing_ids:
-        data.append(doc)
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-async def process_file(file_path, index_dir="vectorStore"):
+_stage4_store = None
+
+def _get_stage4_store(store_dir=STAGE4_STORE_DIR):
+    global _stage4_store
+    if _stage4_store is None:
+        is_new = not Path(store_dir).exists()
+        _stage4_store = ResultStore(store_dir)
+        if is_new and Path(STAGE4_OUTPUT_FILE).exists():
+            imported = _stage4_store.import_json_array(STAGE4_OUTPUT_FILE)
+            print(f"Imported {imported} docs from {STAGE4_OUTPUT_FILE} into {store_dir}/")
+    return _stage4_store
+
+def save_stage4_output(doc):
     """
-        Full pipeline: Stage 1 → Stage 5
+    Append one document's Stage 4 output (kept once per doc_id; a new version,
+    i.e. another file_hash under the same doc_id, shadows the previous one).
     """
+    store = _get_stage4_store()
+    stored = store.get(doc.get("doc_id"))
+    return store.put(doc.get("doc_id"), doc,
+                     overwrite=stored is not None and stored.get("file_hash") != doc.get("file_hash"))
+
+def load_stage4_output(doc_id):
+    """Stage 4 output of one document, or None."""
+    return _get_stage4_store().get(doc_id)
+
+def processed_doc(file_hash):
+    """Stage 4 output of the file with this hash if it was processed here (and is still stored), else None."""
+    known = ProcessedIndex.lookup(file_hash) if file_hash else None
+    doc = load_stage4_output(known["doc_id"]) if known and known.get("doc_id") else None
+    if doc is None or doc.get("file_hash", file_hash) != file_hash:
+        return None  # not processed, or the doc_id now holds another file's output
+    return doc
 
-    # Stage 1: Extract text
-    
-    stage1_result = extract_text(file_path)
-    print("STAGE 1 DONE")
-    print(stage1_result)
-
-    # Stage 2: Clean + normalize
-    processed = await clean_normalise(stage1_result)
-    print("STAGE 2 DONE")
-    print(processed)
-
-    # Stage 3: Chunking
-    chunks = chunking(processed, doc_id=stage1_result["doc_id"])
-    print("STAGE 3 DONE")
-    print(chunks)
-
-    # Stage 4: Entity + Summarization
-    doc = entity_summary(chunks)
-    print("STAGE 4 DONE")
-    print(doc)
-
-    # Save Stage 4 output to JSON array (appending)
-    save_stage4_output(doc)
-
-    # Stage 5: Embedding + Indexing
-    indexing(doc, index_dir)
-    print("STAGE 5 DONE")
+def save_stage4_documents(docs):
+    """PG_DOCUMENT_STORE=1: documents, chunks, entities and summaries rows, one transaction per call."""
+    if PG_DOCUMENT_STORE and docs:
+        from nlpPipelne.PgDocumentStore import get_store
+        written = get_store().write(docs, summary_model=SUM_MODEL_NAME)
+        print(f"Stored in Postgres: {written}")
+
+# Bump a version when a stage's model / configuration changes: its checkpoints
+# (and those of the stages after it) are then recomputed, earlier ones reused.
+STAGE_VERSIONS = {
+    "extraction": "1",
+    "normalisation": "2",  # single-pass tokenisation with offsets
+    "chunking": f"3-{CHUNK_SIZE}",  # chunk words are word tokens only
+    "entity_summary": f"1-{NER_MODEL_NAME}-{SUM_MODEL_NAME}",
+    "indexing": f"1-{EMBED_MODEL_NAME}",
+}
+checkpoints = Checkpoints(STAGE_VERSIONS, CHECKPOINT_DIR)
+run_log = RunLog(CHECKPOINT_DIR)
+
+def _report(progress, stage, **event):
+    if progress:
+        progress({"stage": stage, **event})
+
+def _page_reporter(progress):
+    if progress:
+        return lambda page: _report(progress, "extraction", status="page", **page)
+
+def _chunk_reporter(progress):
+    """Stage 4 results per chunk, so clients can show summaries before doc_summary."""
+    if progress:
+        return lambda chunk, done, total: _report(
+            progress, "entity_summary", status="chunk", chunk_id=chunk.get("chunk_id"), done=done, chunks=total,
+            summary=chunk.get("summary"), entities=chunk.get("entities"))
+
+async def process_file(file_path, index_dir="vectorStore", progress=None, file_hash=None, previous_hash=None,
+                       department=None):
+    """
+        Full pipeline: Stage 1 → Stage 5
+        progress: optional callable receiving {"stage": ..., "status": ...} events as stages
+                  start and finish, per extracted page and per Stage 4 chunk
+        file_hash: sha256 of the file if the caller already computed it while saving;
+                   a file whose hash was processed before returns the stored result
+        previous_hash: file hash of the version this file replaces; only its changed
+                   chunks are processed (nlpPipelne.Revisions)
+        department: department of the uploader, kept with the chunks (and their
+                   index shard with VECTOR_SHARD_BY=department)
+    """
+    if file_hash is None:
+        file_hash = ProcessedIndex.file_sha256(file_path)
+
+    known = processed_doc(file_hash)
+    Metrics.cache("processed_file", known is not None)
+    if known is not None:
+        print(f"♻️ Identical file already processed ({file_hash[:12]}), skipping all stages")
+        _report(progress, "dedup", status="hit")
+        index_for_department(known, department, index_dir)
+        return known
+
+    # Resume after the last stage that completed for this file (same stage versions)
+    completed, doc = checkpoints.resume_point(file_hash)
+    Metrics.cache("stage_checkpoint", completed > 0)
+    run_uuid = run_log.start(file_hash, file_path=str(file_path), resumed_after=completed)
+    if completed:
+        print(f"↩️ Resuming {Path(file_path).name} after stage {completed} ({STAGES[completed - 1]})")
+        run_log.log(run_uuid, STAGES[completed - 1], "reused checkpoint")
+
+    stage_metrics = {}
+    near_sig = previous = None
+    if previous_hash:
+        previous = processed_doc(previous_hash)
+        if previous is None:
+            print(f"⚠️ Previous version {previous_hash[:12]} not processed here, processing the whole file")
+
+    def measure(n, doc):
+        _report(progress, STAGES[n - 1], status="started")
+        return Metrics.measure("pipeline_stage", Metrics.doc_sizes(doc), stage=STAGES[n - 1])
+
+    def stage_done(n, doc, measured):
+        nonlocal completed
+        stage = STAGES[n - 1]
+        checkpoints.save(file_hash, stage, doc)
+        stage_metrics[stage] = measured
+        run_log.log(run_uuid, stage, "done", model_version=STAGE_VERSIONS[stage])
+        print(f"STAGE {n} DONE ({stage}): {measured['wall_seconds']:.2f}s wall, "
+              f"{measured['cpu_seconds']:.2f}s cpu, +{measured['rss_peak_delta_bytes'] / 2 ** 20:.0f} MiB peak rss")
+        _report(progress, stage, status="done", seconds=round(measured["wall_seconds"], 3))
+        completed = n
+
+    try:
+        # Stage 1: Extract text
+        if completed < 1:
+            with measure(1, None) as m:
+                doc = extract_text(file_path, on_page=_page_reporter(progress))
+                m.update(Metrics.doc_sizes(doc))
+            doc["file_hash"] = file_hash
+            stage_done(1, doc, m)
+
+        # Stage 2: Clean + normalize
+        if completed < 2:
+            with measure(2, doc) as m:
+                doc = await clean_normalise(doc)
+            stage_done(2, doc, m)
+
+        # Near-duplicate of an earlier upload (reissued circular, re-scan): policy decides
+        if completed < 3:
+            near_sig, near_match, decision = NearDuplicates.check(doc)
+            Metrics.cache("near_duplicate", near_match is not None)
+            if near_match:
+                _report(progress, "dedup", status="near_duplicate", decision=decision, **near_match)
+                if previous is None and decision == "reuse":
+                    previous = processed_doc(near_match["doc_key"])
+                doc["near_duplicate_of"] = {**near_match, "reused": previous is not None}
+
+        # Stage 3: Chunking (a new version keeps the unchanged chunks of the previous one)
+        if completed < 3:
+            with measure(3, doc) as m:
+                if previous is None:
+                    doc = chunking(doc, doc_id=doc["doc_id"])
+                else:
+                    doc = Revisions.chunking(doc, previous, doc_id=doc["doc_id"],
+                                             supersedes=True if previous_hash else None)
+                    revision = doc["revision_of"]
+                    message = (f"new version of {revision['doc_key']}: {revision['chunks_reused']} chunks reused, "
+                               f"{revision['chunks_new']} new, {revision['chunks_removed']} removed")
+                    print(f"♻️ {doc['doc_id']} is a {message}")
+                    run_log.log(run_uuid, "revision", message)
+            stage_done(3, doc, m)
+
+        # Stage 4: Entity + Summarization
+        if completed < 4:
+            with measure(4, doc) as m:
+                doc = entity_summary(doc, on_chunk=_chunk_reporter(progress))
+            stage_done(4, doc, m)
+
+        if department is not None:
+            doc["department"] = department
+
+        # Save Stage 4 output (append-only store, and Postgres)
+        save_stage4_output(doc)
+        save_stage4_documents([doc])
+
+        # Stage 5: Embedding + Indexing
+        if completed < 5:
+            with measure(5, doc) as m:
+                indexing(doc, index_dir)
+            stage_done(5, doc, m)
+    except Exception as e:
+        failed = STAGES[min(completed, len(STAGES) - 1)]
+        Metrics.inc("pipeline_stage_failures_total", stage=failed)
+        run_log.log(run_uuid, failed, repr(e), level="error")
+        run_log.finish(run_uuid, "failed", error=repr(e), stages=stage_metrics)
+        raise
+
+    ProcessedIndex.record(file_hash, doc_id=doc.get("doc_id"))
+    NearDuplicates.remember([doc], {file_hash: near_sig} if near_sig is not None else {})  # resumed: signed from cleaned_text
+    checkpoints.drop(file_hash)  # the result is stored: nothing left to resume
+    run_log.finish(run_uuid, "done", doc_id=doc.get("doc_id"), stages=stage_metrics)
 
     print(f"✅ File processed through all stages: {Path(file_path).name}")
     return doc
@@ -0,0 +1,77 @@
+"""
+Whole-file content hash -> processed result.
+
+Identical uploads (same bytes arriving by email, WhatsApp and the web form) are
+recognised by their sha256 and served from here instead of re-running the five
+stages and re-uploading to object storage.
+
+Records are appended to PROCESSED_INDEX_FILE as JSON lines; a later record for
+the same hash is merged over the earlier one (e.g. storage_url added after the
+upload finished). Only doc_id and storage_url are kept per hash: the Stage 4
+output itself lives in the stage 4 store (ProcessPipeline.processed_doc()).
+"""
+import fcntl
+import hashlib
+import json
+import os
+from pathlib import Path
+
+PROCESSED_INDEX_FILE = "processed_hashes.jsonl"
+HASH_CHUNK_SIZE = 1024 * 1024
+FIELDS = ("doc_id", "storage_url")
+
+_cache = {"path": None, "size": -1, "records": {}}
+
+
+def file_sha256(file_path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """sha256 of a file, read in chunks (constant memory)."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _records(index_file) -> dict:
+    """All records, re-reading only the bytes appended since the last call."""
+    path = Path(index_file)
+    if _cache["path"] != path:
+        _cache.update(path=path, size=0, records={})
+
+    size = path.stat().st_size if path.exists() else 0
+    if size < _cache["size"]:
+        _cache.update(size=0, records={})  # file replaced / truncated
+    if size > _cache["size"]:
+        with open(path, "r", encoding="utf-8") as f:
+            f.seek(_cache["size"])
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # partially written line, pick it up next time
+                _cache["size"] += len(line.encode("utf-8"))
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "doc" in rec:  # older lines carried the whole Stage 4 output
+                    rec.setdefault("doc_id", (rec["doc"] or {}).get("doc_id"))
+                _cache["records"].setdefault(rec["file_hash"], {"file_hash": rec["file_hash"]}).update(
+                    (field, rec[field]) for field in FIELDS if field in rec)
+    return _cache["records"]
+
+
+def lookup(file_hash: str, index_file=PROCESSED_INDEX_FILE):
+    """Stored record ({"file_hash", "doc_id", "storage_url"}, either may be missing) or None."""
+    return _records(index_file).get(file_hash)
+
+
+def record(file_hash: str, index_file=PROCESSED_INDEX_FILE, **fields):
+    """Append / update the record for a hash (doc_id=..., storage_url=...)."""
+    line = json.dumps({"file_hash": file_hash, **fields}, ensure_ascii=False) + "\n"
+    with open(index_file, "a", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
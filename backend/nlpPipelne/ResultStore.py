@@ -0,0 +1,235 @@
+"""
+Append-only, sharded JSONL store for per-document pipeline output.
+
+Layout (root directory):
+    meta.json           {"num_shards": N}, fixed when the store is created
+    shard-XX.jsonl      one JSON record per line, only ever appended to
+    shard-XX.idx        one {"key", "offset", "length"} line per stored record
+                        ({"key", "deleted": true} for a deleted key)
+    shard-XX.lock       flock target of the shard's writers
+
+A key lives in shard crc32(key) % N. Writes take an exclusive flock on the shard,
+so concurrent API workers / batch ingest processes can share one store. Each
+process keeps the key -> (offset, length) index of the shards it touched in
+memory and only reads index lines appended since its last look, so inserts and
+lookups cost O(1) regardless of how many documents are stored.
+
+Overwritten and deleted records stay in the data file until the shard is
+compacted: once they are more than COMPACT_GARBAGE of a shard over
+COMPACT_MIN_BYTES, the write that crossed the line rewrites the shard with the
+live records only (new files swapped in with os.replace). A process reads
+through the .idx / data files its index came from, held open, and reloads the
+index once the shard's files have been replaced.
+"""
+import fcntl
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+
+STAGE4_STORE_DIR = "stage4_store"
+NUM_SHARDS = 16
+COMPACT_GARBAGE = float(os.getenv("RESULT_STORE_COMPACT_GARBAGE", 0.5))  # dead share of a shard that triggers compaction
+COMPACT_MIN_BYTES = int(os.getenv("RESULT_STORE_COMPACT_MIN_BYTES", 8 * 2 ** 20))
+
+
+class ResultStore:
+    def __init__(self, root=STAGE4_STORE_DIR, num_shards: int = NUM_SHARDS):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        meta_path = self.root / "meta.json"
+        if meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                num_shards = json.load(f)["num_shards"]
+        else:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"num_shards": num_shards}, f)
+        self.num_shards = num_shards
+
+        self._index = {}      # shard -> {key: (offset, length)}
+        self._index_pos = {}  # shard -> bytes of the .idx file already read
+        self._live = {}       # shard -> bytes of the records the index points to
+        self._files = {}      # shard -> (.idx, data) files the index was read from, held open
+        self._mutex = threading.RLock()
+
+    # -----------------------------
+    # Helpers
+    # -----------------------------
+    def _shard(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % self.num_shards
+
+    def _data_path(self, shard: int) -> Path:
+        return self.root / f"shard-{shard:02d}.jsonl"
+
+    def _index_path(self, shard: int) -> Path:
+        return self.root / f"shard-{shard:02d}.idx"
+
+    def _lock(self, shard: int, mode=fcntl.LOCK_EX):
+        f = open(self.root / f"shard-{shard:02d}.lock", "ab")
+        fcntl.flock(f, mode)
+        return f  # closing it releases the lock
+
+    @staticmethod
+    def _open(path: Path):
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def _read_index(self, shard: int, f):
+        index, live = self._index[shard], self._live[shard]
+        pos = self._index_pos[shard]
+        f.seek(pos)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # being written right now
+            pos += len(line)
+            entry = json.loads(line)
+            old = index.pop(entry["key"], None)
+            if old:
+                live -= old[1]
+            if not entry.get("deleted"):
+                index[entry["key"]] = (entry["offset"], entry["length"])
+                live += entry["length"]
+        self._index_pos[shard], self._live[shard] = pos, live
+
+    def _reload(self, shard: int, locked: bool = False) -> dict:
+        """Read the shard's index from scratch (first use, or the shard was compacted)."""
+        with self._mutex:
+            lock = None if locked else self._lock(shard, fcntl.LOCK_SH)  # no compaction half-way through
+            try:
+                for f in self._files.pop(shard, ()):
+                    if f:
+                        f.close()
+                self._index[shard], self._index_pos[shard], self._live[shard] = {}, 0, 0
+                self._files[shard] = (self._open(self._index_path(shard)), self._open(self._data_path(shard)))
+                if self._files[shard][0]:
+                    self._read_index(shard, self._files[shard][0])
+            finally:
+                if lock:
+                    lock.close()
+            return self._index[shard]
+
+    def _refresh(self, shard: int, locked: bool = False) -> dict:
+        """Pick up index lines appended (by any process) since the last call."""
+        with self._mutex:
+            if shard not in self._files:
+                return self._reload(shard, locked)
+            idx = self._files[shard][0]
+            try:
+                current = self._index_path(shard).stat().st_ino
+            except FileNotFoundError:
+                current = None
+            if current != (os.fstat(idx.fileno()).st_ino if idx else None):
+                return self._reload(shard, locked)  # created or compacted since the last look
+            if idx and os.fstat(idx.fileno()).st_size > self._index_pos[shard]:
+                self._read_index(shard, idx)
+            return self._index[shard]
+
+    def _maybe_compact(self, shard: int):
+        """Called with the shard locked, after a write that may have left dead records."""
+        try:
+            size = self._data_path(shard).stat().st_size
+        except FileNotFoundError:
+            return
+        if size > COMPACT_MIN_BYTES and size - self._live[shard] > size * COMPACT_GARBAGE:
+            self._compact(shard)
+
+    def _compact(self, shard: int) -> int:
+        """Rewrite the shard with its live records (shard locked); returns the bytes freed."""
+        index = self._refresh(shard, locked=True)
+        data_path, index_path = self._data_path(shard), self._index_path(shard)
+        if not data_path.exists():
+            return 0
+        size = data_path.stat().st_size
+        tmp_data, tmp_index = data_path.with_suffix(".jsonl.tmp"), index_path.with_suffix(".idx.tmp")
+        with open(data_path, "rb") as old, open(tmp_data, "wb") as data, open(tmp_index, "wb") as idx:
+            for key, (offset, length) in sorted(index.items(), key=lambda item: item[1][0]):
+                old.seek(offset)
+                entry = json.dumps({"key": key, "offset": data.tell(), "length": length}, ensure_ascii=False)
+                data.write(old.read(length))
+                idx.write((entry + "\n").encode("utf-8"))
+        os.replace(tmp_data, data_path)
+        os.replace(tmp_index, index_path)
+        self._reload(shard, locked=True)
+        return size - data_path.stat().st_size
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def put(self, key: str, record: dict, overwrite: bool = False) -> bool:
+        """
+        Append a record under `key`. An existing key is kept unless overwrite=True
+        (the new record then shadows the old one). Returns True if written.
+        """
+        shard = self._shard(key)
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+        with self._lock(shard):
+            existed = key in self._refresh(shard, locked=True)
+            if existed and not overwrite:
+                return False
+
+            with open(self._data_path(shard), "ab") as data:
+                offset = data.seek(0, os.SEEK_END)
+                data.write(line)
+
+            entry = json.dumps({"key": key, "offset": offset, "length": len(line)}, ensure_ascii=False)
+            with open(self._index_path(shard), "ab") as idx:
+                idx.write((entry + "\n").encode("utf-8"))
+            self._refresh(shard, locked=True)
+            if existed:
+                self._maybe_compact(shard)
+        return True
+
+    def delete(self, key: str) -> bool:
+        """Remove a key (its record is dropped at the shard's next compaction). Returns True if it existed."""
+        shard = self._shard(key)
+        with self._lock(shard):
+            if key not in self._refresh(shard, locked=True):
+                return False
+            with open(self._index_path(shard), "ab") as idx:
+                idx.write((json.dumps({"key": key, "deleted": True}, ensure_ascii=False) + "\n").encode("utf-8"))
+            self._refresh(shard, locked=True)
+            self._maybe_compact(shard)
+        return True
+
+    def compact(self) -> int:
+        """Rewrite every shard with its live records only; returns the bytes freed."""
+        freed = 0
+        for shard in range(self.num_shards):
+            with self._lock(shard):
+                freed += self._compact(shard)
+        return freed
+
+    def get(self, key: str):
+        shard = self._shard(key)
+        with self._mutex:
+            location = self._refresh(shard).get(key)
+            data = self._files[shard][1]
+        if location is None:
+            return None
+        offset, length = location
+        return json.loads(os.pread(data.fileno(), length, offset))  # the data file the index belongs to
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._refresh(self._shard(key))
+
+    def keys(self):
+        for shard in range(self.num_shards):
+            yield from list(self._refresh(shard).keys())
+
+    def __len__(self) -> int:
+        return sum(len(self._refresh(shard)) for shard in range(self.num_shards))
+
+    def import_json_array(self, json_path, key_field: str = "doc_id") -> int:
+        """One-off migration from the old rewrite-the-whole-array JSON file."""
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return sum(
+            self.put(rec[key_field], rec)
+            for rec in (data if isinstance(data, list) else [])
+            if rec.get(key_field)
+        )
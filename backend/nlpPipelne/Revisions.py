@@ -0,0 +1,113 @@
+"""
+New versions of a document: only the chunks that changed go through Stage 4
+(NER, summaries) and Stage 5 (embeddings).
+
+    previous = ProcessPipeline.processed_doc(match["doc_key"])   # or the replaced version's file hash
+    doc = Revisions.chunking(stage2_doc, previous, doc_id=..., supersedes=True)
+
+Chunking: a chunk of the previous version whose sentences appear unchanged
+and in order in the new text is kept as it was: same boundaries, so the same
+text hash, with its entities and summary, marked "reused". Only the sentences
+between kept chunks are chunked afresh. With chunk_sentences() alone an edit
+on one page would move the boundaries of every chunk after it.
+
+- Stage 4 (EntitySummary.entity_summary_batch) skips the reused chunks, and
+  keeps the previous doc_summary while less than REVISION_RESUMMARISE of the
+  text changed.
+- Stage 5 (EmbedIndex) embeds only text hashes not indexed yet. A version that
+  supersedes the previous one (the same file name, or declared by the
+  uploader) takes over its vectors; those of removed chunks are tombstoned.
+
+doc["revision_of"] records the previous version and what changed.
+"""
+import os
+
+from nlpPipelne import Metrics
+from nlpPipelne.stages.ChunkingPlaceholding import chunk_sentences, CHUNK_SIZE
+
+REVISION_RESUMMARISE = float(os.getenv("REVISION_RESUMMARISE", 0.2))  # share of words changed
+
+
+def _kept(previous_chunk: dict, words: list, span: tuple) -> dict:
+    chunk = {
+        "sentences": previous_chunk["sentences"],
+        "words": words,
+        "entities": previous_chunk.get("entities", {}),
+        "summary": previous_chunk.get("summary") or previous_chunk["sentences"][0],
+        "reused": True,
+    }
+    if span:
+        chunk["start_offset"], chunk["end_offset"] = span
+    return chunk
+
+
+def chunking(stage2_output: dict, previous: dict, doc_id: str = "unknown", supersedes: bool = None,
+             chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    ChunkingPlaceholding.chunking() for a new version of `previous` (its Stage 4
+    output). supersedes: the new version replaces the previous one in the vector
+    store; by default when both have the same doc_id (file name).
+    """
+    sentences = stage2_output.get("sentences", [])
+    tokens = stage2_output.get("sentence_tokens")
+    spans = stage2_output.get("sentence_spans")
+
+    starts = {}  # first sentence -> previous chunks starting with it
+    for chunk in previous.get("chunks", []):
+        if chunk.get("sentences"):
+            starts.setdefault(chunk["sentences"][0], []).append(chunk)
+
+    chunks = []
+
+    def fresh(start: int, end: int):
+        if start < end:
+            chunks.extend(chunk_sentences(
+                sentences[start:end], None, chunk_size,
+                sentence_tokens=tokens[start:end] if tokens is not None else None,
+                sentence_spans=spans[start:end] if spans is not None else None,
+            ))
+
+    i = pending = 0
+    while i < len(sentences):
+        match = next((c for c in starts.get(sentences[i], ())
+                      if sentences[i:i + len(c["sentences"])] == c["sentences"]), None)
+        if match is None:
+            i += 1
+            continue
+        end = i + len(match["sentences"])
+        fresh(pending, i)
+        words = ([token for sentence in tokens[i:end] for token, _, _ in sentence] if tokens is not None
+                 else match.get("words") or " ".join(match["sentences"]).split())
+        chunks.append(_kept(match, words, (spans[i][0], spans[end - 1][1]) if spans is not None else None))
+        i = pending = end
+    fresh(pending, len(sentences))
+
+    for chunk_id, chunk in enumerate(chunks, 1):
+        chunk["chunk_id"] = chunk_id
+        Metrics.cache("revision_chunk", bool(chunk.get("reused")))
+
+    kept = {tuple(c["sentences"]) for c in chunks if c.get("reused")}
+    removed = [c for c in previous.get("chunks", []) if tuple(c.get("sentences", [])) not in kept]
+    new_words = sum(len(c["words"]) for c in chunks if not c.get("reused"))
+    removed_words = sum(len(c.get("words", [])) for c in removed)
+    total = max(sum(len(c["words"]) for c in chunks), sum(len(c.get("words", [])) for c in previous.get("chunks", [])), 1)
+    changed = max(new_words, removed_words) / total
+    summary_reused = changed < REVISION_RESUMMARISE and bool(previous.get("doc_summary"))
+
+    stage2_output.update({
+        "doc_id": doc_id,
+        "chunks": chunks,
+        "revision_of": {
+            "doc_key": previous.get("file_hash"),
+            "doc_id": previous.get("doc_id"),
+            "supersedes": previous.get("doc_id") == doc_id if supersedes is None else supersedes,
+            "chunks_reused": len(chunks) - sum(1 for c in chunks if not c.get("reused")),
+            "chunks_new": sum(1 for c in chunks if not c.get("reused")),
+            "chunks_removed": len(removed),
+            "changed": round(changed, 4),
+            "summary_reused": summary_reused,
+        },
+    })
+    if summary_reused:
+        stage2_output["doc_summary"] = previous["doc_summary"]
+    return stage2_output
@@ -0,0 +1,289 @@
+"""
+Batch ingestion of a directory with stage-level pipelining across documents.
+
+    cd backend && python -m nlpPipelne.ingest /data/archive --extract-workers 4 --translate-concurrency 8
+
+Stage 1 (extraction / OCR) runs in a process pool, Stage 2 translation runs as
+concurrent async tasks (Stage 2/3 CPU work inline), and Stage 4 and Stage 5 each
+run in their own thread on batches of documents so the models see cross-document
+batches. Stages are connected by bounded queues, so every resource stays busy and
+memory stays flat. Finished files are appended to a progress file; re-running the
+same command skips them (failed files are retried).
+
+Documents get a department (their index shard with VECTOR_SHARD_BY=department)
+from --department, or with --department-from-dir from their first directory
+under the root (/data/archive/<department>/...).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from nlpPipelne import NearDuplicates, ProcessedIndex, Revisions
+from nlpPipelne.stages.TextExtraction import extract_text, SUPPORTED_EXTENSIONS
+from nlpPipelne.stages.CleaningNormalisation import clean_normalise
+from nlpPipelne.stages.ChunkingPlaceholding import chunking
+
+PROGRESS_FILE = ".ingest_progress.jsonl"
+QUEUE_SIZE = 32  # documents buffered between stages
+
+
+class StageStats:
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.items = 0
+
+    def add(self, seconds: float, items: int = 1):
+        self.busy += seconds
+        self.items += items
+
+    def utilisation(self, wall: float) -> float:
+        return self.busy / (wall * self.workers) if wall else 0.0
+
+
+class Progress:
+    """Append-only record of finished files; the last record per file wins."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done = set()
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line after a crash
+                    if record.get("status") == "done":
+                        self.done.add(record["file"])
+                    else:
+                        self.done.discard(record["file"])
+        self.failed = 0
+
+    def mark(self, file: str, status: str, **fields):
+        if status == "done":
+            self.done.add(file)
+        else:
+            self.failed += 1
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"file": file, "status": status, "at": time.time(), **fields}, ensure_ascii=False) + "\n")
+
+
+def _timed_extract(file_path: str):
+    """
+    Stage 1 in a pool process; returns the result and the time it took.
+    Files whose content was already processed come back as {"duplicate": True}.
+    """
+    t0 = time.perf_counter()
+    file_hash = ProcessedIndex.file_sha256(file_path)
+    if ProcessedIndex.lookup(file_hash):
+        return {"duplicate": True, "file_hash": file_hash}, time.perf_counter() - t0
+
+    result = extract_text(file_path)
+    result["file_path"] = file_path
+    result["file_hash"] = file_hash
+    return result, time.perf_counter() - t0
+
+
+def discover(root: Path):
+    return sorted(
+        str(p) for p in root.rglob("*")
+        if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+
+
+def department_of(root: Path, file_path: str, department: str = None, from_dir: bool = False):
+    parts = Path(file_path).relative_to(root).parts
+    return parts[0] if from_dir and len(parts) > 1 else department
+
+
+async def run(root: Path, extract_workers: int, translate_concurrency: int, batch_docs: int,
+              index_dir: str, progress_path: Path, department: str = None, department_from_dir: bool = False):
+    progress = Progress(progress_path)
+    all_files = discover(root)
+    files = [f for f in all_files if f not in progress.done]
+    print(f"{len(all_files)} files found, {len(all_files) - len(files)} already ingested, {len(files)} to go")
+    if not files:
+        return
+
+    # Loads the NER / summarization models in this process only (pool workers are spawned)
+    from nlpPipelne.ProcessPipeline import processed_doc, save_stage4_documents, save_stage4_output
+    from nlpPipelne.stages.EntitySummary import entity_summary_batch
+    from nlpPipelne.stages.EmbedIndex import indexing_batch
+
+    loop = asyncio.get_running_loop()
+    extract_pool = ProcessPoolExecutor(extract_workers, mp_context=multiprocessing.get_context("spawn"))
+    stage4_thread = ThreadPoolExecutor(1)
+    stage5_thread = ThreadPoolExecutor(1)
+
+    extracted = asyncio.Queue(QUEUE_SIZE)
+    chunked = asyncio.Queue(QUEUE_SIZE)
+    summarised = asyncio.Queue(max(2, QUEUE_SIZE // batch_docs))
+    signatures = {}  # file hash -> MinHash signature, indexed once the document is done
+
+    stats = {
+        "extraction": StageStats("extraction", extract_workers),
+        "normalise+chunk": StageStats("normalise+chunk", translate_concurrency),
+        "entity_summary": StageStats("entity_summary", 1),
+        "indexing": StageStats("indexing", 1),
+    }
+
+    async def extract_all():
+        in_flight = asyncio.Semaphore(extract_workers * 2)
+        seen_hashes = set()  # identical files within this run
+
+        async def one(file_path):
+            async with in_flight:
+                try:
+                    result, seconds = await loop.run_in_executor(extract_pool, _timed_extract, file_path)
+                except Exception as e:
+                    progress.mark(file_path, "failed", stage="extraction", error=str(e))
+                    return
+            stats["extraction"].add(seconds)
+            if result.get("duplicate") or result["file_hash"] in seen_hashes:
+                progress.mark(file_path, "done", duplicate_of=result["file_hash"])
+                return
+            seen_hashes.add(result["file_hash"])
+            result["department"] = department_of(root, file_path, department, department_from_dir)
+            await extracted.put(result)
+
+        await asyncio.gather(*(one(f) for f in files))
+        for _ in range(translate_concurrency):
+            await extracted.put(None)
+
+    async def normalise_worker():
+        while (doc := await extracted.get()) is not None:
+            t0 = time.perf_counter()
+            try:
+                processed = await clean_normalise(doc)
+                signatures[doc["file_hash"]], match, decision = NearDuplicates.check(processed)
+                previous = processed_doc(match["doc_key"]) if decision == "reuse" else None
+                if match:
+                    processed["near_duplicate_of"] = {**match, "reused": previous is not None}
+                if previous is None:
+                    doc = chunking(processed, doc_id=doc["doc_id"])
+                else:  # only its changed chunks go through Stage 4-5
+                    doc = Revisions.chunking(processed, previous, doc_id=doc["doc_id"])
+            except Exception as e:
+                progress.mark(doc["file_path"], "failed", stage="normalisation", error=str(e))
+                continue
+            stats["normalise+chunk"].add(time.perf_counter() - t0)
+            await chunked.put(doc)
+        await chunked.put(None)
+
+    def summarise(batch):
+        try:
+            return entity_summary_batch(batch), []
+        except Exception:
+            # Isolate the document that broke the batch
+            ok, failed = [], []
+            for doc in batch:
+                try:
+                    ok.extend(entity_summary_batch([doc]))
+                except Exception as e:
+                    failed.append((doc, e))
+            return ok, failed
+
+    async def summarise_batches():
+        finished, batch = 0, []
+        while finished < translate_concurrency:
+            doc = await chunked.get()
+            if doc is None:
+                finished += 1
+            else:
+                batch.append(doc)
+
+            # Flush full batches, or whatever is ready when upstream has nothing queued
+            if batch and (len(batch) >= batch_docs or doc is None or chunked.empty()):
+                t0 = time.perf_counter()
+                ok, failed = await loop.run_in_executor(stage4_thread, summarise, batch)
+                stats["entity_summary"].add(time.perf_counter() - t0, len(batch))
+                for bad, e in failed:
+                    progress.mark(bad["file_path"], "failed", stage="entity_summary", error=str(e))
+                if ok:
+                    await summarised.put(ok)
+                batch = []
+        await summarised.put(None)
+
+    def index(batch):
+        indexable = [doc for doc in batch if doc.get("chunks")]
+        if indexable:
+            indexing_batch(indexable, index_dir)
+        save_stage4_documents(batch)
+        for doc in batch:
+            save_stage4_output(doc)
+            ProcessedIndex.record(doc["file_hash"], doc_id=doc.get("doc_id"))
+        NearDuplicates.remember(batch, signatures)
+        for doc in batch:
+            signatures.pop(doc["file_hash"], None)
+
+    async def index_batches():
+        while (batch := await summarised.get()) is not None:
+            t0 = time.perf_counter()
+            try:
+                await loop.run_in_executor(stage5_thread, index, batch)
+            except Exception as e:
+                for doc in batch:
+                    progress.mark(doc["file_path"], "failed", stage="indexing", error=str(e))
+                continue
+            stats["indexing"].add(time.perf_counter() - t0, len(batch))
+            for doc in batch:
+                progress.mark(doc["file_path"], "done", doc_id=doc["doc_id"])
+
+    start = time.perf_counter()
+    done_before = len(progress.done)
+    try:
+        await asyncio.gather(
+            extract_all(),
+            *(normalise_worker() for _ in range(translate_concurrency)),
+            summarise_batches(),
+            index_batches(),
+        )
+    finally:
+        extract_pool.shutdown()
+        stage4_thread.shutdown()
+        stage5_thread.shutdown()
+    wall = time.perf_counter() - start
+
+    ingested = len(progress.done) - done_before
+    print(f"\nIngested {ingested} documents ({progress.failed} failed) in {wall:.1f} s "
+          f"→ {ingested / wall * 3600 if wall else 0:.1f} docs/hour")
+    print(f"{'stage':<18} {'workers':>7} {'docs':>6} {'busy s':>9} {'utilisation':>12}")
+    for s in stats.values():
+        print(f"{s.name:<18} {s.workers:>7} {s.items:>6} {s.busy:>9.1f} {s.utilisation(wall):>11.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--translate-concurrency", type=int, default=8)
+    parser.add_argument("--batch-docs", type=int, default=8, help="documents per Stage 4 / Stage 5 batch")
+    parser.add_argument("--index-dir", default="vectorStore")
+    parser.add_argument("--progress", type=Path, default=None,
+                        help=f"progress file (default: <directory>/{PROGRESS_FILE})")
+    parser.add_argument("--department", default=None, help="department of every document")
+    parser.add_argument("--department-from-dir", action="store_true",
+                        help="department of a document: its first directory under the root")
+    args = parser.parse_args()
+
+    asyncio.run(run(
+        args.directory,
+        args.extract_workers,
+        args.translate_concurrency,
+        args.batch_docs,
+        args.index_dir,
+        args.progress or args.directory / PROGRESS_FILE,
+        args.department,
+        args.department_from_dir,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,39 +4,62 @@ import os
 # Config
 CHUNK_SIZE = 100  # words per chunk
 
-def chunk_sentences(sentences, words, chunk_size=CHUNK_SIZE):
+def is_word(token: str) -> bool:
+    """Punctuation-only tokens are not words."""
+    return any(c.isalnum() for c in token)
+
+
+def count_words(tokens):
+    """Number of word tokens (punctuation-only tokens are not counted)."""
+    return sum(1 for token, _, _ in tokens if is_word(token))
+
+
+def chunk_sentences(sentences, words, chunk_size=CHUNK_SIZE, sentence_tokens=None, sentence_spans=None):
     """
     Split sentences into RAG-ready chunks with approx chunk_size words each.
+    When Stage 2 provides sentence_tokens / sentence_spans they are used as-is
+    (no re-splitting) and every chunk gets start/end offsets into cleaned_text.
     """
     chunks = []
     current_chunk = {"sentences": [], "words": []}
     word_count = 0
     chunk_id = 1
 
-    for sentence in sentences:
-        sentence_words = sentence.split()
-        if word_count + len(sentence_words) > chunk_size and current_chunk["sentences"]:
+    def close_chunk(chunk, chunk_id):
+        chunk["chunk_id"] = chunk_id
+        chunk["entities"] = {}  # Placeholder for NER
+        chunk["summary"] = chunk["sentences"][0]
+        chunks.append(chunk)
+
+    for i, sentence in enumerate(sentences):
+        if sentence_tokens is not None:
+            sentence_words = [token for token, _, _ in sentence_tokens[i] if is_word(token)]
+            sentence_len = len(sentence_words)
+        else:
+            sentence_words = sentence.split()
+            sentence_len = len(sentence_words)
+
+        if word_count + sentence_len > chunk_size and current_chunk["sentences"]:
             # Save current chunk
-            current_chunk["chunk_id"] = chunk_id
-            current_chunk["entities"] = {}  # Placeholder for NER
-            current_chunk["summary"] = current_chunk["sentences"][0]
-            chunks.append(current_chunk)
+            close_chunk(current_chunk, chunk_id)
 
             # Start new chunk
             chunk_id += 1
             current_chunk = {"sentences": [], "words": []}
             word_count = 0
 
+        if sentence_spans is not None:
+            start, end = sentence_spans[i]
+            current_chunk.setdefault("start_offset", start)
+            current_chunk["end_offset"] = end
+
         current_chunk["sentences"].append(sentence)
         current_chunk["words"].extend(sentence_words)
-        word_count += len(sentence_words)
+        word_count += sentence_len
 
     # Append last chunk if exists
     if current_chunk["sentences"]:
-        current_chunk["chunk_id"] = chunk_id
-        current_chunk["entities"] = {}
-        current_chunk["summary"] = current_chunk["sentences"][0]
-        chunks.append(current_chunk)
+        close_chunk(current_chunk, chunk_id)
 
     return chunks
 
@@ -47,8 +70,14 @@ def chunking(stage2_output: dict, doc_id: str = "unknown", output_file=None):
     sentences = stage2_output.get("sentences", [])
     words = stage2_output.get("words", [])
 
-    # Create chunks
-    chunks = chunk_sentences(sentences, words, CHUNK_SIZE)
+    # Create chunks (reusing Stage 2 tokens + offsets when present)
+    chunks = chunk_sentences(
+        sentences,
+        words,
+        CHUNK_SIZE,
+        sentence_tokens=stage2_output.get("sentence_tokens"),
+        sentence_spans=stage2_output.get("sentence_spans"),
+    )
 
     # Update original dict instead of creating a new one
     stage2_output.update({
@@ -1,11 +1,13 @@
 import re
 # import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
+from functools import lru_cache
+from nltk.tokenize import PunktTokenizer
 import json
 # from nlpPipelne.stages.TextExtraction import extract_text
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import stopwords
 from googletrans import Translator
+from nlpPipelne import Metrics
 
 # Download necessary resources (run once)
 # nltk.download("punkt", quiet=True)
@@ -17,12 +19,17 @@ from googletrans import Translator
 
 translator = Translator()
 
+# Word tokens over clean_text() output (letters/digits + .,!?;:()- only):
+# words may contain inner . : - (e.g. "10:30", "3.5", "e-mail") and digit-grouping
+# commas ("1,200"); all other punctuation becomes its own token
+TOKEN_PATTERN = re.compile(r"\w+(?:(?:[.:\-]|(?<=\d),(?=\d))\w+)*|[^\w\s]")
+
 async def translate_to_english(text: str) -> str:
     """Translate input text to English."""
     if not text:
         return ""
-    translated = await translator.translate(text, dest='en')
-    print(translated)
+    with Metrics.measure("pipeline_model_call", {"chars": len(text)}, model="googletrans"):
+        translated = await translator.translate(text, dest='en')
     return translated.text
 
 def clean_text(text: str) -> str:
@@ -47,6 +54,34 @@ def clean_text(text: str) -> str:
     return text
 
 
+@lru_cache(maxsize=None)
+def punkt_tokenizer(language: str = "english") -> PunktTokenizer:
+    """Loaded once per language (punkt_tab data)."""
+    return PunktTokenizer(language)
+
+
+def tokenise(text: str, language: str = "english") -> list:
+    """
+    Sentence + word tokenization in a single pass over cleaned text.
+    Returns one dict per sentence with its text, [start, end) character span
+    in `text` and its tokens as [token, start, end] triples (same offsets).
+    """
+    sentences = [
+        {"text": text[start:end], "start": start, "end": end, "tokens": []}
+        for start, end in punkt_tokenizer(language).span_tokenize(text)
+    ]
+
+    i = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        # Tokens arrive in order, so just advance to the sentence containing the token
+        while i < len(sentences) - 1 and match.start() >= sentences[i]["end"]:
+            i += 1
+        if sentences:
+            sentences[i]["tokens"].append([match.group(), match.start(), match.end()])
+
+    return sentences
+
+
 async def clean_normalise(stage1_result: dict) -> dict:
     """
     Update the original dict with translated, cleaned, and tokenized text info.
@@ -57,11 +92,10 @@ async def clean_normalise(stage1_result: dict) -> dict:
     # Step 1: Clean
     cleaned = clean_text(translated_text)
 
-    # Step 2: Sentence tokenization
-    sentences = sent_tokenize(cleaned)
-
-    # Step 3: Word tokenization
-    words = word_tokenize(cleaned)
+    # Step 2 + 3: Sentence and word tokenization (one pass, with offsets into cleaned_text)
+    tokenised = tokenise(cleaned)
+    sentences = [s["text"] for s in tokenised]
+    words = [token for s in tokenised for token, _, _ in s["tokens"]]
 
     stop_words = set(stopwords.words("english"))
     words = [w for w in words if w not in stop_words]
@@ -77,6 +111,8 @@ async def clean_normalise(stage1_result: dict) -> dict:
         "translated_text": translated_text,
         "cleaned_text": cleaned,
         "sentences": sentences,
+        "sentence_spans": [[s["start"], s["end"]] for s in tokenised],
+        "sentence_tokens": [s["tokens"] for s in tokenised],
         "words": words,
         "num_sentences": len(sentences),
         "num_words": len(words),
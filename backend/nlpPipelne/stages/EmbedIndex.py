@@ -1,5 +1,16 @@
+import contextlib
+import fcntl
 import json
 import hashlib
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Tuple
 
@@ -15,6 +26,8 @@ except Exception:
 import torch
 from sentence_transformers import SentenceTransformer
 
+from nlpPipelne import Metrics
+
 # FAISS
 try:
     import faiss
@@ -31,11 +44,41 @@ INDEX_DIR = "vectorStore"
 INDEX_NAME = "faiss_index"
 EMBEDDINGS_FILE = "embeddings.npy"
 METADATA_FILE = "metadata.jsonl"
+LOCK_FILE = ".lock"  # writers of the directory hold an flock on it
 MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 
 BATCH_SIZE = 128
 NORMALIZE = True  # cosine sim behavior with Inner Product index
 
+QUERY_CACHE_SIZE = 1024   # query embeddings kept per process
+RESULT_CACHE_SIZE = 4096  # search results kept per process
+FILTER_OVERFETCH = 10     # candidates per wanted result when filtering on metadata
+MAX_BATCH_QUERIES = 256
+
+# "faiss": the files in INDEX_DIR; "pgvector": the embeddings table (nlpPipelne/stages/PgVectorStore.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "faiss")
+
+# FAISS storage. VECTOR_STORAGE applies to new indexes (an existing one keeps its type):
+#   fp32  IndexFlat, exact; fp16 / int8  IndexScalarQuantizer, 1/2 and 1/4 of the memory
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "fp32")
+STORE_RAW_EMBEDDINGS = os.getenv("STORE_RAW_EMBEDDINGS", "1") == "1"  # float32 copy in EMBEDDINGS_FILE
+CHUNK_TEXT_STORE = os.getenv("CHUNK_TEXT_STORE", "inline")  # inline: in METADATA_FILE; blob: in CHUNK_TEXT_FILE
+CHUNK_TEXT_FILE = "chunk_text.blob"
+QUANTIZERS = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+SQ_RANGE_MARGIN = 0.2  # int8: trained per-dimension range widened by this share of it, for later vectors
+RERANK_OVERFETCH = 4   # quantised index with the raw copy: candidates per result, re-scored in float32
+
+# FAISS sharding. VECTOR_SHARD_BY=department: one index per department under <index dir>/SHARDS_DIR,
+# chosen by the chunk's "department"; searches filtered on a department read only its shard
+VECTOR_SHARD_BY = os.getenv("VECTOR_SHARD_BY", "none")  # none | department
+SHARDS_DIR = "shards"
+UNASSIGNED_SHARD = "_unassigned"  # chunks of documents without a department
+SHARD_ANN_MIN_VECTORS = int(os.getenv("SHARD_ANN_MIN_VECTORS", 50000))  # larger shards use HNSW, smaller stay flat
+SHARD_HNSW_M = 32
+SHARD_HNSW_EF_CONSTRUCTION = 80
+SHARD_HNSW_EF_SEARCH = int(os.getenv("SHARD_HNSW_EF_SEARCH", 128))
+SHARD_SEARCH_THREADS = int(os.getenv("SHARD_SEARCH_THREADS", min(8, os.cpu_count() or 1)))
+
 
 # -----------------------------
 # Helpers
@@ -48,6 +91,19 @@ def _device_str() -> str:
     return "cpu"
 
 
+_models: Dict[Tuple[str, str], SentenceTransformer] = {}
+
+
+def _get_model(model_name: str, device: str) -> SentenceTransformer:
+    """Load each embedding model once per process."""
+    key = (model_name, device)
+    Metrics.cache("embedding_model", key in _models)
+    if key not in _models:
+        print(f"Loading embedding model on {device}: {model_name}")
+        _models[key] = SentenceTransformer(model_name, device=device)
+    return _models[key]
+
+
 def _hash_text(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
 
@@ -82,6 +138,7 @@ def _iter_stage4_chunks(doc) -> Tuple[List[str], List[Dict]]:
             "doc_id": doc_id,
             "file_type": file_type,
             "file_path": file_path,
+            "department": doc.get("department"),
             "chunk_id": chunk_id,
             "text_hash": text_hash,
             "summary": summary,
@@ -92,11 +149,11 @@ def _iter_stage4_chunks(doc) -> Tuple[List[str], List[Dict]]:
     return texts, metas
 
 
-def _embed_texts(model: SentenceTransformer, texts: List[str], batch_size: int) -> np.ndarray:
+def _embed_texts(model: SentenceTransformer, texts: List[str], batch_size: int, model_name: str = MODEL_NAME) -> np.ndarray:
     all_vecs = []
     for i in tqdm(range(0, len(texts), batch_size), desc="Embedding"):
         batch = texts[i: i + batch_size]
-        with torch.inference_mode():
+        with torch.inference_mode(), Metrics.measure("pipeline_model_call", Metrics.texts_sizes(batch), model=model_name):
             vecs = model.encode(
                 batch,
                 batch_size=min(batch_size, 256),
@@ -105,26 +162,155 @@ def _embed_texts(model: SentenceTransformer, texts: List[str], batch_size: int)
                 show_progress_bar=False,
             )
         all_vecs.append(vecs)
-    return np.vstack(all_vecs) if all_vecs else np.zeros((0, 384), dtype=np.float32)
+    return np.vstack(all_vecs) if all_vecs else np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
 
 
-def _build_faiss_index(embeddings: np.ndarray):
+def _build_faiss_index(embeddings: np.ndarray, storage: str = VECTOR_STORAGE, ann: bool = False):
+    """ann: an HNSW graph over the vectors instead of a flat (exhaustive) index."""
     if embeddings.size == 0:
         raise ValueError("No embeddings to index.")
     dim = embeddings.shape[1]
-    if NORMALIZE:
-        index = faiss.IndexFlatIP(dim)
+    embeddings = embeddings.astype(np.float32)
+    metric = faiss.METRIC_INNER_PRODUCT if NORMALIZE else faiss.METRIC_L2
+    if storage == "fp32" and ann:
+        index = faiss.IndexHNSWFlat(dim, SHARD_HNSW_M, metric)
+    elif storage == "fp32":
+        index = faiss.IndexFlatIP(dim) if NORMALIZE else faiss.IndexFlatL2(dim)
+    elif storage in QUANTIZERS:
+        index = (faiss.IndexHNSWSQ(dim, QUANTIZERS[storage], SHARD_HNSW_M, metric) if ann
+                 else faiss.IndexScalarQuantizer(dim, QUANTIZERS[storage], metric))
+        _sq(index).rangestat = faiss.ScalarQuantizer.RS_minmax
+        _sq(index).rangestat_arg = SQ_RANGE_MARGIN
+        index.train(embeddings)
     else:
-        index = faiss.IndexFlatL2(dim)
-    index.add(embeddings.astype(np.float32))
+        raise ValueError(f"Unknown VECTOR_STORAGE: {storage}")
+    if ann:
+        index.hnsw.efConstruction = SHARD_HNSW_EF_CONSTRUCTION
+    index.add(embeddings)
+    return index
+
+
+def _sq(index):
+    """The ScalarQuantizer of a quantised index (flat or HNSW), None for float32 ones."""
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    return index.sq if isinstance(index, faiss.IndexScalarQuantizer) else None
+
+
+def _quantised(index) -> bool:
+    return _sq(index) is not None
+
+
+def _ann(index) -> bool:
+    return isinstance(index, faiss.IndexHNSW)
+
+
+def _storage(index) -> str:
+    """VECTOR_STORAGE of an existing index."""
+    sq = _sq(index)
+    return "fp32" if sq is None else next(name for name, qtype in QUANTIZERS.items() if qtype == sq.qtype)
+
+
+def _add_vectors(index, embeddings: np.ndarray, raw: np.ndarray = None):
+    """
+    index.add, or a rebuilt index when an int8 one was trained on a range the new
+    vectors leave (retrained on the raw copy, or on the decoded vectors without it).
+    """
+    embeddings = embeddings.astype(np.float32)
+    sq = _sq(index)
+    if sq is not None and sq.qtype == QUANTIZERS["int8"]:
+        trained = faiss.vector_to_array(sq.trained)
+        vmin, vdiff = trained[:index.d], trained[index.d:]
+        if (embeddings < vmin).any() or (embeddings > vmin + vdiff).any():
+            print("New vectors outside the int8 range, retraining the index…")
+            known = raw if raw is not None else index.reconstruct_n(0, index.ntotal)
+            return _build_faiss_index(np.vstack([known, embeddings]), "int8", _ann(index))
+    index.add(embeddings)
     return index
 
 
+def _raw_embeddings(index, out_dir: Path) -> np.ndarray:
+    """The float32 copy of the indexed vectors (decoded from the index if the file is missing)."""
+    path = out_dir / EMBEDDINGS_FILE
+    if path.exists():
+        raw = np.load(path)
+        if len(raw) == index.ntotal:
+            return raw
+    print(f"{EMBEDDINGS_FILE} missing or out of date, decoding the vectors from the index")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def _store_texts(out_dir: Path, metadatas: List[Dict]) -> List[Dict]:
+    """
+    CHUNK_TEXT_STORE=blob: summary and sentences move to CHUNK_TEXT_FILE, one
+    zlib-compressed JSON record per text hash, appended once; the metadata keeps
+    "text": [offset, length].
+    """
+    stored = {m["text_hash"]: m["text"] for m in metadatas if "text" in m}
+    out = []
+    with open(out_dir / CHUNK_TEXT_FILE, "ab") as f:
+        offset = f.seek(0, os.SEEK_END)
+        for m in metadatas:
+            if "summary" not in m and "sentences" not in m:
+                out.append(m)
+                continue
+            ref = stored.get(m["text_hash"])
+            if ref is None:
+                record = {"summary": m.get("summary"), "sentences": m.get("sentences", [])}
+                blob = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+                f.write(blob)
+                ref = stored[m["text_hash"]] = [offset, len(blob)]
+                offset += len(blob)
+            out.append({**{k: v for k, v in m.items() if k not in ("summary", "sentences")}, "text": ref})
+    return out
+
+
+def _chunk_text(texts, m: Dict) -> Dict:
+    """{"summary", "sentences"} of a metadata record, from CHUNK_TEXT_FILE (open file `texts`) if stored there."""
+    if "text" not in m or texts is None:
+        return {"summary": m.get("summary"), "sentences": m.get("sentences", [])}
+    offset, length = m["text"]
+    return json.loads(zlib.decompress(os.pread(texts.fileno(), length, offset)))
+
+
+@contextlib.contextmanager
+def _index_lock(out_dir: Path):
+    """Exclusive lock on an index directory (or shard), across processes, for load → add → save."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / LOCK_FILE, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def _replacing(path: Path, mode: str = "wb"):
+    """Write to a temporary file next to path, then os.replace it: readers see the old file or the new one."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            yield f
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
 def _save_index(index, embeddings: np.ndarray, metadatas: List[Dict], out_dir: Path):
+    """embeddings: the raw float32 copy, None to not keep one. The metadata file is replaced last."""
     out_dir.mkdir(parents=True, exist_ok=True)
-    faiss.write_index(index, str(out_dir / f"{INDEX_NAME}.faiss"))
-    np.save(out_dir / EMBEDDINGS_FILE, embeddings.astype(np.float32))
-    with open(out_dir / METADATA_FILE, "w", encoding="utf-8") as f:
+    if CHUNK_TEXT_STORE == "blob":
+        metadatas = _store_texts(out_dir, metadatas)
+    with _replacing(out_dir / f"{INDEX_NAME}.faiss") as f:
+        faiss.write_index(index, faiss.PyCallbackIOWriter(f.write))
+    if embeddings is not None:
+        with _replacing(out_dir / EMBEDDINGS_FILE) as f:
+            np.save(f, embeddings.astype(np.float32))
+    elif (out_dir / EMBEDDINGS_FILE).exists():
+        (out_dir / EMBEDDINGS_FILE).unlink()  # would be out of date
+    with _replacing(out_dir / METADATA_FILE, "w") as f:
         for m in metadatas:
             f.write(json.dumps(m, ensure_ascii=False) + "\n")
 
@@ -155,97 +341,483 @@ def _load_index(out_dir: Path):
 
     return index, metas
 
+
+_pg_stores: Dict[int, object] = {}
+
+
+def _pg_store(model: SentenceTransformer):
+    """The pgvector store for the model's embedding dimension, connected once per process."""
+    dim = model.get_sentence_embedding_dimension()
+    if dim not in _pg_stores:
+        from nlpPipelne.stages.PgVectorStore import PgVectorStore
+        _pg_stores[dim] = PgVectorStore(dim)
+    return _pg_stores[dim]
+
+
+def _superseding(docs: List[dict], metas: List[Dict]) -> Dict[str, List[Dict]]:
+    """Previous doc_id -> chunk metadata of the new version, for documents that supersede one (nlpPipelne.Revisions)."""
+    versions = {doc["doc_id"]: doc["revision_of"]["doc_id"] for doc in docs
+                if doc.get("revision_of", {}).get("supersedes")}
+    superseded = {}
+    for m in metas:
+        if m["doc_id"] in versions:
+            superseded.setdefault(versions[m["doc_id"]], []).append(m)
+    return superseded
+
+
+def _supersede(superseded: Dict[str, List[Dict]], metas: List[Dict]) -> int:
+    """
+    FAISS metadata of superseded versions, in place: vectors of the chunks the new
+    version kept (or restored from a tombstone) now point at it, the others are
+    tombstoned (skipped by search, the vectors stay in the index). Returns the
+    number of records changed.
+    """
+    if not superseded:
+        return 0
+    current = {m["text_hash"]: m for version in superseded.values() for m in version}
+    changed = 0
+    for i, m in enumerate(metas):
+        if m.get("doc_id") in superseded or (m.get("tombstone") and m["text_hash"] in current):
+            metas[i] = dict(current[m["text_hash"]]) if m["text_hash"] in current else {**m, "tombstone": True}
+            changed += metas[i] != m
+    return changed
+
+
+def _indexing_pgvector(model: SentenceTransformer, texts: List[str], metas: List[Dict], model_name: str, batch_size: int,
+                       superseded: Dict[str, List[Dict]]):
+    """Embed only the chunks the table does not have yet, then bulk-load them."""
+    store = _pg_store(model)
+    for previous_doc_id, version in superseded.items():
+        kept, removed = store.supersede(previous_doc_id, version, model_name)
+        print(f"New version of {previous_doc_id}: {kept} vectors kept, {removed} removed")
+    known = store.existing({m["text_hash"] for m in metas}, model_name)
+    fresh_texts, fresh_metas = [], []
+    for t, m in zip(texts, metas):
+        Metrics.cache("indexed_chunk", m["text_hash"] in known)
+        if m["text_hash"] not in known:
+            known.add(m["text_hash"])  # also dedup within the batch
+            fresh_texts.append(t)
+            fresh_metas.append(m)
+    if not fresh_texts:
+        print("No new unique vectors to add.")
+        return
+
+    print(f"Embedding {len(fresh_texts)} new chunks (batch_size={batch_size}, normalize={NORMALIZE})…")
+    embeddings = _embed_texts(model, fresh_texts, batch_size=batch_size, model_name=model_name)
+    added = store.add(fresh_metas, embeddings.astype(np.float32), model_name)
+    print(f"✅ Stage 5 complete. Added {added} vectors to the pgvector store ({store.count(model_name)} total).")
+
 # -----------------------------
 # Public: build + save with append + dedup
 # -----------------------------
 def indexing(input_json: dict, index_dir: str = INDEX_DIR, model_name: str = MODEL_NAME, batch_size: int = BATCH_SIZE):
+    indexing_batch([input_json], index_dir, model_name, batch_size)
+
+
+def _shard_key(m: Dict) -> str:
+    """Shard (directory name under SHARDS_DIR) of a chunk, or of a search filtered on a department."""
+    department = m.get("department")
+    return UNASSIGNED_SHARD if department is None else re.sub(r"[^\w.-]", "_", str(department))
+
+
+def indexing_batch(docs: List[dict], index_dir: str = INDEX_DIR, model_name: str = MODEL_NAME, batch_size: int = BATCH_SIZE):
+    """Stage 5 for several documents: one embedding pass (chunks not indexed yet) and one index write."""
     out_dir = Path(index_dir)
 
     print("Collecting chunks…")
-    new_texts, new_metas = _iter_stage4_chunks(input_json)
+    new_texts, new_metas = [], []
+    for doc in docs:
+        texts, metas = _iter_stage4_chunks(doc)
+        new_texts.extend(texts)
+        new_metas.extend(metas)
     if not new_texts:
         raise ValueError("No chunks found to embed.")
 
     device = _device_str()
-    print(f"Loading embedding model on {device}: {model_name}")
-    model = SentenceTransformer(model_name, device=device)
-
-    print(f"Embedding {len(new_texts)} new chunks (batch_size={batch_size}, normalize={NORMALIZE})…")
-    new_embeddings = _embed_texts(model, new_texts, batch_size=batch_size)
-
-    faiss_path = out_dir / f"{INDEX_NAME}.faiss"
-    metadata_path = out_dir / METADATA_FILE
-    embeddings_path = out_dir / EMBEDDINGS_FILE
-
-    if faiss_path.exists() and metadata_path.exists() and embeddings_path.exists():
-        print("Loading existing FAISS index + metadata + embeddings…")
-        index, existing_metas = _load_index(out_dir)
-        existing_embeddings = np.load(embeddings_path)
-
-        existing_hashes = {m["text_hash"] for m in existing_metas}
-
-        filtered_texts, filtered_metas, filtered_embeddings = [], [], []
-        for t, m, e in zip(new_texts, new_metas, new_embeddings):
+    model = _get_model(model_name, device)
+    if VECTOR_BACKEND == "pgvector":
+        return _indexing_pgvector(model, new_texts, new_metas, model_name, batch_size, _superseding(docs, new_metas))
+    if VECTOR_SHARD_BY != "department":
+        return _indexing_faiss(out_dir, model, new_texts, new_metas, _superseding(docs, new_metas), model_name, batch_size)
+
+    shards = {}
+    for t, m in zip(new_texts, new_metas):
+        texts, metas = shards.setdefault(_shard_key(m), ([], []))
+        texts.append(t)
+        metas.append(m)
+    for key, (texts, metas) in shards.items():
+        print(f"Shard {key}: {len(texts)} chunks")
+        _indexing_faiss(out_dir / SHARDS_DIR / key, model, texts, metas, _superseding(docs, metas), model_name,
+                        batch_size, ann_min_vectors=SHARD_ANN_MIN_VECTORS)
+
+
+def _indexing_faiss(out_dir: Path, model: SentenceTransformer, new_texts: List[str], new_metas: List[Dict],
+                    superseded: Dict[str, List[Dict]], model_name: str, batch_size: int, ann_min_vectors: int = None):
+    """
+    The FAISS index in out_dir (one shard, or the whole store): embed the chunks it
+    does not have yet, append, save. ann_min_vectors: switch to HNSW at that size.
+    """
+    with _index_lock(out_dir):
+        faiss_path = out_dir / f"{INDEX_NAME}.faiss"
+        metadata_path = out_dir / METADATA_FILE
+
+        if faiss_path.exists() and metadata_path.exists():
+            print("Loading existing FAISS index + metadata…")
+            index, metas = _load_index(out_dir)
+            all_embeddings = _raw_embeddings(index, out_dir) if STORE_RAW_EMBEDDINGS else None
+        else:
+            index, metas, all_embeddings = None, [], None
+        changed = _supersede(superseded, metas)
+
+        # Only chunks whose text is not indexed yet are embedded
+        existing_hashes = {m["text_hash"] for m in metas}
+        filtered_texts, filtered_metas = [], []
+        for t, m in zip(new_texts, new_metas):
+            Metrics.cache("indexed_chunk", m["text_hash"] in existing_hashes)
             if m["text_hash"] not in existing_hashes:
+                existing_hashes.add(m["text_hash"])  # also dedup within the batch
                 filtered_texts.append(t)
                 filtered_metas.append(m)
-                filtered_embeddings.append(e)
-
-        if filtered_embeddings:
-            filtered_embeddings = np.vstack(filtered_embeddings)
-            index.add(filtered_embeddings.astype(np.float32))
-            metas = existing_metas + filtered_metas
-            all_embeddings = np.vstack([existing_embeddings, filtered_embeddings])
-            print(f"Added {len(filtered_embeddings)} new vectors. Total vectors: {index.ntotal}")
+
+        if filtered_texts:
+            print(f"Embedding {len(filtered_texts)} new chunks (batch_size={batch_size}, normalize={NORMALIZE})…")
+            filtered_embeddings = _embed_texts(model, filtered_texts, batch_size=batch_size, model_name=model_name)
+            if index is None:
+                ann = bool(ann_min_vectors) and len(filtered_embeddings) >= ann_min_vectors
+                print(f"No existing index found. Creating new FAISS index ({VECTOR_STORAGE}{', HNSW' if ann else ''})…")
+                index = _build_faiss_index(filtered_embeddings, ann=ann)
+                all_embeddings = filtered_embeddings if STORE_RAW_EMBEDDINGS else None
+                print(f"Created index with {index.ntotal} vectors.")
+            else:
+                index = _add_vectors(index, filtered_embeddings, all_embeddings)
+                if STORE_RAW_EMBEDDINGS:
+                    all_embeddings = np.vstack([all_embeddings, filtered_embeddings])
+                print(f"Added {len(filtered_embeddings)} new vectors. Total vectors: {index.ntotal}")
+                if ann_min_vectors and not _ann(index) and index.ntotal >= ann_min_vectors:
+                    print(f"{index.ntotal} vectors, rebuilding as an HNSW index…")
+                    vectors = all_embeddings if all_embeddings is not None else index.reconstruct_n(0, index.ntotal)
+                    index = _build_faiss_index(vectors, _storage(index), ann=True)
+            metas = metas + filtered_metas
+        elif changed:
+            print(f"No new unique vectors to add, {changed} metadata records updated.")
         else:
-            metas = existing_metas
-            all_embeddings = existing_embeddings
             print("No new unique vectors to add.")
-    else:
-        print("No existing index found. Creating new FAISS index…")
-        index = _build_faiss_index(new_embeddings)
-        metas = new_metas
-        all_embeddings = new_embeddings
-        print(f"Created index with {index.ntotal} vectors.")
+            return
 
-    print(f"Saving index, embeddings & metadata to: {out_dir.resolve()}")
-    _save_index(index, all_embeddings, metas, out_dir)
-    print("✅ Stage 5 complete.")
-    print(f"- Index: {out_dir / (INDEX_NAME + '.faiss')}")
-    print(f"- Embeddings: {out_dir / EMBEDDINGS_FILE}")
-    print(f"- Metadata: {out_dir / METADATA_FILE}")
+        print(f"Saving index, embeddings & metadata to: {out_dir.resolve()}")
+        _save_index(index, all_embeddings, metas, out_dir)
+        print("✅ Stage 5 complete.")
+        print(f"- Index: {out_dir / (INDEX_NAME + '.faiss')}")
+        if STORE_RAW_EMBEDDINGS:
+            print(f"- Embeddings: {out_dir / EMBEDDINGS_FILE}")
+        print(f"- Metadata: {out_dir / METADATA_FILE}")
+
+
+def index_for_department(doc: dict, department, index_dir: str = INDEX_DIR):
+    """
+    A document already processed (identical file) uploaded by another department:
+    with VECTOR_SHARD_BY=department it is also indexed in that department's shard.
+    """
+    if VECTOR_BACKEND == "faiss" and VECTOR_SHARD_BY == "department" and department is not None \
+            and doc.get("chunks") and doc.get("department") != department:
+        indexing_batch([{**doc, "department": department}], index_dir)
 
 
 # -----------------------------
-# Tiny demo search
+# Search
 # -----------------------------
-def search(query: str, top_k: int = 3, index_dir: str = INDEX_DIR, model_name: str = MODEL_NAME):
+# The index, query embeddings and results are cached per process. Results are
+# keyed by the index version (mtime and size of the saved files, or the
+# embedding_versions counter with pgvector), so a rewrite by indexing_batch, in
+# this or any other process, invalidates them.
+_search_lock = threading.Lock()
+_load_lock = threading.Lock()
+_snapshots: Dict[str, Dict] = {}  # index dir -> {"version", "index", "metas", "tombstones", "raw", "texts"}
+_query_vectors: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+_results: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+# replaced snapshots: their chunk text file is closed once searches still running on them are done
+_retired: List[Tuple[float, Dict]] = []
+RETIRE_SECONDS = 60
+# global queries fan out over the shards (faiss releases the GIL while searching); one thread: in turn
+_shard_pool = ThreadPoolExecutor(SHARD_SEARCH_THREADS, thread_name_prefix="shard-search") if SHARD_SEARCH_THREADS > 1 else None
+
+
+def normalise_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query; it is what gets embedded."""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def index_version(index_dir: str = INDEX_DIR):
+    """Version of the saved index, None if not built yet."""
+    paths = [os.path.join(index_dir, f"{INDEX_NAME}.faiss"), os.path.join(index_dir, METADATA_FILE)]
+    try:
+        return tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, paths))
+    except FileNotFoundError:
+        return None
+
+
+def _close_snapshot(snapshot: Dict):
+    if snapshot.get("texts") is not None:
+        snapshot["texts"].close()
+
+
+def _retire(snapshot: Dict):
+    """Close replaced snapshots' files after RETIRE_SECONDS (searches may still be reading them)."""
+    now = time.monotonic()
+    if snapshot is not None:
+        _retired.append((now, snapshot))
+    while _retired and now - _retired[0][0] >= RETIRE_SECONDS:
+        _close_snapshot(_retired.pop(0)[1])
+
+
+def clear_search_cache():
+    with _search_lock:
+        for snapshot in _snapshots.values():
+            _retire(snapshot)
+        _snapshots.clear()
+        _query_vectors.clear()
+        _results.clear()
+
+
+def _lru_put(cache: OrderedDict, key, value, size: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _load_snapshot(index_dir: str, version) -> Dict:
+    """
+    The index and metadata in memory; with a quantised index the raw float32
+    copy is memory-mapped (only the rows re-scored are read), chunk texts stay
+    in CHUNK_TEXT_FILE.
+    """
     out_dir = Path(index_dir)
-    print(f"{out_dir}/{INDEX_NAME}.faiss")
-    if not (out_dir / f"{INDEX_NAME}.faiss").exists():
-        raise FileNotFoundError("Index not built yet.")
-
-    device = _device_str()
-    model = SentenceTransformer(model_name, device=device)
-
-    print("Loading FAISS index + metadata…")
     index, metas = _load_index(out_dir)
-
-    print(f"Encoding query on {device}: {query}")
-    with torch.inference_mode():
-        q = model.encode([query], convert_to_numpy=True, normalize_embeddings=NORMALIZE, show_progress_bar=False).astype(np.float32)
-
-    distances, ids = index.search(q, top_k)
-    results = []
-    for i, (idx, score) in enumerate(zip(ids[0], distances[0]), start=1):
-        m = metas[idx]
-        results.append({
-            "rank": i,
-            "score": float(score),
-            "doc_id": m.get("doc_id"),
-            "chunk_id": m.get("chunk_id"),
-            "file_path": m.get("file_path"),
-            "summary": m.get("summary"),
-        })
-    print(json.dumps({"query": query, "results": results}, indent=2, ensure_ascii=False))
-    return results
+    raw = None
+    if _quantised(index) and (out_dir / EMBEDDINGS_FILE).exists():
+        raw = np.load(out_dir / EMBEDDINGS_FILE, mmap_mode="r")
+        raw = raw if len(raw) == index.ntotal else None
+    texts_path = out_dir / CHUNK_TEXT_FILE
+    return {
+        "version": version,
+        "index": index,
+        "metas": metas,
+        "tombstones": sum(1 for m in metas if m.get("tombstone")),
+        "raw": raw,
+        "texts": open(texts_path, "rb") if texts_path.exists() else None,
+    }
+
+
+def _snapshot(index_dir: str, scope: str = None) -> tuple:
+    """
+    (cache key, snapshot), loaded from disk only when the version changed.
+    scope: the result cache scope its results are keyed under, when not the
+    index dir itself (the root of a sharded store).
+    """
+    version = index_version(index_dir)
+    if version is None:
+        raise FileNotFoundError("Index not built yet.")
+    key = os.path.abspath(index_dir)
+    scope = scope or key
+    snapshot = _snapshots.get(key)
+    Metrics.cache("search_index", snapshot is not None and snapshot["version"] == version)
+    if snapshot is not None and snapshot["version"] == version:
+        return key, snapshot
+
+    with _load_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None or snapshot["version"] != version:
+            print(f"Loading FAISS index + metadata from {index_dir}…")
+            snapshot = _load_snapshot(index_dir, version)
+            while index_version(index_dir) != version:  # a writer replaced files while they were read
+                _close_snapshot(snapshot)  # never handed out
+                version = index_version(index_dir)
+                snapshot = _load_snapshot(index_dir, version)
+            with _search_lock:
+                _retire(_snapshots.get(key))
+                _snapshots[key] = snapshot
+                # results keyed on a replaced version can no longer be hit (a sharded scope's
+                # version is the tuple of its shards' versions)
+                current = {s["version"] for s in _snapshots.values()}
+                for stale in [k for k in _results
+                              if k[1] == scope and any(v not in current for v in ((k[2],) if scope == key else k[2]))]:
+                    del _results[stale]
+    return key, snapshot
+
+
+def _encode_queries(queries: List[str], model_name: str) -> np.ndarray:
+    """Embeddings of normalised queries: cached ones from the LRU, the others in one model call."""
+    vectors, missing = {}, []
+    with _search_lock:
+        for q in dict.fromkeys(queries):
+            vec = _query_vectors.get((model_name, q))
+            Metrics.cache("search_query_embedding", vec is not None)
+            if vec is None:
+                missing.append(q)
+            else:
+                _query_vectors.move_to_end((model_name, q))
+                vectors[q] = vec
+
+    if missing:
+        model = _get_model(model_name, _device_str())
+        with torch.inference_mode(), Metrics.measure("search_model_call", Metrics.texts_sizes(missing), model=model_name):
+            encoded = model.encode(missing, batch_size=min(len(missing), 256), convert_to_numpy=True,
+                                   normalize_embeddings=NORMALIZE, show_progress_bar=False).astype(np.float32)
+        with _search_lock:
+            for q, vec in zip(missing, encoded):
+                vectors[q] = vec
+                _lru_put(_query_vectors, (model_name, q), vec, QUERY_CACHE_SIZE)
+    return np.vstack([vectors[q] for q in queries])
+
+
+def _rescore(raw: np.ndarray, vectors: np.ndarray, ids: np.ndarray):
+    """(scores, ids) of the candidates re-ranked on their float32 vectors, best first."""
+    scores = np.full(ids.shape, -np.inf if NORMALIZE else np.inf, dtype=np.float32)
+    for row, (q, row_ids) in enumerate(zip(vectors, ids)):
+        valid = np.flatnonzero(row_ids >= 0)
+        candidates = np.asarray(raw[row_ids[valid]], dtype=np.float32)
+        scores[row, valid] = candidates @ q if NORMALIZE else ((candidates - q) ** 2).sum(axis=1)
+    order = np.argsort(-scores if NORMALIZE else scores, axis=1)
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+def _rank(snapshot: Dict, vectors: np.ndarray, top_k: int, filters: Dict = None) -> List[List[Dict]]:
+    """One index.search for all query vectors; filters are equality tests on chunk metadata."""
+    index, metas, raw = snapshot["index"], snapshot["metas"], snapshot["raw"]
+    wanted = top_k * FILTER_OVERFETCH if filters or snapshot["tombstones"] else top_k
+    k = min(wanted * (RERANK_OVERFETCH if raw is not None else 1), index.ntotal)
+    if k <= 0:
+        return [[] for _ in vectors]
+    params = faiss.SearchParametersHNSW(efSearch=max(SHARD_HNSW_EF_SEARCH, k)) if _ann(index) else None
+    distances, ids = index.search(vectors, k, params=params)
+    if raw is not None:
+        distances, ids = _rescore(raw, vectors, ids)
+
+    ranked = []
+    for row_ids, row_scores in zip(ids, distances):
+        results = []
+        for idx, score in zip(row_ids, row_scores):
+            if idx < 0 or idx >= len(metas):  # fewer than k vectors
+                continue
+            m = metas[idx]
+            if m.get("tombstone"):  # chunk removed by a newer version of its document
+                continue
+            if filters and any(m.get(field) != value for field, value in filters.items()):
+                continue
+            results.append({
+                "rank": len(results) + 1,
+                "score": float(score),
+                "doc_id": m.get("doc_id"),
+                "chunk_id": m.get("chunk_id"),
+                "file_path": m.get("file_path"),
+                "summary": _chunk_text(snapshot["texts"], m)["summary"],
+            })
+            if len(results) == top_k:
+                break
+        ranked.append(results)
+    return ranked
+
+
+def shard_dirs(index_dir: str = INDEX_DIR) -> Dict[str, str]:
+    """Shard key -> directory, for the shards under index_dir (VECTOR_SHARD_BY=department)."""
+    try:
+        with os.scandir(os.path.join(index_dir, SHARDS_DIR)) as entries:
+            return {e.name: e.path for e in entries if e.is_dir()}
+    except FileNotFoundError:
+        return {}
+
+
+def _shard_snapshots(index_dir: str, filters: Dict = None) -> List[Dict]:
+    """Snapshots to search: the department's shard when filtered on one (none if it has no shard yet), else all."""
+    if filters and "department" in filters:
+        paths = [os.path.join(index_dir, SHARDS_DIR, _shard_key(filters))]
+    else:
+        paths = list(shard_dirs(index_dir).values())
+    snapshots = []
+    scope = os.path.abspath(index_dir)  # search_batch's result cache scope
+    for path in paths:
+        try:
+            snapshots.append(_snapshot(path, scope)[1])
+        except FileNotFoundError:  # no chunks for it yet
+            pass
+    if not snapshots and not (filters and "department" in filters):
+        raise FileNotFoundError("Index not built yet.")
+    return snapshots
+
+
+def _rank_shards(snapshots: List[Dict], vectors: np.ndarray, top_k: int, filters: Dict = None) -> List[List[Dict]]:
+    """_rank() on every shard (in parallel on _shard_pool), merged into the top_k per query."""
+    if not snapshots:
+        return [[] for _ in vectors]
+    if len(snapshots) == 1:
+        return _rank(snapshots[0], vectors, top_k, filters)
+    per_shard = list((_shard_pool.map if _shard_pool else map)(
+        lambda snapshot: _rank(snapshot, vectors, top_k, filters), snapshots))
+    merged = []
+    for results in zip(*per_shard):  # each shard's results are best first
+        seen, ranked = set(), []
+        for r in heapq.merge(*results, key=lambda r: -r["score"] if NORMALIZE else r["score"]):
+            # a document indexed for several departments is in several shards
+            if (r["doc_id"], r["chunk_id"]) not in seen:
+                seen.add((r["doc_id"], r["chunk_id"]))
+                ranked.append({**r, "rank": len(ranked) + 1})
+                if len(ranked) == top_k:
+                    break
+        merged.append(ranked)
+    return merged
+
+
+def _rank_pgvector(store, vectors: np.ndarray, top_k: int, model_name: str, filters: Dict = None) -> List[List[Dict]]:
+    """_rank() in Postgres: one statement for all query vectors, filters applied in SQL."""
+    return [[{
+        "rank": rank,
+        "score": score,
+        "doc_id": m.get("doc_id"),
+        "chunk_id": m.get("chunk_id"),
+        "file_path": m.get("file_path"),
+        "summary": m.get("summary"),
+    } for rank, (score, m) in enumerate(hits, 1)] for hits in store.search(vectors, top_k, model_name, filters)]
+
+
+def search_batch(queries: List[str], top_k: int = 3, index_dir: str = INDEX_DIR, model_name: str = MODEL_NAME,
+                 filters: Dict = None) -> List[List[Dict]]:
+    """Results per query; uncached queries are encoded in one model call and ranked in one index.search."""
+    if VECTOR_BACKEND == "pgvector":
+        store = _pg_store(_get_model(model_name, _device_str()))
+        scope, version = "pgvector", store.version(model_name)
+        rank = lambda vectors: _rank_pgvector(store, vectors, top_k, model_name, filters)
+    elif VECTOR_SHARD_BY == "department":
+        snapshots = _shard_snapshots(index_dir, filters)
+        scope = os.path.abspath(index_dir)
+        version = tuple(snapshot["version"] for snapshot in snapshots)
+        shard_filters = {field: value for field, value in (filters or {}).items() if field != "department"}
+        rank = lambda vectors: _rank_shards(snapshots, vectors, top_k, shard_filters)
+    else:
+        scope, snapshot = _snapshot(index_dir)
+        version = snapshot["version"]
+        rank = lambda vectors: _rank(snapshot, vectors, top_k, filters)
+    filter_key = json.dumps(filters or {}, sort_keys=True)
+    keys = [(model_name, scope, version, normalise_query(q), filter_key, top_k) for q in queries]
+
+    found = {}
+    with _search_lock:
+        for key in dict.fromkeys(keys):
+            hit = _results.get(key)
+            Metrics.cache("search_result", hit is not None)
+            if hit is not None:
+                _results.move_to_end(key)
+                found[key] = hit
+
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    if missing:
+        vectors = _encode_queries([key[3] for key in missing], model_name)
+        found.update(zip(missing, rank(vectors)))
+        with _search_lock:
+            for key in missing:
+                _lru_put(_results, key, found[key], RESULT_CACHE_SIZE)
+    return [[dict(r) for r in found[key]] for key in keys]
+
+
+def search(query: str, top_k: int = 3, index_dir: str = INDEX_DIR, model_name: str = MODEL_NAME, filters: Dict = None):
+    return search_batch([query], top_k, index_dir, model_name, filters)[0]
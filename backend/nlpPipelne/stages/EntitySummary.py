@@ -3,12 +3,14 @@ import re
 import json
 from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification, AutoModelForSeq2SeqLM
 from typing import List, Dict
+from nlpPipelne import Metrics
 
 # -------------------------------
 # English-only model names
 # -------------------------------
 NER_MODEL_NAME = "dslim/bert-base-NER"
 SUM_MODEL_NAME = "facebook/bart-large-cnn"
+BATCH_SIZE = 8  # chunks per NER / summarization forward pass
 
 ner_pipeline = None
 summarizer_pipeline = None
@@ -49,23 +51,24 @@ def init_models(device: str = "cpu"):
 # -------------------------------
 # Entity Extraction
 # -------------------------------
-def extract_entities(text: str) -> Dict[str, List[str]]:
+REGEX_PATTERNS = {
+    "EMAIL": r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+    "URL": r"https?://[^\s]+",
+    "DATE": r"\b(?:\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\d{4})\b",
+    "ID": r"\b[A-Z]{2,}\d{2,}\b"
+}
+
+
+def _collect_entities(text: str, ner_results: List[Dict]) -> Dict[str, List[str]]:
     entities = {}
 
     # English NER
-    ner_results = ner_pipeline(text)
     for ent in ner_results:
         label = ent["entity_group"]
         entities.setdefault(label, []).append(ent["word"])
 
     # Regex-based entities
-    regex_patterns = {
-        "EMAIL": r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
-        "URL": r"https?://[^\s]+",
-        "DATE": r"\b(?:\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\d{4})\b",
-        "ID": r"\b[A-Z]{2,}\d{2,}\b"
-    }
-    for label, pattern in regex_patterns.items():
+    for label, pattern in REGEX_PATTERNS.items():
         matches = re.findall(pattern, text)
         if matches:
             entities.setdefault(label, []).extend(matches)
@@ -73,27 +76,81 @@ def extract_entities(text: str) -> Dict[str, List[str]]:
     return entities
 
 
+def extract_entities(text: str) -> Dict[str, List[str]]:
+    with Metrics.measure("pipeline_model_call", Metrics.texts_sizes([text]), model=NER_MODEL_NAME):
+        ner_results = ner_pipeline(text)
+    return _collect_entities(text, ner_results)
+
+
+def extract_entities_batch(texts: List[str], batch_size: int = BATCH_SIZE) -> List[Dict[str, List[str]]]:
+    """extract_entities for many texts with one batched NER call."""
+    if not texts:
+        return []
+    with Metrics.measure("pipeline_model_call", Metrics.texts_sizes(texts), model=NER_MODEL_NAME):
+        ner_results = ner_pipeline(texts, batch_size=batch_size)
+    return [_collect_entities(text, res) for text, res in zip(texts, ner_results)]
+
+
 # -------------------------------
 # Summarization
 # -------------------------------
+def _summary_lengths(num_words: int):
+    return min(60, num_words), max(10, num_words // 3)
+
+
 def summarize_text(text: str) -> str:
     words = text.split()
     if len(words) < 25:
         return text
 
+    max_length, min_length = _summary_lengths(len(words))
     try:
-        summary = summarizer_pipeline(
-            text,
-            max_length=min(60, len(words)),
-            min_length=max(10, len(words) // 3),
-            do_sample=False
-        )[0]['summary_text']
+        with Metrics.measure("pipeline_model_call", Metrics.texts_sizes([text]), model=SUM_MODEL_NAME):
+            summary = summarizer_pipeline(
+                text,
+                max_length=max_length,
+                min_length=min_length,
+                do_sample=False
+            )[0]['summary_text']
     except Exception:
         summary = text.split(".")[0]
 
     return summary
 
 
+def summarize_texts(texts: List[str], batch_size: int = BATCH_SIZE) -> List[str]:
+    """
+    summarize_text for many texts: texts that share the same length bounds go
+    through the model together in batches.
+    """
+    summaries = list(texts)  # short texts are their own summary
+    groups = {}
+    for i, text in enumerate(texts):
+        num_words = len(text.split())
+        if num_words >= 25:
+            groups.setdefault(_summary_lengths(num_words), []).append(i)
+
+    for (max_length, min_length), idx in groups.items():
+        batch = [texts[i] for i in idx]
+        try:
+            with Metrics.measure("pipeline_model_call", Metrics.texts_sizes(batch), model=SUM_MODEL_NAME):
+                outputs = summarizer_pipeline(
+                    batch,
+                    max_length=max_length,
+                    min_length=min_length,
+                    do_sample=False,
+                    batch_size=batch_size
+                )
+            for i, out in zip(idx, outputs):
+                summaries[i] = out["summary_text"]
+        except Exception:
+            # One bad text fails the whole batch, retry them one by one
+            for i in idx:
+                summaries[i] = summarize_text(texts[i])
+
+    return summaries
+
+
 def summarize_chunk(sentences: List[str]) -> str:
     return summarize_text(" ".join(sentences))
 
@@ -112,23 +169,51 @@ def merge_doc_entities(chunks: List[Dict]) -> Dict[str, List[str]]:
 # -------------------------------
 # Stage 4 processing
 # -------------------------------
-def entity_summary(doc: dict, output_file=None):
-    all_sentences = []
+def entity_summary_batch(docs: List[dict], batch_size: int = BATCH_SIZE, on_chunk=None) -> List[dict]:
+    """
+    Stage 4 for several documents at once: the chunks of all docs are batched
+    into shared NER / summarization calls, then the doc-level summaries.
+    on_chunk(chunk, done, total): called for each chunk as soon as its batch is
+    done (the chunks then go through the models batch_size at a time).
+    New versions of a document (nlpPipelne.Revisions) keep the results of their
+    "reused" chunks, and their doc_summary when revision_of says summary_reused.
+    """
+    chunks = [chunk for doc in docs for chunk in doc.get("chunks", []) if not chunk.get("reused")]
+    chunk_texts = [" ".join(chunk["sentences"]) for chunk in chunks]
+    step = batch_size if on_chunk else max(len(chunks), 1)
+
+    # Extract entities and summarize
+    for start in range(0, len(chunks), step):
+        texts = chunk_texts[start:start + step]
+        for done, chunk, entities, summary in zip(
+            range(start + 1, len(chunks) + 1),
+            chunks[start:start + step],
+            extract_entities_batch(texts, batch_size),
+            summarize_texts(texts, batch_size)
+        ):
+            chunk["entities"] = entities
+            chunk["summary"] = summary
+            if on_chunk:
+                on_chunk(chunk, done, len(chunks))
+
+    # Document-level summaries
+    resummarise = [doc for doc in docs if not doc.get("revision_of", {}).get("summary_reused")]
+    doc_texts = [
+        " ".join(sentence for chunk in doc.get("chunks", []) for sentence in chunk["sentences"])
+        for doc in resummarise
+    ]
+    for doc, doc_summary in zip(resummarise, summarize_texts(doc_texts, batch_size)):
+        doc["doc_summary"] = doc_summary
 
-    for chunk in doc.get("chunks", []):
-        chunk_text = " ".join(chunk["sentences"])
-        all_sentences.extend(chunk["sentences"])
+    # Merge entities
+    for doc in docs:
+        doc["entities"] = merge_doc_entities(doc.get("chunks", []))
 
-        # Extract entities and summarize
-        chunk["entities"] = extract_entities(chunk_text)
-        chunk["summary"] = summarize_chunk(chunk["sentences"])
+    return docs
 
-    # Document-level summary
-    doc_text = " ".join(all_sentences)
-    doc["doc_summary"] = summarize_text(doc_text)
 
-    # Merge entities
-    doc["entities"] = merge_doc_entities(doc.get("chunks", []))
+def entity_summary(doc: dict, output_file=None, on_chunk=None):
+    entity_summary_batch([doc], on_chunk=on_chunk)
 
     # Save output if needed
     if output_file:
@@ -7,17 +7,37 @@ from bs4 import BeautifulSoup
 import email
 import os
 # import json
+from nlpPipelne import Metrics
 
-def extract_text_from_pdf(file_path):
+SUPPORTED_EXTENSIONS = {
+    ".pdf", ".docx", ".txt", ".jpg", ".jpeg", ".png", ".tiff",
+    ".csv", ".xls", ".xlsx", ".html", ".eml"
+}
+
+def _ocr(image):
+    with Metrics.measure("pipeline_model_call", {"pages": 1}, model="tesseract") as m:
+        text = pytesseract.image_to_string(image, lang="mal+eng")
+        m["chars"] = len(text)
+    return text
+
+def _extract_pdf(file_path, on_page=None):
+    """(text, number of pages); on_page({"page", "pages", "ocr", "chars"}) after each page"""
     text = ""
     with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
+        pages = len(pdf.pages)
+        for number, page in enumerate(pdf.pages, start=1):
             page_text = page.extract_text()
-            if not page_text:
+            ocr = not page_text
+            if ocr:
                 im = page.to_image(resolution=300).original
-                page_text = pytesseract.image_to_string(im, lang="mal+eng")
+                page_text = _ocr(im)
             text += page_text or ""
-    return text.strip()
+            if on_page:
+                on_page({"page": number, "pages": pages, "ocr": ocr, "chars": len(page_text or "")})
+    return text.strip(), pages
+
+def extract_text_from_pdf(file_path):
+    return _extract_pdf(file_path)[0]
 
 def extract_text_from_docx(file_path):
     doc = docx.Document(file_path)
@@ -25,7 +45,7 @@ def extract_text_from_docx(file_path):
 
 def extract_text_from_image(file_path):
     image = Image.open(file_path)
-    return pytesseract.image_to_string(image, lang="mal+eng")
+    return _ocr(image)
 
 def extract_text_from_csv(file_path):
     df = pd.read_csv(file_path)
@@ -54,13 +74,15 @@ def extract_text_from_eml(file_path):
             parts.append(payload.decode(errors="ignore"))
     return "\n".join(parts)
 
-def extract_text(file_path):
+def extract_text(file_path, on_page=None):
+    """Stage 1; on_page: optional callable receiving per-page progress of PDFs and images"""
     ext = os.path.splitext(file_path)[-1].lower()
     text = ""
     file_type = "unknown"
+    pages = 1
 
     if ext == ".pdf":
-        text = extract_text_from_pdf(file_path)
+        text, pages = _extract_pdf(file_path, on_page)
         file_type = "pdf"
     elif ext == ".docx":
         text = extract_text_from_docx(file_path)
@@ -72,6 +94,8 @@ def extract_text(file_path):
     elif ext in [".jpg", ".jpeg", ".png", ".tiff"]:
         text = extract_text_from_image(file_path)
         file_type = ext[1:]
+        if on_page:
+            on_page({"page": 1, "pages": 1, "ocr": True, "chars": len(text)})
     elif ext == ".csv":
         text = extract_text_from_csv(file_path)
         file_type = "csv"
@@ -91,6 +115,7 @@ def extract_text(file_path):
         "doc_id": os.path.basename(file_path),
         "raw_text": text,
         "file_type": file_type,
+        "pages": pages,
         "length": len(text.split())
     }
     return result
@@ -111,11 +111,18 @@ CREATE TABLE classifications (
 CREATE TABLE embeddings (
   id BIGSERIAL PRIMARY KEY,
   chunk_id BIGINT REFERENCES chunks(id) ON DELETE CASCADE,
-  vector vector(768),
+  text_hash TEXT,
+  vector vector(384), -- paraphrase-multilingual-MiniLM-L12-v2; PgVectorStore re-types it for another model
   model_name TEXT,
   model_version TEXT,
   metadata JSONB DEFAULT '{}'::jsonb,
-  created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  CONSTRAINT uniq_embedding_text UNIQUE(model_name, text_hash)
+);
+
+CREATE TABLE embedding_versions (
+  model_name TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
 );
 
 CREATE TABLE pipeline_runs (
@@ -187,6 +194,11 @@ CREATE INDEX idx_documents_department ON documents(department_id);
 CREATE INDEX idx_documents_tsv ON documents USING GIN (raw_text_tsv);
 CREATE INDEX idx_chunks_tsv ON chunks USING GIN (chunk_text_tsv);
 CREATE INDEX idx_entities_label ON entities(label);
-CREATE INDEX idx_embeddings_vector ON embeddings USING ivfflat (vector vector_cosine_ops);
+CREATE INDEX idx_entities_text ON entities USING GIN (to_tsvector('simple', normalized_text));
+CREATE INDEX idx_entities_chunk ON entities(chunk_id);
+CREATE INDEX idx_chunks_document ON chunks(document_id);
+CREATE INDEX idx_summaries_document ON summaries(document_id);
+CREATE INDEX idx_embeddings_vector ON embeddings USING hnsw (vector vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX idx_embeddings_metadata ON embeddings USING GIN (metadata jsonb_path_ops);
 CREATE INDEX idx_documents_created_at ON documents(created_at);
 CREATE INDEX idx_pipeline_runs_document ON pipeline_runs(document_id);
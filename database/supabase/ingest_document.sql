@@ -0,0 +1,45 @@
+-- ingest_document.sql
+-- Everything a processed upload writes, in one round trip and one transaction:
+-- the document row, its summary, the transexion to the department and the chunks.
+-- Called by the ingestion worker: supabase.rpc("ingest_document", {...})
+
+-- Content hash of the uploaded file (also written by the INGEST_RPC=0 inserts)
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS file_hash TEXT;
+CREATE INDEX IF NOT EXISTS idx_documents_file_hash ON documents(file_hash);  -- uploads are looked up by hash
+
+CREATE TABLE IF NOT EXISTS chunks (
+  id BIGSERIAL PRIMARY KEY,
+  doc_id BIGINT REFERENCES documents(doc_id) ON DELETE CASCADE,
+  chunk_id INT NOT NULL,
+  content TEXT,
+  summary TEXT,
+  entities JSONB DEFAULT '{}'::jsonb,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  CONSTRAINT uniq_doc_chunk UNIQUE(doc_id, chunk_id)
+);
+
+CREATE OR REPLACE FUNCTION ingest_document(
+  p_document JSONB,
+  p_summary TEXT,
+  p_from_user UUID,
+  p_chunks JSONB DEFAULT '[]'::jsonb
+) RETURNS JSONB AS $$
+DECLARE
+  doc documents;
+BEGIN
+  INSERT INTO documents (title, department, url, file_hash, medium, priority, doc_type)
+  SELECT r.title, r.department, r.url, r.file_hash, r.medium, r.priority, r.doc_type
+  FROM jsonb_populate_record(NULL::documents, p_document) AS r
+  RETURNING * INTO doc;
+
+  INSERT INTO summaries (doc_id, content) VALUES (doc.doc_id, p_summary);
+
+  INSERT INTO transexions (from_user, to_department, doc_id)
+  VALUES (p_from_user, doc.department, doc.doc_id);
+
+  INSERT INTO chunks (doc_id, chunk_id, content, summary, entities)
+  SELECT doc.doc_id, c.chunk_id, c.content, c.summary, COALESCE(c.entities, '{}'::jsonb)
+  FROM jsonb_to_recordset(p_chunks) AS c(chunk_id INT, content TEXT, summary TEXT, entities JSONB);
+
+  RETURN to_jsonb(doc);
+END; $$ LANGUAGE plpgsql;
@@ -8,4 +8,13 @@ const api = axios.create({
   },
 });
 
+// Session token from /auth/login (see services.login)
+api.interceptors.request.use((config) => {
+  const token = localStorage.getItem("token");
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
 export default api;
@@ -3,6 +3,7 @@ import api from "../api/api";
 // Auth
 export const login = async (user_id, password) => {
   const response = await api.post("/auth/login", { user_id, password });
+  localStorage.setItem("token", response.data.access_token);
   return response.data;
 };
 
@@ -65,6 +66,21 @@ export const uploadFile = async (formData) => {
   return response.data;
 };
 
+// Live progress of an upload job (stages, pages, chunk summaries) over Server-Sent Events.
+// Returns the EventSource; it closes itself after the "done" / "failed" event.
+export const jobEvents = (job_id, onEvent) => {
+  const url = new URL(`/jobs/${job_id}/events`, api.defaults.baseURL);
+  const token = localStorage.getItem("token");
+  if (token) url.searchParams.set("token", token);
+  const source = new EventSource(url);
+  source.onmessage = (message) => {
+    const event = JSON.parse(message.data);
+    onEvent(event);
+    if (event.stage === "done" || event.stage === "failed") source.close();
+  };
+  return source;
+};
+
 export const getSummary = async (doc_id) => {
   const response = await api.get("/documents/summary", {
     params: { doc_id },